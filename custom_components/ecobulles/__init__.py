@@ -7,15 +7,20 @@ from dataclasses import dataclass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import config_validation as cv, device_registry as dr
 from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
+from homeassistant.helpers.typing import ConfigType
 
 from .api import EcobullesClient
 from .const import DOMAIN
 from .device import model_from_serial_number
+from .http_api import async_register_http_views
 from .sensor import EcobullesCoordinator
+from .services import async_setup_services
+from .websocket_api import async_register_websocket_commands
 
-PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.SWITCH]
+PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR, Platform.SWITCH]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
 @dataclass
@@ -25,6 +30,14 @@ class EcobullesRuntimeData:
     coordinator: EcobullesCoordinator
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up integration-wide Ecobulles features."""
+    async_register_websocket_commands(hass)
+    async_register_http_views(hass)
+    async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Ecobulles from a config entry."""
 
@@ -60,6 +73,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         EcobullesClient(hass),
         eco_ref,
         entry.data,
+        entry,
     )
     await coordinator.async_config_entry_first_refresh()
     entry.runtime_data = EcobullesRuntimeData(coordinator=coordinator)
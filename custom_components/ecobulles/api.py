@@ -2,21 +2,185 @@
 
 from __future__ import annotations
 
-from aiohttp import ClientSession
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from time import perf_counter
+from types import TracebackType
+from typing import Any
+
+from aiohttp import ClientResponse, ClientSession
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.util.dt import now as hass_now
+from homeassistant.util.dt import now as hass_now, utcnow
 from pyecobulles import EcobullesClient as PyEcobullesClient
 
+from .api_metrics import ApiMetrics
+from .flight_recorder import FlightRecorder
+from .history import (
+    HISTORY_ENDPOINT,
+    UsageWindow,
+    history_request_payload,
+    parse_usage_window,
+)
+from .rate_limit import RateLimiter
+
+# Shared by every client so concurrent history backfills together stay under
+# what the Ecobulles cloud tolerates. Polls and setup requests are not limited,
+# so their latency does not grow with the number of configured devices.
+API_RATE_LIMITER = RateLimiter(rate=2.0, burst=4)
+
+
+@dataclass(slots=True)
+class _ResponseSample:
+    """What the metered session saw of the response to one request."""
+
+    status: int | None = None
+    size: int = 0
+    decode_ms: float = 0.0
+
+
+# Set by EcobullesClient._post for the task sending the request, so concurrent
+# requests on one client each fill their own sample.
+_RESPONSE_SAMPLE: ContextVar[_ResponseSample | None] = ContextVar(
+    "ecobulles_response_sample", default=None
+)
+
+
+class _MeteredResponse:
+    """Response proxy recording status, body size and JSON decode time."""
+
+    def __init__(self, response: ClientResponse) -> None:
+        self._response = response
+        if (sample := _RESPONSE_SAMPLE.get()) is not None:
+            sample.status = response.status
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    async def json(self, **kwargs: Any) -> Any:
+        """Decode the body, timing the decode separately from the download."""
+        body = await self._response.read()
+        start = perf_counter()
+        content = await self._response.json(**kwargs)
+        if (sample := _RESPONSE_SAMPLE.get()) is not None:
+            sample.size = len(body)
+            sample.decode_ms = (perf_counter() - start) * 1000
+        return content
+
+
+class _MeteredRequest:
+    """Request context manager handing out metered responses."""
+
+    def __init__(self, request: Any) -> None:
+        self._request = request
+
+    async def __aenter__(self) -> _MeteredResponse:
+        return _MeteredResponse(await self._request.__aenter__())
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> Any:
+        return await self._request.__aexit__(exc_type, exc, tb)
+
+
+class _MeteredSession:
+    """Session proxy so pyecobulles requests report what they received."""
+
+    def __init__(self, session: ClientSession) -> None:
+        self.session = session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    def post(self, *args: Any, **kwargs: Any) -> _MeteredRequest:
+        """Send a POST request through the wrapped session."""
+        return _MeteredRequest(self.session.post(*args, **kwargs))
+
 
 class EcobullesClient(PyEcobullesClient):
-    """pyecobulles client wired to Home Assistant's shared web session."""
+    """pyecobulles client wired to Home Assistant's shared web session.
+
+    History requests are rate limited. Every request is aggregated in
+    `metrics` and kept in the bounded `flight_recorder`.
+    """
 
     def __init__(
         self, hass: HomeAssistant | None = None, session: ClientSession | None = None
     ) -> None:
         """Initialize the client with Home Assistant's aiohttp session."""
+        session = session or (async_get_clientsession(hass) if hass else None)
         super().__init__(
-            session=session or (async_get_clientsession(hass) if hass else None),
+            session=_MeteredSession(session) if session is not None else None,
             now_fn=hass_now,
         )
+        self.metrics = ApiMetrics()
+        self.flight_recorder = FlightRecorder()
+
+    async def _post(self, endpoint: str, payload: dict[str, Any]) -> Any:
+        """Send a request, rate limiting history windows, and record it."""
+        sample = _ResponseSample()
+        token = _RESPONSE_SAMPLE.set(sample)
+        try:
+            if endpoint == HISTORY_ENDPOINT:
+                await API_RATE_LIMITER.acquire()
+            started = utcnow()
+            start = perf_counter()
+            try:
+                content = await super()._post(endpoint, payload)
+            except Exception as err:
+                self._record(
+                    endpoint, payload, started, start, sample, type(err).__name__
+                )
+                raise
+            self._record(
+                endpoint,
+                payload,
+                started,
+                start,
+                sample,
+                "ok" if content is not None else "no_data",
+            )
+            return content
+        finally:
+            _RESPONSE_SAMPLE.reset(token)
+
+    def _record(
+        self,
+        endpoint: str,
+        payload: dict[str, Any],
+        started: datetime,
+        start: float,
+        sample: _ResponseSample,
+        outcome: str,
+    ) -> None:
+        """Add a finished request to the metrics and the flight recorder."""
+        duration_ms = (perf_counter() - start) * 1000
+        self.metrics.record(
+            endpoint,
+            duration_ms,
+            size=sample.size,
+            decode_ms=sample.decode_ms,
+            error=outcome != "ok",
+        )
+        self.flight_recorder.record(
+            endpoint,
+            payload,
+            started=started,
+            duration_ms=duration_ms,
+            status=sample.status,
+            size=sample.size,
+            outcome=outcome,
+        )
+
+    async def get_usage_window(
+        self, eco_ref: str, start: datetime, stop: datetime
+    ) -> UsageWindow | None:
+        """Fetch water and raw CO2 usage for one local time window."""
+        content = await self._post(
+            HISTORY_ENDPOINT, history_request_payload(eco_ref, start, stop)
+        )
+        return parse_usage_window(content, start, stop)
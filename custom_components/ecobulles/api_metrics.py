@@ -0,0 +1,173 @@
+"""Per-endpoint request metrics for the Ecobulles cloud client."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+# Upper bounds of the latency buckets in milliseconds; a final overflow bucket
+# catches everything slower.
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass(slots=True)
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with constant-time inserts."""
+
+    counts: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    )
+    count: int = 0
+    sum_ms: float = 0.0
+
+    def add(self, duration_ms: float) -> None:
+        """Record one request duration."""
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+
+    def merge(self, other: LatencyHistogram) -> None:
+        """Add another histogram's samples to this one."""
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+
+    def quantile(self, q: float) -> float | None:
+        """Return an estimated quantile, interpolated inside its bucket.
+
+        Samples in the overflow bucket are reported at the last bound.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if index == len(LATENCY_BUCKETS_MS):
+                    return float(LATENCY_BUCKETS_MS[-1])
+                upper = LATENCY_BUCKETS_MS[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            if index < len(LATENCY_BUCKETS_MS):
+                lower = float(LATENCY_BUCKETS_MS[index])
+        return float(LATENCY_BUCKETS_MS[-1])
+
+
+@dataclass(slots=True)
+class EndpointStats:
+    """Counters for one cloud endpoint."""
+
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    errors: int = 0
+    bytes_total: int = 0
+    decode_ms_total: float = 0.0
+    last_duration_ms: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly summary."""
+        return {
+            "requests": self.latency.count,
+            "errors": self.errors,
+            "bytes_total": self.bytes_total,
+            "decode_ms_total": round(self.decode_ms_total, 3),
+            "latency_p50_ms": _round(self.latency.quantile(0.5)),
+            "latency_p95_ms": _round(self.latency.quantile(0.95)),
+            "latency_last_ms": _round(self.last_duration_ms),
+            "latency_buckets": dict(
+                zip(
+                    [*map(str, LATENCY_BUCKETS_MS), "+Inf"],
+                    self.latency.counts,
+                    strict=True,
+                )
+            ),
+        }
+
+
+@dataclass(slots=True)
+class RequestTally:
+    """Requests finished inside one `tally_requests` block."""
+
+    requests: int = 0
+    bytes: int = 0
+
+
+# Tasks copy the context they are created in, so requests sent by tasks that
+# a tallied block starts, such as a gather, are tallied too.
+_REQUEST_TALLY: ContextVar[RequestTally | None] = ContextVar(
+    "ecobulles_request_tally", default=None
+)
+
+
+@contextmanager
+def tally_requests() -> Iterator[RequestTally]:
+    """Count the requests sent by the current task and the tasks it starts.
+
+    Unlike a difference of client-wide totals, the tally leaves out requests
+    that other tasks send on the same client at the same time.
+    """
+    tally = RequestTally()
+    token = _REQUEST_TALLY.set(tally)
+    try:
+        yield tally
+    finally:
+        _REQUEST_TALLY.reset(token)
+
+
+@dataclass(slots=True)
+class ApiMetrics:
+    """Request metrics of one client, keyed by endpoint."""
+
+    endpoints: dict[str, EndpointStats] = field(default_factory=dict)
+
+    def record(
+        self,
+        endpoint: str,
+        duration_ms: float,
+        *,
+        size: int = 0,
+        decode_ms: float = 0.0,
+        error: bool = False,
+    ) -> None:
+        """Record one finished request."""
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.latency.add(duration_ms)
+        stats.last_duration_ms = duration_ms
+        stats.bytes_total += size
+        stats.decode_ms_total += decode_ms
+        if error:
+            stats.errors += 1
+        if (tally := _REQUEST_TALLY.get()) is not None:
+            tally.requests += 1
+            tally.bytes += size
+
+    @property
+    def bytes_total(self) -> int:
+        """Return the bytes received across every endpoint."""
+        return sum(stats.bytes_total for stats in self.endpoints.values())
+
+    def overall_latency(self) -> LatencyHistogram:
+        """Return a histogram merging every endpoint."""
+        merged = LatencyHistogram()
+        for stats in self.endpoints.values():
+            merged.merge(stats.latency)
+        return merged
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly summary per endpoint."""
+        return {
+            endpoint: stats.as_dict()
+            for endpoint, stats in sorted(self.endpoints.items())
+        }
+
+
+def _round(value: float | None) -> float | None:
+    """Round a millisecond value for display."""
+    return None if value is None else round(value, 1)
@@ -0,0 +1,108 @@
+"""Binary sensor platform for Ecobulles."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .sensor import EcobullesCoordinator
+
+PARALLEL_UPDATES = 0
+
+
+@dataclass(frozen=True, kw_only=True)
+class EcobullesBinarySensorDescription(BinarySensorEntityDescription):
+    """Describe an Ecobulles binary sensor."""
+
+    value_fn: Callable[[dict[str, Any]], bool | None]
+    attributes_fn: Callable[[dict[str, Any]], dict[str, Any]] = lambda data: {}
+
+
+BINARY_SENSORS: tuple[EcobullesBinarySensorDescription, ...] = (
+    EcobullesBinarySensorDescription(
+        key="water_leak",
+        translation_key="water_leak",
+        device_class=BinarySensorDeviceClass.MOISTURE,
+        value_fn=lambda data: data.get("water_leak_detected"),
+        attributes_fn=lambda data: {
+            "continuous_flow": data.get("water_leak_continuous_flow"),
+            "overnight_flow": data.get("water_leak_overnight_flow"),
+            "continuous_flow_minutes": data.get("continuous_flow_minutes"),
+        },
+    ),
+    EcobullesBinarySensorDescription(
+        key="co2_dose_drift",
+        translation_key="co2_dose_drift",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        value_fn=lambda data: data.get("co2_dose_drift"),
+        attributes_fn=lambda data: {
+            "ratio_ms_per_l": data.get("co2_dose_ratio_ms_per_l"),
+            "band_low_ms_per_l": data.get("co2_dose_band_low_ms_per_l"),
+            "band_high_ms_per_l": data.get("co2_dose_band_high_ms_per_l"),
+        },
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddConfigEntryEntitiesCallback,
+) -> None:
+    """Set up Ecobulles binary sensors from a config entry."""
+    eco_ref = entry.data["eco_ref"]
+    coordinator = entry.runtime_data.coordinator
+    async_add_entities(
+        EcobullesBinarySensor(coordinator, eco_ref, description)
+        for description in BINARY_SENSORS
+    )
+
+
+class EcobullesBinarySensor(
+    CoordinatorEntity[EcobullesCoordinator], BinarySensorEntity
+):
+    """Generic binary sensor backed by an entity description."""
+
+    _attr_has_entity_name = True
+    entity_description: EcobullesBinarySensorDescription
+
+    def __init__(
+        self,
+        coordinator: EcobullesCoordinator,
+        eco_ref: str,
+        description: EcobullesBinarySensorDescription,
+    ) -> None:
+        """Initialize a described binary sensor."""
+        super().__init__(coordinator)
+        self.eco_ref = eco_ref
+        self.entity_description = description
+        self._attr_unique_id = f"{eco_ref}_{description.key}"
+
+    @property
+    def device_info(self) -> dict[str, Any]:
+        """Return device registry metadata."""
+        return {"identifiers": {(DOMAIN, self.eco_ref)}}
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return the current binary state."""
+        return self.entity_description.value_fn(self.coordinator.data)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Expose the details behind the binary state."""
+        return {
+            "eco_ref": self.eco_ref,
+            **self.entity_description.attributes_fn(self.coordinator.data),
+        }
@@ -0,0 +1,260 @@
+"""Pure helpers for calibrating the CO2 dose against water usage."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from statistics import median
+from typing import Any
+
+# Scale factor turning a median absolute deviation into a standard deviation
+# estimate for normally distributed ratios.
+MAD_SCALE = 1.4826
+
+
+@dataclass(frozen=True, slots=True)
+class DoseFit:
+    """Robust estimate of valve-open milliseconds per liter."""
+
+    ms_per_liter: float
+    confidence: float
+    samples: int
+    outliers: int
+
+
+@dataclass(slots=True)
+class DoseCalibration:
+    """Fit valve-open time per liter from successive counter totals.
+
+    Refresh deltas are accumulated until at least `min_liters` of water has
+    been drawn, since the 1 L counter resolution makes smaller intervals too
+    noisy. Each closed interval contributes one ms/L ratio to a bounded window.
+    The fit is the median of the window after rejecting ratios further than
+    `outlier_mads` scaled median absolute deviations from the raw median.
+    """
+
+    min_liters: float = 10.0
+    max_ratios: int = 200
+    outlier_mads: float = 3.0
+    full_confidence_samples: int = 20
+    last_liters: float | None = None
+    last_gas_ms: float | None = None
+    pending_liters: float = 0.0
+    pending_gas_ms: float = 0.0
+    ratios: deque[float] = field(default_factory=deque)
+
+    def add_totals(self, total_liters: float, total_gas_ms: float) -> bool:
+        """Add lifetime totals and return whether a new ratio was recorded."""
+        previous_liters, previous_gas = self.last_liters, self.last_gas_ms
+        self.last_liters, self.last_gas_ms = total_liters, total_gas_ms
+        if previous_liters is None or previous_gas is None:
+            return False
+
+        delta_liters = total_liters - previous_liters
+        delta_gas = total_gas_ms - previous_gas
+        if delta_liters < 0 or delta_gas < 0:
+            self.pending_liters = self.pending_gas_ms = 0.0
+            return False
+
+        self.pending_liters += delta_liters
+        self.pending_gas_ms += delta_gas
+        if self.pending_liters < self.min_liters:
+            return False
+
+        self.ratios.append(self.pending_gas_ms / self.pending_liters)
+        while len(self.ratios) > self.max_ratios:
+            self.ratios.popleft()
+        self.pending_liters = self.pending_gas_ms = 0.0
+        return True
+
+    def fit(self) -> DoseFit | None:
+        """Return the robust ms/L estimate, or None without data."""
+        if not self.ratios:
+            return None
+        center = median(self.ratios)
+        spread = MAD_SCALE * median(abs(ratio - center) for ratio in self.ratios)
+        if spread > 0:
+            limit = self.outlier_mads * spread
+            inliers = [ratio for ratio in self.ratios if abs(ratio - center) <= limit]
+        else:
+            inliers = list(self.ratios)
+        samples = len(self.ratios)
+        confidence = (len(inliers) / samples) * min(
+            1.0, len(inliers) / self.full_confidence_samples
+        )
+        return DoseFit(
+            ms_per_liter=median(inliers),
+            confidence=round(confidence, 3),
+            samples=samples,
+            outliers=samples - len(inliers),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Serialize the calibration window for storage."""
+        return {
+            "last_liters": self.last_liters,
+            "last_gas_ms": self.last_gas_ms,
+            "pending_liters": self.pending_liters,
+            "pending_gas_ms": self.pending_gas_ms,
+            "ratios": list(self.ratios),
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any] | None) -> "DoseCalibration":
+        """Restore the calibration window from storage."""
+        raw = raw or {}
+        calibration = cls(
+            last_liters=raw.get("last_liters"),
+            last_gas_ms=raw.get("last_gas_ms"),
+            pending_liters=float(raw.get("pending_liters", 0.0)),
+            pending_gas_ms=float(raw.get("pending_gas_ms", 0.0)),
+        )
+        calibration.ratios.extend(
+            float(ratio) for ratio in raw.get("ratios", [])[-calibration.max_ratios :]
+        )
+        return calibration
+
+
+@dataclass(slots=True)
+class DoseDriftDetector:
+    """Track the rolling ms/L ratio and flag when it leaves a learned band.
+
+    Refresh deltas are kept in a deque with running sums, so the ratio over the
+    last `window_liters` costs O(1) amortised per refresh. Every time another
+    `window_liters` of water has been drawn, the current ratio is folded into
+    an exponentially weighted mean and variance. Once `min_band_samples`
+    blocks have been learned, a ratio more than `band_sigmas` deviations away
+    from the mean raises the drift flag. The band is frozen while drifting
+    and relearned from scratch after `relearn_blocks` drifting blocks, which
+    accepts a deliberate change of the micrometric screw.
+    """
+
+    window_liters: float = 100.0
+    band_alpha: float = 0.05
+    band_sigmas: float = 4.0
+    min_relative_deviation: float = 0.05
+    min_band_samples: int = 10
+    relearn_blocks: int = 20
+    last_liters: float | None = None
+    last_gas_ms: float | None = None
+    intervals: deque[tuple[float, float]] = field(default_factory=deque)
+    window_liters_sum: float = 0.0
+    window_gas_sum: float = 0.0
+    block_liters: float = 0.0
+    band_mean: float | None = None
+    band_variance: float = 0.0
+    band_samples: int = 0
+    drift_blocks: int = 0
+    drifting: bool = False
+
+    def add_totals(self, total_liters: float, total_gas_ms: float) -> float | None:
+        """Add lifetime totals and return the rolling ratio once available."""
+        previous_liters, previous_gas = self.last_liters, self.last_gas_ms
+        self.last_liters, self.last_gas_ms = total_liters, total_gas_ms
+        if previous_liters is None or previous_gas is None:
+            return self.ratio
+
+        delta_liters = total_liters - previous_liters
+        delta_gas = total_gas_ms - previous_gas
+        if delta_liters < 0 or delta_gas < 0 or (delta_liters == 0 and delta_gas == 0):
+            return self.ratio
+
+        self.intervals.append((delta_liters, delta_gas))
+        self.window_liters_sum += delta_liters
+        self.window_gas_sum += delta_gas
+        while (
+            len(self.intervals) > 1
+            and self.window_liters_sum - self.intervals[0][0] >= self.window_liters
+        ):
+            old_liters, old_gas = self.intervals.popleft()
+            self.window_liters_sum -= old_liters
+            self.window_gas_sum -= old_gas
+
+        ratio = self.ratio
+        if ratio is None:
+            return None
+        self.drifting = self._outside_band(ratio)
+        self.block_liters += delta_liters
+        if self.block_liters >= self.window_liters:
+            self.block_liters = 0.0
+            self._learn_block(ratio)
+        return ratio
+
+    @property
+    def ratio(self) -> float | None:
+        """Return gas ms per liter over the last `window_liters`."""
+        if self.window_liters_sum < self.window_liters:
+            return None
+        return self.window_gas_sum / self.window_liters_sum
+
+    @property
+    def band(self) -> tuple[float, float] | None:
+        """Return the learned (low, high) ratio band once trusted."""
+        if self.band_mean is None or self.band_samples < self.min_band_samples:
+            return None
+        deviation = self.band_sigmas * max(
+            self.band_variance**0.5, self.min_relative_deviation * self.band_mean
+        )
+        return self.band_mean - deviation, self.band_mean + deviation
+
+    def _outside_band(self, ratio: float) -> bool:
+        """Return whether a ratio falls outside the learned band."""
+        band = self.band
+        return band is not None and not band[0] <= ratio <= band[1]
+
+    def _learn_block(self, ratio: float) -> None:
+        """Fold one window's worth of water into the learned band."""
+        if self.drifting:
+            self.drift_blocks += 1
+            if self.drift_blocks < self.relearn_blocks:
+                return
+            self.band_mean = None
+            self.band_variance = 0.0
+            self.band_samples = 0
+            self.drifting = False
+        self.drift_blocks = 0
+        if self.band_mean is None:
+            self.band_mean = ratio
+        else:
+            difference = ratio - self.band_mean
+            self.band_mean += self.band_alpha * difference
+            self.band_variance = (1 - self.band_alpha) * (
+                self.band_variance + self.band_alpha * difference * difference
+            )
+        self.band_samples += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Serialize the rolling window and band for storage."""
+        return {
+            "window_liters": self.window_liters,
+            "last_liters": self.last_liters,
+            "last_gas_ms": self.last_gas_ms,
+            "intervals": [list(interval) for interval in self.intervals],
+            "block_liters": self.block_liters,
+            "band_mean": self.band_mean,
+            "band_variance": self.band_variance,
+            "band_samples": self.band_samples,
+            "drift_blocks": self.drift_blocks,
+            "drifting": self.drifting,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any] | None) -> "DoseDriftDetector":
+        """Restore the rolling window and band from storage."""
+        raw = raw or {}
+        detector = cls(
+            window_liters=float(raw.get("window_liters", 100.0)),
+            last_liters=raw.get("last_liters"),
+            last_gas_ms=raw.get("last_gas_ms"),
+            block_liters=float(raw.get("block_liters", 0.0)),
+            band_mean=raw.get("band_mean"),
+            band_variance=float(raw.get("band_variance", 0.0)),
+            band_samples=int(raw.get("band_samples", 0)),
+            drift_blocks=int(raw.get("drift_blocks", 0)),
+            drifting=bool(raw.get("drifting", False)),
+        )
+        for liters, gas_ms in raw.get("intervals", []):
+            detector.intervals.append((float(liters), float(gas_ms)))
+            detector.window_liters_sum += float(liters)
+            detector.window_gas_sum += float(gas_ms)
+        return detector
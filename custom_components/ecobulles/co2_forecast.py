@@ -0,0 +1,88 @@
+"""Pure helpers for forecasting CO2 gas consumption."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+SECONDS_PER_DAY = 86_400
+
+
+@dataclass(slots=True)
+class GasConsumptionRegression:
+    """Exponentially weighted linear regression of gas usage over time.
+
+    The regression fits the lifetime gas counter (ms) against time (days since
+    `origin`). It is kept as decayed running sums, so adding a sample is O(1)
+    and the whole state is a handful of floats. Older samples lose half their
+    weight every `half_life_days`, which acts as a rolling horizon.
+    """
+
+    half_life_days: float = 14.0
+    origin: float | None = None
+    last_day: float | None = None
+    sum_w: float = 0.0
+    sum_x: float = 0.0
+    sum_y: float = 0.0
+    sum_xx: float = 0.0
+    sum_xy: float = 0.0
+
+    def add_sample(self, timestamp: datetime, total_gas_ms: int) -> None:
+        """Add a lifetime gas counter reading."""
+        seconds = timestamp.timestamp()
+        if self.origin is None:
+            self.origin = seconds
+        day = (seconds - self.origin) / SECONDS_PER_DAY
+        if self.last_day is not None:
+            if day <= self.last_day:
+                return
+            decay = 0.5 ** ((day - self.last_day) / self.half_life_days)
+            self.sum_w *= decay
+            self.sum_x *= decay
+            self.sum_y *= decay
+            self.sum_xx *= decay
+            self.sum_xy *= decay
+
+        self.last_day = day
+        self.sum_w += 1
+        self.sum_x += day
+        self.sum_y += total_gas_ms
+        self.sum_xx += day * day
+        self.sum_xy += day * total_gas_ms
+
+    @property
+    def rate_ms_per_day(self) -> float | None:
+        """Return the fitted gas consumption in ms per day."""
+        denominator = self.sum_w * self.sum_xx - self.sum_x * self.sum_x
+        if self.sum_w < 2 or denominator <= 1e-9 * self.sum_w * self.sum_w:
+            return None
+        return (self.sum_w * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+    def as_dict(self) -> dict[str, Any]:
+        """Serialize the running sums for storage."""
+        return {
+            "half_life_days": self.half_life_days,
+            "origin": self.origin,
+            "last_day": self.last_day,
+            "sum_w": self.sum_w,
+            "sum_x": self.sum_x,
+            "sum_y": self.sum_y,
+            "sum_xx": self.sum_xx,
+            "sum_xy": self.sum_xy,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any] | None) -> "GasConsumptionRegression":
+        """Restore the running sums from storage."""
+        raw = raw or {}
+        return cls(
+            half_life_days=float(raw.get("half_life_days", 14.0)),
+            origin=raw.get("origin"),
+            last_day=raw.get("last_day"),
+            sum_w=float(raw.get("sum_w", 0.0)),
+            sum_x=float(raw.get("sum_x", 0.0)),
+            sum_y=float(raw.get("sum_y", 0.0)),
+            sum_xx=float(raw.get("sum_xx", 0.0)),
+            sum_xy=float(raw.get("sum_xy", 0.0)),
+        )
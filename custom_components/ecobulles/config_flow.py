@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
@@ -10,6 +11,7 @@ import voluptuous as vol
 from homeassistant.config_entries import (
     ConfigFlow as BaseConfigFlow,
     ConfigEntry,
+    ConfigEntryState,
     ConfigFlowResult,
     OptionsFlowWithConfigEntry,
 )
@@ -17,19 +19,26 @@ from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult, section
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from .api import EcobullesClient
 
 from .const import (
+    CONF_BOTTLE_CHANGE_CONFIRM_MINUTES,
+    CONF_BOTTLE_CHANGE_CONFIRM_READINGS,
     CONF_CO2_BOTTLE_WEIGHT_KG,
     CONF_CO2_MAX_DOSE_MG_PER_L,
     CONF_CO2_MICROMETRIC_SCREW_SETTING,
     CONF_CO2_MIN_DOSE_MG_PER_L,
     CONF_CO2_PRESSURE_BAR,
     CONF_CO2_REFERENCE_PULSE_MS_PER_L,
+    CONF_ENABLE_METRICS_ENDPOINT,
     CONF_ENABLE_RAW_CO2_SENSOR,
+    CONF_LEAK_CONTINUOUS_FLOW_MINUTES,
     CONF_POLL_INTERVAL_SECONDS,
+    CONF_USE_FITTED_CO2_PULSE,
     DOMAIN,
+    SIGNAL_RAW_CO2_SENSOR_TOGGLED,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -75,6 +84,32 @@ def _config_schema(defaults: dict[str, Any]) -> vol.Schema:
                             CONF_POLL_INTERVAL_SECONDS,
                             default=defaults.get(CONF_POLL_INTERVAL_SECONDS, 120),
                         ): vol.All(vol.Coerce(int), vol.Range(min=30)),
+                        vol.Optional(
+                            CONF_BOTTLE_CHANGE_CONFIRM_READINGS,
+                            default=defaults.get(
+                                CONF_BOTTLE_CHANGE_CONFIRM_READINGS, 2
+                            ),
+                        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                        vol.Optional(
+                            CONF_BOTTLE_CHANGE_CONFIRM_MINUTES,
+                            default=defaults.get(
+                                CONF_BOTTLE_CHANGE_CONFIRM_MINUTES, 0
+                            ),
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                        vol.Optional(
+                            CONF_LEAK_CONTINUOUS_FLOW_MINUTES,
+                            default=defaults.get(
+                                CONF_LEAK_CONTINUOUS_FLOW_MINUTES, 60
+                            ),
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                        vol.Optional(
+                            CONF_USE_FITTED_CO2_PULSE,
+                            default=defaults.get(CONF_USE_FITTED_CO2_PULSE, False),
+                        ): bool,
+                        vol.Optional(
+                            CONF_ENABLE_METRICS_ENDPOINT,
+                            default=defaults.get(CONF_ENABLE_METRICS_ENDPOINT, False),
+                        ): bool,
                     }
                 ),
                 {"collapsed": True},
@@ -93,25 +128,68 @@ def _flatten_advanced_options(data: dict[str, Any]) -> dict[str, Any]:
     return {**flattened, **advanced_options}
 
 
-async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
-    """Validate the user input allows us to connect."""
+# Box fields the entry needs before the first poll: the title and the device
+# registry entry. The other box fields come with that poll, so a device fetch
+# is only needed when the login payload leaves one of these out.
+_REQUIRED_BOX_FIELDS = ("name", "firm_ver", "num_serie")
+
+
+async def validate_input(
+    hass: HomeAssistant, data: dict[str, Any], eco_ref: str | None = None
+) -> dict[str, Any]:
+    """Validate the user input allows us to connect.
+
+    The login payload already carries the eco_ref and the box details, so a
+    single request normally both authenticates and describes the device. When
+    the caller already knows the eco_ref, as when reauthenticating or
+    reconfiguring, the device fetch starts alongside the login and is dropped
+    if the payload turns out to be complete; otherwise it can only start once
+    the login returned the eco_ref.
+    """
     client = EcobullesClient(hass)
+    device_task = (
+        hass.async_create_task(_async_get_box(client, eco_ref)) if eco_ref else None
+    )
     try:
-        auth_success, user_id, eco_ref, boitier_name = await client.authenticate(
-            data[CONF_EMAIL], data[CONF_PASSWORD]
-        )
-    except TimeoutError as err:
-        raise CannotConnect from err
-    except RuntimeError as err:
-        raise CannotConnect from err
-
-    if auth_success:
-        return {
-            "title": "Ecobulles : " + (boitier_name or ""),
-            "user_id": user_id,
-            "eco_ref": eco_ref,
-        }
-    raise InvalidAuth
+        try:
+            payload = await client.get_login_payload(
+                data[CONF_EMAIL], data[CONF_PASSWORD]
+            )
+        except (TimeoutError, RuntimeError) as err:
+            raise CannotConnect from err
+
+        login = (payload or {}).get("data") or {}
+        login_eco_ref = login.get("eco_ref")
+        if str((payload or {}).get("status")) != "1" or not login_eco_ref:
+            raise InvalidAuth
+
+        box = dict((login.get("conso") or {}).get("boite") or {})
+        if any(field not in box for field in _REQUIRED_BOX_FIELDS):
+            if device_task is None or login_eco_ref != eco_ref:
+                fetched = await _async_get_box(client, login_eco_ref)
+            else:
+                fetched = await device_task
+            box = {**fetched, **box}
+    finally:
+        if device_task is not None:
+            device_task.cancel()
+
+    return {
+        "title": "Ecobulles : " + (box.get("name") or "").strip(),
+        "user_id": login.get("userid"),
+        "eco_ref": login_eco_ref,
+        **_device_info_from_response({"data": {"boite": box}}),
+    }
+
+
+async def _async_get_box(client: EcobullesClient, eco_ref: str) -> dict[str, Any]:
+    """Return the box details from the device endpoint, or none on failure."""
+    try:
+        device_info_raw = await client.get_device_info(eco_ref)
+    except (TimeoutError, RuntimeError) as err:
+        _LOGGER.debug("Unable to fetch Ecobulles device info: %s", err)
+        return {}
+    return dict((device_info_raw or {}).get("data", {}).get("boite") or {})
 
 
 def _device_info_from_response(device_info_raw: dict[str, Any]) -> dict[str, Any]:
@@ -132,6 +210,11 @@ def _device_info_from_response(device_info_raw: dict[str, Any]) -> dict[str, Any
     }
 
 
+def _credentials_changed(current: Mapping[str, Any], new: dict[str, Any]) -> bool:
+    """Return whether submitted credentials differ from the stored ones."""
+    return any(current.get(key) != new.get(key) for key in (CONF_EMAIL, CONF_PASSWORD))
+
+
 def _isoish(value: str | None) -> str | None:
     """Normalize the API's date-ish strings."""
     return value.replace(" ", "T") if value else None
@@ -166,13 +249,7 @@ class ConfigFlow(BaseConfigFlow, domain=DOMAIN):  # type: ignore[call-arg]
                 errors["base"] = "unknown"
             else:
                 if info["title"]:
-                    client = EcobullesClient(self.hass)
-                    device_info_raw = await client.get_device_info(info["eco_ref"])
-                    entry_data = {
-                        **user_input,
-                        **info,
-                        **_device_info_from_response(device_info_raw or {}),
-                    }
+                    entry_data = {**user_input, **info}
                     entry_data.pop("title", None)
 
                     existing_entry = await self.async_set_unique_id(info["eco_ref"])
@@ -192,6 +269,16 @@ class ConfigFlow(BaseConfigFlow, domain=DOMAIN):  # type: ignore[call-arg]
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
         )
 
+    async def async_step_import(
+        self, import_data: dict[str, Any]
+    ) -> ConfigFlowResult:
+        """Create an entry for an account validated by the bulk import action."""
+        await self.async_set_unique_id(import_data["eco_ref"])
+        self._abort_if_unique_id_configured()
+        entry_data = {**import_data}
+        title = entry_data.pop("title")
+        return self.async_create_entry(title=title, data=entry_data)
+
     async def async_step_reauth(self, entry_data: dict[str, Any]) -> ConfigFlowResult:
         """Handle reauthentication."""
         return await self.async_step_reauth_confirm()
@@ -208,7 +295,9 @@ class ConfigFlow(BaseConfigFlow, domain=DOMAIN):  # type: ignore[call-arg]
         if user_input is not None:
             merged_data = {**entry.data, **user_input}
             try:
-                info = await validate_input(self.hass, merged_data)
+                info = await validate_input(
+                    self.hass, merged_data, entry.data.get("eco_ref")
+                )
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except InvalidAuth:
@@ -246,7 +335,9 @@ class ConfigFlow(BaseConfigFlow, domain=DOMAIN):  # type: ignore[call-arg]
         if user_input is not None:
             user_input = _flatten_advanced_options(user_input)
             try:
-                info = await validate_input(self.hass, user_input)
+                info = await validate_input(
+                    self.hass, user_input, entry.data.get("eco_ref")
+                )
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except InvalidAuth:
@@ -255,13 +346,7 @@ class ConfigFlow(BaseConfigFlow, domain=DOMAIN):  # type: ignore[call-arg]
                 if info["eco_ref"] != entry.data.get("eco_ref"):
                     errors["base"] = "different_device"
                 else:
-                    client = EcobullesClient(self.hass)
-                    device_info_raw = await client.get_device_info(info["eco_ref"])
-                    entry_data = {
-                        **user_input,
-                        **info,
-                        **_device_info_from_response(device_info_raw or {}),
-                    }
+                    entry_data = {**user_input, **info}
                     entry_data.pop("title", None)
                     self.hass.config_entries.async_update_entry(
                         entry, data=entry_data, title=info["title"]
@@ -284,9 +369,14 @@ class OptionsFlowHandler(OptionsFlowWithConfigEntry):
         errors: dict[str, str] = {}
         if user_input is not None:
             user_input = _flatten_advanced_options(user_input)
+            if not _credentials_changed(self.config_entry.data, user_input):
+                self._async_apply_local_options(user_input)
+                return self.async_create_entry(title="", data=None)
             # Validate user input
             try:
-                info = await validate_input(self.hass, user_input)
+                info = await validate_input(
+                    self.hass, user_input, self.config_entry.data.get("eco_ref")
+                )
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except InvalidAuth:
@@ -296,13 +386,7 @@ class OptionsFlowHandler(OptionsFlowWithConfigEntry):
                 errors["base"] = "unknown"
             else:
                 if info["title"]:
-                    client = EcobullesClient(self.hass)
-                    device_info_raw = await client.get_device_info(info["eco_ref"])
-                    entry_data = {
-                        **user_input,
-                        **info,
-                        **_device_info_from_response(device_info_raw or {}),
-                    }
+                    entry_data = {**user_input, **info}
                     # Ensure you're not storing 'title' in the entry data, as it was used just for entry naming
                     entry_data.pop("title", None)
                     options = {
@@ -337,6 +421,33 @@ class OptionsFlowHandler(OptionsFlowWithConfigEntry):
         options_schema = vol.Schema(options_schema_dict)
         return self.async_show_form(step_id="init", data_schema=options_schema)
 
+    @callback
+    def _async_apply_local_options(self, user_input: dict[str, Any]) -> None:
+        """Store changed settings and push them into the running entry.
+
+        Credentials are unchanged, so nothing needs the cloud or a reload.
+        """
+        entry = self.config_entry
+        entry_data = {**entry.data, **user_input}
+        raw_co2_enabled = bool(entry_data.pop(CONF_ENABLE_RAW_CO2_SENSOR, False))
+        raw_co2_changed = raw_co2_enabled != bool(
+            entry.options.get(CONF_ENABLE_RAW_CO2_SENSOR, False)
+        )
+        self.hass.config_entries.async_update_entry(
+            entry,
+            data=entry_data,
+            options={**entry.options, CONF_ENABLE_RAW_CO2_SENSOR: raw_co2_enabled},
+        )
+        if entry.state is not ConfigEntryState.LOADED:
+            return
+        entry.runtime_data.coordinator.async_apply_config(entry_data)
+        if raw_co2_changed:
+            async_dispatcher_send(
+                self.hass,
+                SIGNAL_RAW_CO2_SENSOR_TOGGLED.format(entry.entry_id),
+                raw_co2_enabled,
+            )
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
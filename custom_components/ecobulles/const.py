@@ -9,3 +9,15 @@ CONF_CO2_MIN_DOSE_MG_PER_L = "co2_min_dose_mg_per_l"
 CONF_CO2_MAX_DOSE_MG_PER_L = "co2_max_dose_mg_per_l"
 CONF_CO2_REFERENCE_PULSE_MS_PER_L = "co2_reference_pulse_ms_per_l"
 CONF_POLL_INTERVAL_SECONDS = "poll_interval_seconds"
+CONF_BOTTLE_CHANGE_CONFIRM_READINGS = "bottle_change_confirm_readings"
+CONF_BOTTLE_CHANGE_CONFIRM_MINUTES = "bottle_change_confirm_minutes"
+EVENT_WATER_DRAW = f"{DOMAIN}_water_draw"
+CONF_LEAK_CONTINUOUS_FLOW_MINUTES = "leak_continuous_flow_minutes"
+CONF_USE_FITTED_CO2_PULSE = "use_fitted_co2_pulse"
+CONF_ENABLE_METRICS_ENDPOINT = "enable_metrics_endpoint"
+# Dispatcher signal, formatted with the entry id, carrying the new raw CO2
+# sensor option so the sensor platform can add or remove the entity live.
+SIGNAL_RAW_CO2_SENSOR_TOGGLED = f"{DOMAIN}_raw_co2_sensor_toggled_{{}}"
+# Dispatcher signal, formatted with the eco_ref, carrying the new entry data
+# to sensors that read configured model parameters.
+SIGNAL_CONFIG_UPDATED = f"{DOMAIN}_config_updated_{{}}"
@@ -25,8 +25,24 @@ async def async_get_config_entry_diagnostics(
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
     coordinator_data: dict[str, Any] = {}
+    water_draws: list[dict[str, Any]] = []
+    api_metrics: dict[str, Any] = {}
+    recent_requests: list[dict[str, Any]] = []
+    event_loop: dict[str, Any] = {}
     if hasattr(entry, "runtime_data"):
-        coordinator_data = getattr(entry.runtime_data.coordinator, "data", {}) or {}
+        coordinator = entry.runtime_data.coordinator
+        coordinator_data = getattr(coordinator, "data", {}) or {}
+        water_draws = [
+            draw.as_event_data()
+            for draw in getattr(coordinator, "recent_water_draws", [])
+        ]
+        if (metrics := getattr(coordinator, "api_metrics", None)) is not None:
+            api_metrics = metrics.as_dict()
+        api = getattr(coordinator, "api", None)
+        if (recorder := getattr(api, "flight_recorder", None)) is not None:
+            recent_requests = recorder.as_list()
+        if (timer := getattr(coordinator, "phase_timer", None)) is not None:
+            event_loop = timer.as_dict()
 
     return {
         "entry": {
@@ -34,4 +50,8 @@ async def async_get_config_entry_diagnostics(
             "options": async_redact_data(dict(entry.options), TO_REDACT),
         },
         "coordinator": async_redact_data(dict(coordinator_data), TO_REDACT),
+        "water_draws": water_draws,
+        "api_metrics": api_metrics,
+        "recent_requests": recent_requests,
+        "event_loop": event_loop,
     }
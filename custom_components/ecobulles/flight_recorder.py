@@ -0,0 +1,79 @@
+"""Bounded log of recent Ecobulles cloud requests."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any
+
+# Request parameters whose values identify the account or device.
+REDACTED_PARAMS = frozenset(
+    {"email", "password", "eco_ref", "registrationId", "sand", "userid"}
+)
+REDACTED = "**REDACTED**"
+
+
+@dataclass(frozen=True, slots=True)
+class RequestRecord:
+    """One finished cloud request."""
+
+    endpoint: str
+    params: dict[str, Any]
+    started: datetime
+    duration_ms: float
+    status: int | None
+    size: int
+    outcome: str
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly copy."""
+        return {
+            **asdict(self),
+            "started": self.started.isoformat(),
+            "duration_ms": round(self.duration_ms, 1),
+        }
+
+
+class FlightRecorder:
+    """Keep the last `size` requests; appends are O(1) and never allocate more."""
+
+    def __init__(self, size: int = 50) -> None:
+        """Initialize an empty recorder."""
+        self._records: deque[RequestRecord] = deque(maxlen=size)
+
+    def record(
+        self,
+        endpoint: str,
+        params: dict[str, Any],
+        *,
+        started: datetime,
+        duration_ms: float,
+        status: int | None,
+        size: int,
+        outcome: str,
+    ) -> None:
+        """Append a request, redacting identifying parameters."""
+        self._records.append(
+            RequestRecord(
+                endpoint=endpoint,
+                params=redact_params(params),
+                started=started,
+                duration_ms=duration_ms,
+                status=status,
+                size=size,
+                outcome=outcome,
+            )
+        )
+
+    def as_list(self) -> list[dict[str, Any]]:
+        """Return the recorded requests, oldest first."""
+        return [record.as_dict() for record in self._records]
+
+
+def redact_params(params: dict[str, Any]) -> dict[str, Any]:
+    """Return request parameters with identifying values masked."""
+    return {
+        key: REDACTED if key in REDACTED_PARAMS else value
+        for key, value in params.items()
+    }
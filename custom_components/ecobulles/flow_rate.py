@@ -0,0 +1,81 @@
+"""Pure helpers for Ecobulles water flow rate estimation."""
+
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timedelta
+
+
+class FlowRateTracker:
+    """Derive flow rates from consecutive cumulative water readings.
+
+    Samples are kept in a bounded ring buffer. Each new sample evicts the ones
+    that fell out of the rolling window, so updates stay O(1) amortised and
+    memory stays bounded regardless of the polling interval.
+
+    A box that stops reporting is not drawing water, so once the last reading
+    is older than `stale_after` the instant rate drops to 0 and the rolling
+    rate decays as if the counter had stayed flat since that reading.
+    """
+
+    def __init__(
+        self,
+        window: timedelta = timedelta(minutes=15),
+        capacity: int = 64,
+        stale_after: timedelta = timedelta(minutes=2),
+    ) -> None:
+        """Initialize an empty tracker."""
+        self.window_seconds = window.total_seconds()
+        self.stale_after_seconds = stale_after.total_seconds()
+        self._samples: deque[tuple[float, int]] = deque(maxlen=capacity)
+
+    def add_sample(self, timestamp: datetime, total_liters: int) -> None:
+        """Record a cumulative water reading."""
+        seconds = timestamp.timestamp()
+        if self._samples:
+            last_seconds, last_liters = self._samples[-1]
+            if seconds <= last_seconds:
+                return
+            if total_liters < last_liters:
+                self._samples.clear()
+
+        self._samples.append((seconds, total_liters))
+        # Keep one sample at or before the window start as the rolling baseline.
+        while (
+            len(self._samples) > 2
+            and seconds - self._samples[1][0] >= self.window_seconds
+        ):
+            self._samples.popleft()
+
+    def instant_rate_l_per_min(self, now: datetime) -> float | None:
+        """Return the flow rate between the last two readings."""
+        if len(self._samples) < 2:
+            return None
+        if self._is_stale(now):
+            return 0.0
+        return _rate(self._samples[-2], self._samples[-1])
+
+    def rolling_rate_l_per_min(self, now: datetime) -> float | None:
+        """Return the average flow rate over the rolling window."""
+        if len(self._samples) < 2:
+            return None
+        if not self._is_stale(now):
+            return _rate(self._samples[0], self._samples[-1])
+
+        # Extend the counter flat up to now and average over the window again.
+        seconds = now.timestamp()
+        baseline = self._samples[0]
+        for sample in self._samples:
+            if seconds - sample[0] < self.window_seconds:
+                break
+            baseline = sample
+        return _rate(baseline, (seconds, self._samples[-1][1]))
+
+    def _is_stale(self, now: datetime) -> bool:
+        """Return whether the last reading is too old to describe the flow."""
+        return now.timestamp() - self._samples[-1][0] > self.stale_after_seconds
+
+
+def _rate(start: tuple[float, int], end: tuple[float, int]) -> float:
+    """Return liters per minute between two samples."""
+    return round((end[1] - start[1]) / ((end[0] - start[0]) / 60), 3)
@@ -0,0 +1,197 @@
+"""Pure helpers for fetching Ecobulles usage history by time window."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any
+
+HISTORY_ENDPOINT = "getConsoBoiteItemAppFilter.php"
+API_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_GRAPH_DATETIME_FORMATS = ("%Y/%m/%d %H:%M:%S", API_DATETIME_FORMAT)
+# Column layout of a Home Assistant history CSV export, as read by
+# scripts/analyze_co2_raw_history.py.
+EXPORT_COLUMNS = ("entity_id", "state", "last_changed")
+
+
+@dataclass(frozen=True, slots=True)
+class UsageWindow:
+    """Water and raw CO2 reported by the cloud for one time window.
+
+    Times are the naive local times the Ecobulles cloud works in.
+    """
+
+    start: datetime
+    stop: datetime
+    water_liters: int
+    raw_co2: int
+    api_total_water: int = 0
+    api_total_co2: int = 0
+    graph_points: int = 0
+    sample_time: datetime | None = None
+
+    def as_row(self) -> list[Any]:
+        """Return a compact row for the history cache."""
+        return [
+            self.stop.isoformat(),
+            self.water_liters,
+            self.raw_co2,
+            self.api_total_water,
+            self.api_total_co2,
+            self.graph_points,
+            self.sample_time.isoformat() if self.sample_time else None,
+        ]
+
+    @classmethod
+    def from_row(cls, start: str, row: list[Any]) -> "UsageWindow":
+        """Restore a window from a history cache row."""
+        stop, water, raw_co2, total_water, total_co2, points, sample_time = row
+        return cls(
+            start=datetime.fromisoformat(start),
+            stop=datetime.fromisoformat(stop),
+            water_liters=int(water),
+            raw_co2=int(raw_co2),
+            api_total_water=int(total_water),
+            api_total_co2=int(total_co2),
+            graph_points=int(points),
+            sample_time=datetime.fromisoformat(sample_time) if sample_time else None,
+        )
+
+
+def history_request_payload(
+    eco_ref: str, start: datetime, stop: datetime
+) -> dict[str, str]:
+    """Return the form payload requesting one history window."""
+    return {
+        "eco_ref": eco_ref,
+        "eau": "1",
+        "startdate": start.strftime(API_DATETIME_FORMAT),
+        "stopdate": stop.strftime(API_DATETIME_FORMAT),
+    }
+
+
+def parse_usage_window(
+    content: dict[str, Any] | None, start: datetime, stop: datetime
+) -> UsageWindow | None:
+    """Parse a history response the same way the analysis scripts do.
+
+    Graph points are summed when present; otherwise the window totals are
+    used. Returns None for a missing payload.
+    """
+    if content is None:
+        return None
+    infoconso = content.get("data", {}).get("infoconso", {}) or {}
+    api_total_water = int(float(infoconso.get("total_eau") or 0))
+    api_total_co2 = int(float(infoconso.get("total_gas") or 0))
+    graph = infoconso.get("graph") or []
+    graph_water = graph_co2 = 0
+    sample_time = stop
+    for point in graph:
+        graph_water += int(
+            float(point.get("water") or point.get("eau") or point.get("total_eau") or 0)
+        )
+        graph_co2 += int(
+            float(
+                point.get("gas")
+                or point.get("gaz")
+                or point.get("co2")
+                or point.get("total_gas")
+                or 0
+            )
+        )
+        if point.get("date"):
+            sample_time = _parse_graph_date(point["date"]) or sample_time
+
+    return UsageWindow(
+        start=start,
+        stop=stop,
+        water_liters=graph_water if graph else api_total_water,
+        raw_co2=graph_co2 if graph else api_total_co2,
+        api_total_water=api_total_water,
+        api_total_co2=api_total_co2,
+        graph_points=len(graph),
+        sample_time=sample_time,
+    )
+
+
+@dataclass(slots=True)
+class HistoryCsvExport:
+    """Turn consecutive usage windows into history CSV rows.
+
+    Each window becomes one water and one raw CO2 row stamped at the window
+    stop, carrying running totals from the start of the export, so the file
+    reads like a Home Assistant history export of the two sensors.
+    """
+
+    water_entity_id: str
+    co2_entity_id: str
+    time_zone: tzinfo
+    water_total: int = 0
+    co2_total: int = 0
+    rows_written: int = 0
+    _started: bool = field(default=False, repr=False)
+
+    def rows(self, window: UsageWindow) -> list[list[str]]:
+        """Return the CSV rows for the next window."""
+        rows: list[list[str]] = []
+        if not self._started:
+            self._started = True
+            rows.extend(self._rows_at(window.start))
+        self.water_total += window.water_liters
+        self.co2_total += window.raw_co2
+        rows.extend(self._rows_at(window.stop))
+        self.rows_written += len(rows)
+        return rows
+
+    def _rows_at(self, when: datetime) -> list[list[str]]:
+        last_changed = (
+            when.replace(tzinfo=self.time_zone)
+            .astimezone(timezone.utc)
+            .isoformat()
+            .replace("+00:00", "Z")
+        )
+        return [
+            [self.water_entity_id, str(self.water_total), last_changed],
+            [self.co2_entity_id, str(self.co2_total), last_changed],
+        ]
+
+
+@dataclass(slots=True)
+class HistoryCacheStats:
+    """Windows a backfill found in the history cache versus had to fetch."""
+
+    hits: int = 0
+    misses: int = 0
+
+    def record(self, hits: int, misses: int) -> None:
+        """Add the outcome of one backfill run."""
+        self.hits += hits
+        self.misses += misses
+
+    @property
+    def hit_ratio(self) -> float | None:
+        """Return the share of windows served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+
+def iter_windows(
+    start: datetime, stop: datetime, size: timedelta
+) -> Iterator[tuple[datetime, datetime]]:
+    """Yield adjacent windows of `size` covering `[start, stop)`."""
+    current = start
+    while current < stop:
+        next_stop = min(current + size, stop)
+        yield current, next_stop
+        current = next_stop
+
+
+def _parse_graph_date(value: str) -> datetime | None:
+    """Parse a graph point date in either format the cloud uses."""
+    for date_format in _GRAPH_DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
@@ -0,0 +1,53 @@
+"""HTTP API for Ecobulles."""
+
+from __future__ import annotations
+
+from http import HTTPStatus
+
+from aiohttp import web
+
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
+
+from .api import API_RATE_LIMITER
+from .const import CONF_ENABLE_METRICS_ENDPOINT, DOMAIN
+from .openmetrics import CONTENT_TYPE, render_metrics
+
+METRICS_URL = f"/api/{DOMAIN}/metrics"
+
+
+@callback
+def async_register_http_views(hass: HomeAssistant) -> None:
+    """Register the Ecobulles HTTP views."""
+    hass.http.register_view(EcobullesMetricsView())
+
+
+class EcobullesMetricsView(HomeAssistantView):
+    """Serve integration internals in Prometheus text format.
+
+    Only entries with the metrics endpoint option enabled are exported; with
+    none enabled the endpoint answers 404. Requests need a Home Assistant
+    access token, as for the rest of the REST API.
+    """
+
+    url = METRICS_URL
+    name = f"api:{DOMAIN}:metrics"
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the metrics of every enabled, loaded entry."""
+        hass = request.app[KEY_HASS]
+        coordinators = [
+            entry.runtime_data.coordinator
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.state is ConfigEntryState.LOADED
+            and entry.runtime_data.coordinator.config.get(CONF_ENABLE_METRICS_ENDPOINT)
+        ]
+        if not coordinators:
+            return self.json_message(
+                "Ecobulles metrics endpoint is disabled", HTTPStatus.NOT_FOUND
+            )
+        return web.Response(
+            body=render_metrics(coordinators, API_RATE_LIMITER).encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
@@ -0,0 +1,125 @@
+"""Pure helpers for streaming water leak detection."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+@dataclass(frozen=True, slots=True)
+class LeakStatus:
+    """Outcome of the leak detector after the latest sample."""
+
+    continuous_flow: bool = False
+    overnight_flow: bool = False
+    continuous_flow_minutes: float = 0.0
+
+    @property
+    def detected(self) -> bool:
+        """Return whether any leak criterion is currently met."""
+        return self.continuous_flow or self.overnight_flow
+
+
+class LeakDetector:
+    """Flag suspicious water usage from cumulative counter readings.
+
+    Two criteria are evaluated on every sample in constant time:
+
+    * continuous flow: water was drawn in every interval for at least
+      `continuous_flow` (disabled when zero);
+    * overnight flow: during night hours, each of the last completed buckets
+      of the sliding night window recorded some water, which catches slow
+      steady leaks too small to show up in every polling interval. Only
+      buckets inside the night hours count, and a detected overnight flow
+      stays latched, past the end of the night, until a whole bucket goes
+      by without water.
+
+    Timestamps must be timezone-aware local times so night hours match the
+    user's clock.
+    """
+
+    def __init__(
+        self,
+        continuous_flow: timedelta = timedelta(minutes=60),
+        night_hours: tuple[int, int] = (1, 5),
+        night_window: timedelta = timedelta(hours=2),
+        night_bucket: timedelta = timedelta(minutes=30),
+    ) -> None:
+        """Initialize the detector."""
+        self.continuous_flow_seconds = continuous_flow.total_seconds()
+        self.night_hours = night_hours
+        self._bucket_seconds = night_bucket.total_seconds()
+        self._window_buckets = max(1, int(night_window / night_bucket))
+        # Fixed-size ring of (bucket index, liters): the completed buckets of
+        # the night window plus the bucket currently being filled.
+        self._buckets: list[tuple[int, int]] = [(-1, 0)] * (self._window_buckets + 1)
+        self._last: tuple[float, int] | None = None
+        self._flow_since: float | None = None
+        self._overnight = False
+        self.status = LeakStatus()
+
+    def add_sample(self, timestamp: datetime, total_liters: int) -> LeakStatus:
+        """Feed a cumulative water reading and return the updated status."""
+        seconds = timestamp.timestamp()
+        last = self._last
+        if last is not None and seconds <= last[0]:
+            return self.status
+        self._last = (seconds, total_liters)
+        if last is None:
+            return self.status
+
+        liters = max(0, total_liters - last[1])
+        if liters:
+            if self._flow_since is None:
+                self._flow_since = last[0]
+            bucket = int(seconds // self._bucket_seconds)
+            slot = bucket % len(self._buckets)
+            previous_bucket, previous_liters = self._buckets[slot]
+            self._buckets[slot] = (
+                bucket,
+                liters + (previous_liters if previous_bucket == bucket else 0),
+            )
+        else:
+            self._flow_since = None
+
+        flow_seconds = 0.0 if self._flow_since is None else seconds - self._flow_since
+        self.status = LeakStatus(
+            continuous_flow=(
+                self.continuous_flow_seconds > 0
+                and flow_seconds >= self.continuous_flow_seconds
+            ),
+            overnight_flow=self._update_overnight_flow(timestamp, seconds),
+            continuous_flow_minutes=round(flow_seconds / 60, 1),
+        )
+        return self.status
+
+    def _update_overnight_flow(self, timestamp: datetime, seconds: float) -> bool:
+        """Latch or clear the overnight flow criterion and return it."""
+        current = int(seconds // self._bucket_seconds)
+        if self._overnight:
+            self._overnight = self._has_water(current - 1)
+        else:
+            self._overnight = self._overnight_window_full(timestamp, current)
+        return self._overnight
+
+    def _overnight_window_full(self, timestamp: datetime, current: int) -> bool:
+        """Return whether every completed bucket of the night window had water.
+
+        Buckets starting outside the night hours do not count, so evening use
+        just before the night starts is not mistaken for a leak.
+        """
+        start_hour, end_hour = self.night_hours
+        for bucket in range(current - self._window_buckets, current):
+            bucket_start = datetime.fromtimestamp(
+                bucket * self._bucket_seconds, timestamp.tzinfo
+            )
+            if not start_hour <= bucket_start.hour < end_hour:
+                return False
+            if not self._has_water(bucket):
+                return False
+        return True
+
+    def _has_water(self, bucket: int) -> bool:
+        """Return whether some water was drawn during a bucket."""
+        stored_bucket, liters = self._buckets[bucket % len(self._buckets)]
+        return stored_bucket == bucket and liters > 0
@@ -0,0 +1,268 @@
+"""Prometheus text exposition of Ecobulles internals."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any
+
+from .api_metrics import LATENCY_BUCKETS_MS, LatencyHistogram
+from .rate_limit import RateLimiter
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Coordinator data keys exported as gauges, with their metric name and help.
+_DATA_GAUGES = (
+    (
+        "total_eau",
+        "ecobulles_cloud_water_counter_liters",
+        "Water counter reported by the cloud for the current CO2 bottle.",
+    ),
+    (
+        "total_gas",
+        "ecobulles_cloud_co2_counter",
+        "Raw CO2 counter reported by the cloud for the current CO2 bottle.",
+    ),
+    (
+        "refresh_duration_ms",
+        "ecobulles_last_refresh_duration_seconds",
+        "Wall time of the last coordinator refresh.",
+    ),
+    (
+        "refresh_bytes",
+        "ecobulles_last_refresh_bytes",
+        "Response bytes received during the last refresh.",
+    ),
+)
+# Coordinator data keys exported as counters.
+_DATA_COUNTERS = (
+    (
+        "total_water_liters",
+        "ecobulles_water_liters_total",
+        "Water treated since the integration started counting.",
+    ),
+    (
+        "total_gas_ms",
+        "ecobulles_co2_injection_milliseconds_total",
+        "CO2 valve-open time since the integration started counting.",
+    ),
+    (
+        "bottle_changes",
+        "ecobulles_bottle_changes_total",
+        "CO2 bottle changes detected.",
+    ),
+    (
+        "gas_counter_resets",
+        "ecobulles_gas_counter_resets_total",
+        "CO2 gas counter resets detected.",
+    ),
+)
+_MILLISECOND_KEYS = {"refresh_duration_ms"}
+
+
+class MetricsWriter:
+    """Collect samples per metric family and render them in text format.
+
+    Samples of one family must be contiguous in the output, so they are
+    grouped by name whatever order devices add them in.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty writer."""
+        self._families: dict[str, tuple[str, str, list[str]]] = {}
+
+    def add(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        value: float | None,
+        labels: dict[str, str] | None = None,
+        *,
+        suffix: str = "",
+    ) -> None:
+        """Add one sample; None values are left out."""
+        family = self._families.setdefault(name, (kind, help_text, []))
+        if value is not None:
+            family[2].append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+    def add_histogram(
+        self,
+        name: str,
+        help_text: str,
+        histogram: LatencyHistogram,
+        labels: dict[str, str],
+    ) -> None:
+        """Add a millisecond latency histogram as cumulative second buckets."""
+        cumulative = 0
+        for bound, count in zip(
+            [*(str(bound / 1000) for bound in LATENCY_BUCKETS_MS), "+Inf"],
+            histogram.counts,
+            strict=True,
+        ):
+            cumulative += count
+            self.add(
+                name,
+                "histogram",
+                help_text,
+                cumulative,
+                {**labels, "le": bound},
+                suffix="_bucket",
+            )
+        self.add(
+            name,
+            "histogram",
+            help_text,
+            histogram.sum_ms / 1000,
+            labels,
+            suffix="_sum",
+        )
+        self.add(
+            name, "histogram", help_text, histogram.count, labels, suffix="_count"
+        )
+
+    def render(self) -> str:
+        """Return the exposition text."""
+        lines: list[str] = []
+        for name, (kind, help_text, samples) in self._families.items():
+            if samples:
+                lines.extend(
+                    (f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *samples)
+                )
+        return "\n".join(lines) + "\n"
+
+
+def render_metrics(coordinators: Iterable[Any], limiter: RateLimiter) -> str:
+    """Return the metrics of every given coordinator in Prometheus text format."""
+    writer = MetricsWriter()
+    writer.add(
+        "ecobulles_rate_limiter_acquisitions_total",
+        "counter",
+        "History requests admitted by the shared rate limiter.",
+        limiter.acquisitions,
+    )
+    writer.add(
+        "ecobulles_rate_limiter_waits_total",
+        "counter",
+        "History requests that had to wait for the shared rate limiter.",
+        limiter.waits,
+    )
+    writer.add(
+        "ecobulles_rate_limiter_wait_seconds_total",
+        "counter",
+        "Time history requests spent waiting for the shared rate limiter.",
+        limiter.wait_seconds,
+    )
+    for coordinator in coordinators:
+        _add_coordinator(writer, coordinator)
+    return writer.render()
+
+
+def _add_coordinator(writer: MetricsWriter, coordinator: Any) -> None:
+    """Add the samples of one device."""
+    device = {"eco_ref": coordinator.eco_ref}
+    for endpoint, stats in sorted(coordinator.api_metrics.endpoints.items()):
+        labels = {**device, "endpoint": endpoint}
+        writer.add(
+            "ecobulles_requests_total",
+            "counter",
+            "Cloud requests sent.",
+            stats.latency.count,
+            labels,
+        )
+        writer.add(
+            "ecobulles_request_errors_total",
+            "counter",
+            "Cloud requests that failed or returned no data.",
+            stats.errors,
+            labels,
+        )
+        writer.add(
+            "ecobulles_response_bytes_total",
+            "counter",
+            "Response bytes received from the cloud.",
+            stats.bytes_total,
+            labels,
+        )
+        writer.add(
+            "ecobulles_response_decode_seconds_total",
+            "counter",
+            "Time spent decoding cloud JSON responses.",
+            stats.decode_ms_total / 1000,
+            labels,
+        )
+        writer.add_histogram(
+            "ecobulles_request_duration_seconds",
+            "Cloud request latency.",
+            stats.latency,
+            labels,
+        )
+
+    cache = coordinator.history_cache
+    writer.add(
+        "ecobulles_history_cache_hits_total",
+        "counter",
+        "History windows a backfill found in the local cache.",
+        cache.hits,
+        device,
+    )
+    writer.add(
+        "ecobulles_history_cache_misses_total",
+        "counter",
+        "History windows a backfill had to fetch from the cloud.",
+        cache.misses,
+        device,
+    )
+    writer.add(
+        "ecobulles_history_cache_hit_ratio",
+        "gauge",
+        "Share of backfilled history windows served from the local cache.",
+        cache.hit_ratio,
+        device,
+    )
+    writer.add(
+        "ecobulles_event_loop_seconds_total",
+        "counter",
+        "Event-loop time used by the synchronous refresh sections.",
+        coordinator.phase_timer.loop_ms_total / 1000,
+        device,
+    )
+    writer.add(
+        "ecobulles_last_refresh_success",
+        "gauge",
+        "Whether the last coordinator refresh succeeded.",
+        int(coordinator.last_update_success),
+        device,
+    )
+
+    data = coordinator.data or {}
+    for key, name, help_text in _DATA_GAUGES:
+        value = data.get(key)
+        if value is not None and key in _MILLISECOND_KEYS:
+            value /= 1000
+        writer.add(name, "gauge", help_text, value, device)
+    for key, name, help_text in _DATA_COUNTERS:
+        writer.add(name, "counter", help_text, data.get(key), device)
+
+
+def _labels(labels: dict[str, str] | None) -> str:
+    """Return a label set with escaped values."""
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{key}="{_escape(str(value))}"' for key, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _number(value: float) -> str:
+    """Format a sample value."""
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
@@ -0,0 +1,101 @@
+"""Pure helpers for hourly, daily, weekly and monthly usage totals."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+PERIODS = ("hour", "day", "week", "month")
+
+
+def period_start(period: str, timestamp: datetime) -> datetime:
+    """Return the local start of the period containing `timestamp`."""
+    hour = timestamp.replace(minute=0, second=0, microsecond=0)
+    if period == "hour":
+        return hour
+    day = hour.replace(hour=0)
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+@dataclass(slots=True)
+class PeriodTotals:
+    """Water and gas drawn since the start of one period."""
+
+    start: str | None = None
+    water_liters: float = 0.0
+    gas_ms: float = 0.0
+
+
+@dataclass(slots=True)
+class PeriodUsageRollup:
+    """Running water and gas totals for the current hour, day, week and month.
+
+    Each sample resets a period when it falls in a new one and then adds its
+    counter delta to every period, so an update costs O(1). The delta since
+    the previous sample is credited to the period the sample falls in, so no
+    usage is lost at a boundary. Timestamps must be timezone-aware local
+    times so periods roll over at local midnight.
+    """
+
+    periods: dict[str, PeriodTotals] = field(
+        default_factory=lambda: {period: PeriodTotals() for period in PERIODS}
+    )
+    last_liters: float | None = None
+    last_gas_ms: float | None = None
+
+    def add_sample(
+        self, timestamp: datetime, total_liters: float, total_gas_ms: float
+    ) -> None:
+        """Feed lifetime totals observed at a local time."""
+        water = gas = 0.0
+        if self.last_liters is not None and self.last_gas_ms is not None:
+            water = max(0.0, total_liters - self.last_liters)
+            gas = max(0.0, total_gas_ms - self.last_gas_ms)
+        self.last_liters, self.last_gas_ms = total_liters, total_gas_ms
+
+        for period, totals in self.periods.items():
+            start = period_start(period, timestamp).isoformat()
+            if totals.start != start:
+                totals.start = start
+                totals.water_liters = totals.gas_ms = 0.0
+            totals.water_liters += water
+            totals.gas_ms += gas
+
+    def as_dict(self) -> dict[str, Any]:
+        """Serialize the rollup for storage."""
+        return {
+            "periods": {
+                period: {
+                    "start": totals.start,
+                    "water_liters": totals.water_liters,
+                    "gas_ms": totals.gas_ms,
+                }
+                for period, totals in self.periods.items()
+            },
+            "last_liters": self.last_liters,
+            "last_gas_ms": self.last_gas_ms,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any] | None) -> "PeriodUsageRollup":
+        """Restore the rollup from storage."""
+        raw = raw or {}
+        rollup = cls(
+            last_liters=raw.get("last_liters"),
+            last_gas_ms=raw.get("last_gas_ms"),
+        )
+        for period, stored in (raw.get("periods") or {}).items():
+            if period in rollup.periods:
+                rollup.periods[period] = PeriodTotals(
+                    start=stored.get("start"),
+                    water_liters=float(stored.get("water_liters", 0.0)),
+                    gas_ms=float(stored.get("gas_ms", 0.0)),
+                )
+        return rollup
@@ -0,0 +1,200 @@
+"""Refresh phase timing and profiling reports for Ecobulles."""
+
+from __future__ import annotations
+
+from collections import deque
+from copy import deepcopy
+import cProfile
+from dataclasses import dataclass
+from datetime import UTC, datetime
+import io
+import logging
+import pstats
+from time import perf_counter
+import tracemalloc
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# Phases of a coordinator refresh, in execution order.
+PHASE_FETCH = "fetch"
+PHASE_PARSE = "parse"
+PHASE_WATER_ACCOUNTING = "water_accounting"
+PHASE_SERIALIZE = "serialize"
+PHASE_STORE_SAVE = "store_save"
+PHASE_ENTITY_WRITES = "entity_writes"
+PHASES = (
+    PHASE_FETCH,
+    PHASE_PARSE,
+    PHASE_WATER_ACCOUNTING,
+    PHASE_SERIALIZE,
+    PHASE_STORE_SAVE,
+    PHASE_ENTITY_WRITES,
+)
+# Phases that run without awaiting, so their whole duration blocks the loop.
+LOOP_PHASES = frozenset(
+    {PHASE_PARSE, PHASE_WATER_ACCOUNTING, PHASE_SERIALIZE, PHASE_ENTITY_WRITES}
+)
+# Synchronous sections longer than this are logged and kept as slow sections.
+SLOW_SECTION_MS = 50.0
+SLOW_SECTIONS_KEPT = 20
+
+
+@dataclass(frozen=True, slots=True)
+class SlowSection:
+    """One synchronous section that held the event loop too long."""
+
+    phase: str
+    at: datetime
+    duration_ms: float
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly representation."""
+        return {
+            "phase": self.phase,
+            "at": self.at.isoformat(),
+            "duration_ms": round(self.duration_ms, 1),
+        }
+
+
+class PhaseTimer:
+    """Wall time spent in the named phases of the latest refresh.
+
+    Phases are closed with `lap()`, which charges the time since the previous
+    mark; a phase lapped twice accumulates both sections. Laps of loop phases
+    also add to a running total of event-loop time, and a single lap above
+    the threshold is logged and kept as a slow section.
+    """
+
+    def __init__(self, name: str = "", threshold_ms: float = SLOW_SECTION_MS) -> None:
+        """Initialize an empty timer."""
+        self.name = name
+        self.threshold_ms = threshold_ms
+        self.phases: dict[str, float] = {}
+        self.loop_ms: dict[str, float] = {}
+        self.slow_sections: deque[SlowSection] = deque(maxlen=SLOW_SECTIONS_KEPT)
+        self._mark = perf_counter()
+
+    @property
+    def loop_ms_total(self) -> float:
+        """Return the event-loop time used since the timer was created."""
+        return sum(self.loop_ms.values())
+
+    def start(self) -> None:
+        """Forget the previous refresh and start timing a new one."""
+        self.phases = {}
+        self._mark = perf_counter()
+
+    def resume(self) -> None:
+        """Start timing a section that follows untimed work."""
+        self._mark = perf_counter()
+
+    def lap(self, phase: str) -> float:
+        """Charge the time since the last mark to a phase, in milliseconds."""
+        now = perf_counter()
+        elapsed_ms = (now - self._mark) * 1000
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed_ms
+        self._mark = now
+        if phase in LOOP_PHASES:
+            self.loop_ms[phase] = self.loop_ms.get(phase, 0.0) + elapsed_ms
+            if elapsed_ms > self.threshold_ms:
+                self.slow_sections.append(
+                    SlowSection(phase, datetime.now(UTC), elapsed_ms)
+                )
+                _LOGGER.warning(
+                    "Ecobulles %s held the event loop for %.0f ms in %s",
+                    self.name,
+                    elapsed_ms,
+                    phase,
+                )
+        return elapsed_ms
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return event-loop usage for diagnostics."""
+        return {
+            "threshold_ms": self.threshold_ms,
+            "loop_ms_total": round(self.loop_ms_total, 3),
+            "loop_ms": {phase: round(ms, 3) for phase, ms in self.loop_ms.items()},
+            "last_refresh_ms": {
+                phase: round(ms, 3) for phase, ms in self.phases.items()
+            },
+            "slow_sections": [section.as_dict() for section in self.slow_sections],
+        }
+
+
+class ReplayClient:
+    """Client stand-in serving the payloads of an earlier refresh.
+
+    Everything else, such as request metrics, is delegated to the real client
+    so a replayed refresh runs the same code path without cloud requests.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        usage: dict[str, Any],
+        device: dict[str, Any],
+        login_payload: dict[str, Any] | None,
+    ) -> None:
+        """Initialize the replay client."""
+        self._client = client
+        self._usage = usage
+        self._device = device
+        self._login_payload = login_payload
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate everything that is not replayed to the real client."""
+        return getattr(self._client, name)
+
+    async def get_total_water_and_co2_usage(self, eco_ref: str) -> dict[str, Any]:
+        """Return a copy of the recorded usage payload."""
+        return deepcopy(self._usage)
+
+    async def get_device_info(self, eco_ref: str) -> dict[str, Any]:
+        """Return a copy of the recorded device payload."""
+        return deepcopy(self._device)
+
+    async def get_login_payload(
+        self, email: str, password: str
+    ) -> dict[str, Any] | None:
+        """Return a copy of the recorded login payload."""
+        return deepcopy(self._login_payload)
+
+
+def format_profile_report(
+    title: str,
+    phases: dict[str, float],
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    *,
+    top_functions: int = 40,
+    top_allocations: int = 25,
+) -> str:
+    """Return the text report of a profiling run.
+
+    The report lists the mean wall time per phase, the functions sorted by
+    cumulative time and the source lines holding the most allocated memory.
+    """
+    buffer = io.StringIO()
+    buffer.write(
+        f"{title}\n"
+        "The profiler stays enabled while a refresh awaits, so it also records "
+        "other tasks run by the event loop meanwhile.\n"
+        "\nWall time per phase (mean per refresh):\n"
+    )
+    for phase, duration_ms in phases.items():
+        buffer.write(f"  {phase:<20}{duration_ms:>12.3f} ms\n")
+    buffer.write("\nFunctions by cumulative time:\n")
+    pstats.Stats(profiler, stream=buffer).sort_stats(
+        pstats.SortKey.CUMULATIVE
+    ).print_stats(top_functions)
+    buffer.write(f"Top {top_allocations} allocation sites:\n")
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+    )
+    for statistic in snapshot.statistics("lineno")[:top_allocations]:
+        buffer.write(f"  {statistic}\n")
+    return buffer.getvalue()
@@ -0,0 +1,69 @@
+"""Async rate limiting for Ecobulles cloud requests."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import time
+from types import TracebackType
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second with bursts of `burst`.
+
+    Callers wait in arrival order, so concurrent fetches are spread out evenly
+    instead of hitting the cloud at once. Acquisitions, waits and the time
+    spent waiting are counted for the metrics endpoint.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        """Initialize a full bucket."""
+        if rate <= 0 or burst < 1:
+            raise ValueError("Rate and burst must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        queued = self._clock()
+        async with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                await self._sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._updated = self._clock()
+                self.waits += 1
+            self._tokens -= 1
+            self.acquisitions += 1
+            self.wait_seconds += self._updated - queued
+
+    async def __aenter__(self) -> None:
+        """Acquire a token."""
+        await self.acquire()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Nothing to release; tokens refill over time."""
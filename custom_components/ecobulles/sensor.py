@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+from copy import deepcopy
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import asyncio
 import logging
+from time import perf_counter
 from typing import Any, Callable
 
 import async_timeout
@@ -16,21 +18,39 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
-from homeassistant.const import EntityCategory, PERCENTAGE, UnitOfTime, UnitOfVolume
+from homeassistant.const import (
+    EntityCategory,
+    PERCENTAGE,
+    UnitOfInformation,
+    UnitOfTime,
+    UnitOfVolume,
+    UnitOfVolumeFlowRate,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
-from homeassistant.helpers import issue_registry as ir
+from homeassistant.helpers import (
+    device_registry as dr,
+    entity_registry as er,
+    issue_registry as ir,
+)
 from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
     UpdateFailed,
 )
-from homeassistant.util.dt import as_utc, parse_datetime
+from homeassistant.util.dt import as_local, as_utc, parse_datetime, utcnow
 
 from .api import EcobullesClient
+from .api_metrics import ApiMetrics, tally_requests
 from .const import (
+    CONF_BOTTLE_CHANGE_CONFIRM_MINUTES,
+    CONF_BOTTLE_CHANGE_CONFIRM_READINGS,
     CONF_CO2_BOTTLE_WEIGHT_KG,
     CONF_CO2_MAX_DOSE_MG_PER_L,
     CONF_CO2_MICROMETRIC_SCREW_SETTING,
@@ -38,15 +58,42 @@ from .const import (
     CONF_CO2_PRESSURE_BAR,
     CONF_CO2_REFERENCE_PULSE_MS_PER_L,
     CONF_ENABLE_RAW_CO2_SENSOR,
+    CONF_LEAK_CONTINUOUS_FLOW_MINUTES,
     CONF_POLL_INTERVAL_SECONDS,
+    CONF_USE_FITTED_CO2_PULSE,
     DOMAIN,
+    EVENT_WATER_DRAW,
+    SIGNAL_CONFIG_UPDATED,
+    SIGNAL_RAW_CO2_SENSOR_TOGGLED,
+)
+from .co2_dose import DoseCalibration, DoseDriftDetector
+from .device import model_from_serial_number
+from .co2_forecast import GasConsumptionRegression
+from .flow_rate import FlowRateTracker
+from .history import HistoryCacheStats
+from .leak_detection import LeakDetector
+from .period_usage import PERIODS, PeriodUsageRollup
+from .profiling import (
+    PHASE_ENTITY_WRITES,
+    PHASE_FETCH,
+    PHASE_PARSE,
+    PHASE_SERIALIZE,
+    PHASE_STORE_SAVE,
+    PHASE_WATER_ACCOUNTING,
+    PhaseTimer,
 )
+from .usage_history import UsageHistoryIndex
+from .water_forecast import WaterUsageProfile
+from .water_draws import WaterDraw, WaterDrawSegmenter
 from .water_usage import WaterUsageState
 
 _LOGGER = logging.getLogger(__name__)
 STORAGE_VERSION = 1
 PARALLEL_UPDATES = 0
 REPAIR_ISSUE_API_PAYLOAD_INCOMPLETE = "api_payload_incomplete"
+REPAIR_ISSUE_WATER_LEAK = "water_leak"
+# Minimum time between two writes of polled box metadata to the registries.
+DEVICE_METADATA_SYNC_INTERVAL = timedelta(minutes=30)
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -54,6 +101,40 @@ class EcobullesSensorDescription(SensorEntityDescription):
     """Describe an Ecobulles sensor."""
 
     value_fn: Callable[[dict[str, Any]], Any]
+    attributes_fn: Callable[[dict[str, Any]], dict[str, Any]] = lambda data: {}
+    last_reset_fn: Callable[[dict[str, Any]], datetime | None] | None = None
+
+
+def _ms_to_seconds(value: float | None) -> float | None:
+    """Convert a millisecond gas counter to seconds."""
+    if value is None:
+        return None
+    return round(int(value) / 1000, 3)
+
+
+def _period_value_fn(
+    period: str,
+    key: str,
+    convert: Callable[[float | None], float | None] = lambda value: value,
+) -> Callable[[dict[str, Any]], float | None]:
+    """Build a value function reading one period total from the rollup."""
+
+    def value_fn(data: dict[str, Any]) -> float | None:
+        value = data.get("period_usage", {}).get(period, {}).get(key)
+        return convert(None if value is None else round(value, 3))
+
+    return value_fn
+
+
+def _period_start_fn(period: str) -> Callable[[dict[str, Any]], datetime | None]:
+    """Build a last reset function returning when a period started."""
+
+    def last_reset_fn(data: dict[str, Any]) -> datetime | None:
+        return _parse_timestamp(
+            data.get("period_usage", {}).get(period, {}).get("start")
+        )
+
+    return last_reset_fn
 
 
 WATER_SENSORS: tuple[EcobullesSensorDescription, ...] = (
@@ -83,6 +164,107 @@ WATER_SENSORS: tuple[EcobullesSensorDescription, ...] = (
     ),
 )
 
+FLOW_SENSORS: tuple[EcobullesSensorDescription, ...] = (
+    EcobullesSensorDescription(
+        key="water_flow_rate",
+        translation_key="water_flow_rate",
+        native_unit_of_measurement=UnitOfVolumeFlowRate.LITERS_PER_MINUTE,
+        device_class=SensorDeviceClass.VOLUME_FLOW_RATE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data.get("water_flow_rate_l_min"),
+    ),
+    EcobullesSensorDescription(
+        key="water_flow_rate_average",
+        translation_key="water_flow_rate_average",
+        native_unit_of_measurement=UnitOfVolumeFlowRate.LITERS_PER_MINUTE,
+        device_class=SensorDeviceClass.VOLUME_FLOW_RATE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data.get("water_flow_rate_average_l_min"),
+    ),
+)
+
+FORECAST_SENSORS: tuple[EcobullesSensorDescription, ...] = (
+    EcobullesSensorDescription(
+        key="water_forecast_today",
+        translation_key="water_forecast_today",
+        native_unit_of_measurement=UnitOfVolume.LITERS,
+        device_class=SensorDeviceClass.WATER,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("water_forecast_today_l"),
+    ),
+    EcobullesSensorDescription(
+        key="water_forecast_tomorrow",
+        translation_key="water_forecast_tomorrow",
+        native_unit_of_measurement=UnitOfVolume.LITERS,
+        device_class=SensorDeviceClass.WATER,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("water_forecast_tomorrow_l"),
+    ),
+)
+
+PERIOD_SENSORS: tuple[EcobullesSensorDescription, ...] = (
+    *(
+        EcobullesSensorDescription(
+            key=f"water_usage_{period}",
+            translation_key=f"water_usage_{period}",
+            native_unit_of_measurement=UnitOfVolume.LITERS,
+            device_class=SensorDeviceClass.WATER,
+            state_class=SensorStateClass.TOTAL,
+            entity_registry_enabled_default=period in ("day", "month"),
+            value_fn=_period_value_fn(period, "water_liters"),
+            last_reset_fn=_period_start_fn(period),
+        )
+        for period in PERIODS
+    ),
+    *(
+        EcobullesSensorDescription(
+            key=f"co2_injection_time_{period}",
+            translation_key=f"co2_injection_time_{period}",
+            native_unit_of_measurement=UnitOfTime.SECONDS,
+            device_class=SensorDeviceClass.DURATION,
+            state_class=SensorStateClass.TOTAL,
+            entity_registry_enabled_default=period in ("day", "month"),
+            value_fn=_period_value_fn(period, "gas_ms", _ms_to_seconds),
+            last_reset_fn=_period_start_fn(period),
+        )
+        for period in PERIODS
+    ),
+)
+
+GAS_SENSORS: tuple[EcobullesSensorDescription, ...] = (
+    EcobullesSensorDescription(
+        key="co2_injection_time_completed_bottles",
+        translation_key="co2_injection_time_completed_bottles",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.TOTAL,
+        value_fn=lambda data: _ms_to_seconds(data.get("completed_cycles_gas_ms")),
+    ),
+    EcobullesSensorDescription(
+        key="co2_injection_time_total",
+        translation_key="co2_injection_time_total",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.TOTAL,
+        value_fn=lambda data: _ms_to_seconds(data.get("total_gas_ms")),
+    ),
+)
+
+DOSE_SENSORS: tuple[EcobullesSensorDescription, ...] = (
+    EcobullesSensorDescription(
+        key="co2_dose_ratio",
+        translation_key="co2_dose_ratio",
+        native_unit_of_measurement="ms/L",
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("co2_dose_ratio_ms_per_l"),
+        attributes_fn=lambda data: {
+            "band_low_ms_per_l": data.get("co2_dose_band_low_ms_per_l"),
+            "band_high_ms_per_l": data.get("co2_dose_band_high_ms_per_l"),
+        },
+    ),
+)
+
 RAW_CO2_SENSOR = EcobullesSensorDescription(
     key="raw_co2_value",
     translation_key="raw_co2_value",
@@ -124,9 +306,92 @@ DIAGNOSTIC_SENSORS: tuple[EcobullesSensorDescription, ...] = (
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.get("suspended"),
     ),
+    EcobullesSensorDescription(
+        key="co2_fitted_pulse_ms_per_l",
+        translation_key="co2_fitted_pulse_ms_per_l",
+        native_unit_of_measurement="ms/L",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("co2_fitted_ms_per_l"),
+        attributes_fn=lambda data: {
+            "confidence": data.get("co2_fitted_ms_per_l_confidence"),
+            "samples": data.get("co2_calibration_samples"),
+            "outliers": data.get("co2_calibration_outliers"),
+        },
+    ),
+    EcobullesSensorDescription(
+        key="api_latency_p50",
+        translation_key="api_latency_p50",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("api_latency_p50_ms"),
+        attributes_fn=lambda data: _endpoint_attributes(data, "latency_p50_ms"),
+    ),
+    EcobullesSensorDescription(
+        key="api_latency_p95",
+        translation_key="api_latency_p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("api_latency_p95_ms"),
+        attributes_fn=lambda data: _endpoint_attributes(data, "latency_p95_ms"),
+    ),
+    EcobullesSensorDescription(
+        key="last_refresh_duration",
+        translation_key="last_refresh_duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("refresh_duration_ms"),
+    ),
+    EcobullesSensorDescription(
+        key="refresh_bytes",
+        translation_key="refresh_bytes",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda data: data.get("refresh_bytes"),
+        attributes_fn=lambda data: _endpoint_attributes(data, "bytes_total"),
+    ),
+    EcobullesSensorDescription(
+        key="event_loop_time",
+        translation_key="event_loop_time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        suggested_display_precision=0,
+        value_fn=lambda data: data.get("event_loop_ms_total"),
+        attributes_fn=lambda data: {
+            phase: round(duration_ms, 1)
+            for phase, duration_ms in (data.get("event_loop_ms") or {}).items()
+        },
+    ),
 )
 
 
+def _endpoint_attributes(data: dict[str, Any], metric: str) -> dict[str, Any]:
+    """Return one request metric per cloud endpoint as state attributes."""
+    return {
+        endpoint: stats.get(metric)
+        for endpoint, stats in (data.get("api_endpoints") or {}).items()
+    }
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -138,10 +403,47 @@ async def async_setup_entry(
 
     entities: list[SensorEntity] = [
         EcobullesDescribedSensor(coordinator, eco_ref, description)
-        for description in (*WATER_SENSORS, *DIAGNOSTIC_SENSORS)
+        for description in (
+            *WATER_SENSORS,
+            *FLOW_SENSORS,
+            *FORECAST_SENSORS,
+            *PERIOD_SENSORS,
+            *GAS_SENSORS,
+            *DOSE_SENSORS,
+            *DIAGNOSTIC_SENSORS,
+        )
     ]
+    raw_co2_sensor: EcobullesDescribedSensor | None = None
     if entry.options.get(CONF_ENABLE_RAW_CO2_SENSOR, False):
-        entities.append(EcobullesDescribedSensor(coordinator, eco_ref, RAW_CO2_SENSOR))
+        raw_co2_sensor = EcobullesDescribedSensor(coordinator, eco_ref, RAW_CO2_SENSOR)
+        entities.append(raw_co2_sensor)
+
+    @callback
+    def _async_toggle_raw_co2_sensor(enabled: bool) -> None:
+        """Add or remove the raw CO2 sensor without reloading the entry."""
+        nonlocal raw_co2_sensor
+        if enabled and raw_co2_sensor is None:
+            raw_co2_sensor = EcobullesDescribedSensor(
+                coordinator, eco_ref, RAW_CO2_SENSOR
+            )
+            async_add_entities([raw_co2_sensor])
+        elif not enabled and raw_co2_sensor is not None:
+            registry = er.async_get(hass)
+            if raw_co2_sensor.entity_id in registry.entities:
+                # Removing the registry entry also removes the entity and its
+                # state, instead of leaving a restored unavailable state.
+                registry.async_remove(raw_co2_sensor.entity_id)
+            else:
+                entry.async_create_task(hass, raw_co2_sensor.async_remove())
+            raw_co2_sensor = None
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_RAW_CO2_SENSOR_TOGGLED.format(entry.entry_id),
+            _async_toggle_raw_co2_sensor,
+        )
+    )
     entities.append(
         CO2InjectionTimeSensor(
             coordinator,
@@ -149,6 +451,8 @@ async def async_setup_entry(
         )
     )
     entities.append(EstimatedCO2BottleUsageSensor(coordinator, eco_ref, entry.data))
+    entities.append(CO2BottleDaysRemainingSensor(coordinator, eco_ref, entry.data))
+    entities.append(CO2BottleEmptyDateSensor(coordinator, eco_ref, entry.data))
     entities.append(ActiveAlertsSensor(coordinator, eco_ref))
     async_add_entities(entities)
 
@@ -162,6 +466,7 @@ class EcobullesCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         api: EcobullesClient,
         eco_ref: str,
         config: dict[str, Any],
+        config_entry: ConfigEntry | None = None,
     ) -> None:
         """Initialize the coordinator."""
         self.api = api
@@ -169,29 +474,127 @@ class EcobullesCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         self.config = config
         self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{eco_ref}.water_usage")
         self._water_usage_state: WaterUsageState | None = None
-        poll_interval_seconds = int(config.get(CONF_POLL_INTERVAL_SECONDS, 120) or 120)
+        self._gas_forecast = GasConsumptionRegression()
+        self._dose_calibration = DoseCalibration()
+        self._dose_drift = DoseDriftDetector()
+        self._water_profile = WaterUsageProfile()
+        self._period_usage = PeriodUsageRollup()
+        self._usage_history = UsageHistoryIndex()
+        self._flow_rate = FlowRateTracker(stale_after=_poll_interval(config))
+        self._water_draws = WaterDrawSegmenter()
+        self._leak_detector = LeakDetector(
+            continuous_flow=timedelta(
+                minutes=_float_config_value(
+                    config, CONF_LEAK_CONTINUOUS_FLOW_MINUTES, 60
+                )
+            )
+        )
+        self._leak_detected = False
+        self._metadata_synced_at: datetime | None = None
+        # Set on replay copies, which must not persist or announce anything.
+        self._detached = False
+        # Test doubles and older clients may not collect request metrics.
+        self.api_metrics: ApiMetrics = getattr(api, "metrics", None) or ApiMetrics()
+        self.phase_timer = PhaseTimer(eco_ref)
+        self.history_cache = HistoryCacheStats()
+        # Payloads of the latest complete fetch, replayed by the profile action.
+        self.recorded_payloads: (
+            tuple[dict[str, Any], dict[str, Any], dict[str, Any] | None] | None
+        ) = None
         super().__init__(
             hass,
             _LOGGER,
+            config_entry=config_entry,
             name=f"Ecobulles {eco_ref}",
-            update_interval=timedelta(seconds=max(30, poll_interval_seconds)),
+            update_interval=_poll_interval(config),
+        )
+
+    def replay_copy(self, api: Any) -> EcobullesCoordinator:
+        """Return a detached copy refreshing from `api` without side effects.
+
+        The copy works on deep copies of the accounting state and trackers.
+        It has no config entry or listeners, and it neither saves the store,
+        fires draw events nor raises leak issues, so replaying payloads cannot
+        change the live state.
+        """
+        replica = EcobullesCoordinator(self.hass, api, self.eco_ref, self.config)
+        replica._detached = True
+        for name in (
+            "_water_usage_state",
+            "_gas_forecast",
+            "_dose_calibration",
+            "_dose_drift",
+            "_water_profile",
+            "_period_usage",
+            "_usage_history",
+            "_flow_rate",
+            "_water_draws",
+            "_leak_detector",
+            "_leak_detected",
+        ):
+            setattr(replica, name, deepcopy(getattr(self, name)))
+        return replica
+
+    @callback
+    def async_apply_config(self, config: dict[str, Any]) -> None:
+        """Apply changed settings to the running coordinator and sensors.
+
+        Accounting state is kept; the poll timer is rescheduled with the new
+        interval and model sensors receive the new data through a signal.
+        """
+        self.config = config
+        self._leak_detector.continuous_flow_seconds = (
+            _float_config_value(config, CONF_LEAK_CONTINUOUS_FLOW_MINUTES, 60) * 60
+        )
+        poll_interval = _poll_interval(config)
+        self.update_interval = poll_interval
+        self._flow_rate.stale_after_seconds = poll_interval.total_seconds()
+        if self._listeners:
+            self._schedule_refresh()
+        async_dispatcher_send(
+            self.hass, SIGNAL_CONFIG_UPDATED.format(self.eco_ref), config
         )
 
     async def _load_water_usage_state(self) -> WaterUsageState:
         """Load durable water accounting once."""
         if self._water_usage_state is None:
-            self._water_usage_state = WaterUsageState.from_dict(await self._store.async_load())
+            raw = await self._store.async_load() or {}
+            self._water_usage_state = WaterUsageState.from_dict(raw)
+            self._gas_forecast = GasConsumptionRegression.from_dict(
+                raw.get("gas_forecast")
+            )
+            self._dose_calibration = DoseCalibration.from_dict(
+                raw.get("dose_calibration")
+            )
+            self._dose_drift = DoseDriftDetector.from_dict(raw.get("dose_drift"))
+            self._water_profile = WaterUsageProfile.from_dict(raw.get("water_profile"))
+            self._period_usage = PeriodUsageRollup.from_dict(raw.get("period_usage"))
         return self._water_usage_state
 
+    def _storage_payload(self, water_state: WaterUsageState) -> dict[str, Any]:
+        """Return the durable state saved after each refresh."""
+        return {
+            **water_state.as_dict(),
+            "gas_forecast": self._gas_forecast.as_dict(),
+            "dose_calibration": self._dose_calibration.as_dict(),
+            "dose_drift": self._dose_drift.as_dict(),
+            "water_profile": self._water_profile.as_dict(),
+            "period_usage": self._period_usage.as_dict(),
+        }
+
     async def _async_update_data(self) -> dict[str, Any]:
         """Fetch Ecobulles data and update cumulative water accounting."""
+        refresh_start = perf_counter()
+        timer = self.phase_timer
+        timer.start()
         try:
-            async with async_timeout.timeout(15):
-                usage, device = await asyncio.gather(
-                    self.api.get_total_water_and_co2_usage(self.eco_ref),
-                    self.api.get_device_info(self.eco_ref),
-                )
-            login_payload = await self._async_fetch_login_payload()
+            with tally_requests() as fetched:
+                async with async_timeout.timeout(15):
+                    usage, device = await asyncio.gather(
+                        self.api.get_total_water_and_co2_usage(self.eco_ref),
+                        self.api.get_device_info(self.eco_ref),
+                    )
+                login_payload = await self._async_fetch_login_payload()
         except TimeoutError as err:
             raise UpdateFailed(str(err) or "Timed out fetching Ecobulles data") from err
         except Exception as err:
@@ -202,6 +605,7 @@ class EcobullesCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             raise UpdateFailed(
                 f"{type(err).__name__} while fetching Ecobulles data: {err!s}"
             ) from err
+        timer.lap(PHASE_FETCH)
 
         if usage is None or device is None:
             ir.async_create_issue(
@@ -218,12 +622,89 @@ class EcobullesCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             DOMAIN,
             REPAIR_ISSUE_API_PAYLOAD_INCOMPLETE,
         )
+        self.recorded_payloads = (usage, device, login_payload)
 
         box = device.get("data", {}).get("boite", {})
+        reading_time = _parse_timestamp(box.get("lastdatereceive"))
         active_alerts = _active_alerts_from_payloads(device, login_payload)
+        timer.lap(PHASE_PARSE)
         water_state = await self._load_water_usage_state()
-        bottle_changed = water_state.apply_cycle_value(usage["total_eau"])
-        await self._store.async_save(water_state.as_dict())
+        timer.resume()
+        sample_time = utcnow()
+        confirm_readings, confirm_seconds = self._bottle_change_confirmation
+        bottle_changed = water_state.apply_cycle_value(
+            usage["total_eau"],
+            sample_time,
+            confirm_readings=confirm_readings,
+            confirm_seconds=confirm_seconds,
+            reading_time=reading_time,
+        )
+        gas_counter_reset = False
+        if usage.get("total_gas") is not None:
+            gas_counter_reset = water_state.apply_cycle_gas_value(
+                int(usage["total_gas"]),
+                sample_time,
+                confirm_readings=confirm_readings,
+                confirm_seconds=confirm_seconds,
+                reading_time=reading_time,
+            )
+            self._gas_forecast.add_sample(sample_time, water_state.total_gas_ms)
+            self._dose_calibration.add_totals(
+                water_state.total_water_liters, water_state.total_gas_ms
+            )
+            was_drifting = self._dose_drift.drifting
+            self._dose_drift.add_totals(
+                water_state.total_water_liters, water_state.total_gas_ms
+            )
+            if self._dose_drift.drifting and not was_drifting:
+                _LOGGER.warning(
+                    "CO2 dose for %s drifted to %.0f ms/L outside the learned band",
+                    self.eco_ref,
+                    self._dose_drift.ratio,
+                )
+        dose_band = self._dose_drift.band
+        dose_fit = self._dose_calibration.fit()
+        local_time = as_local(sample_time)
+        self._water_profile.add_sample(local_time, water_state.total_water_liters)
+        self._period_usage.add_sample(
+            local_time, water_state.total_water_liters, water_state.total_gas_ms
+        )
+        self._usage_history.add_sample(
+            local_time, water_state.total_water_liters, water_state.total_gas_ms
+        )
+        timer.lap(PHASE_WATER_ACCOUNTING)
+        storage_payload = self._storage_payload(water_state)
+        timer.lap(PHASE_SERIALIZE)
+        if not self._detached:
+            await self._store.async_save(storage_payload)
+        timer.lap(PHASE_STORE_SAVE)
+        self._flow_rate.add_sample(
+            reading_time or sample_time, water_state.total_water_liters
+        )
+        for draw in self._water_draws.add_sample(
+            reading_time or sample_time,
+            water_state.total_water_liters,
+            water_state.total_gas_ms,
+            pending_drop=bool(water_state.pending_drop_readings),
+        ):
+            if not self._detached:
+                self.hass.bus.async_fire(
+                    EVENT_WATER_DRAW, {"eco_ref": self.eco_ref, **draw.as_event_data()}
+                )
+        leak = self._leak_detector.add_sample(
+            as_local(reading_time or sample_time), water_state.total_water_liters
+        )
+        self._update_leak_issue(leak.detected, box.get("name"))
+        self._async_sync_device_metadata(box, sample_time)
+
+        if water_state.pending_drop_readings:
+            _LOGGER.debug(
+                "Water counter for %s dropped to %s L; waiting for confirmation "
+                "(%s reading(s) so far)",
+                self.eco_ref,
+                usage["total_eau"],
+                water_state.pending_drop_readings,
+            )
 
         if bottle_changed:
             _LOGGER.info(
@@ -231,12 +712,48 @@ class EcobullesCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 self.eco_ref,
                 water_state.completed_cycles_liters,
             )
+        if gas_counter_reset:
+            _LOGGER.info(
+                "Detected CO2 gas counter reset for %s; closed cycles total %s ms",
+                self.eco_ref,
+                water_state.completed_cycles_gas_ms,
+            )
+        timer.lap(PHASE_WATER_ACCOUNTING)
 
+        latency = self.api_metrics.overall_latency()
         return {
             **usage,
             **water_state.as_dict(),
             "total_water_liters": water_state.total_water_liters,
+            "total_gas_ms": water_state.total_gas_ms,
+            "water_flow_rate_l_min": self._flow_rate.instant_rate_l_per_min(
+                sample_time
+            ),
+            "water_flow_rate_average_l_min": self._flow_rate.rolling_rate_l_per_min(
+                sample_time
+            ),
+            "water_draw_in_progress": self._water_draws.in_progress,
+            "water_leak_detected": leak.detected,
+            "water_leak_continuous_flow": leak.continuous_flow,
+            "water_leak_overnight_flow": leak.overnight_flow,
+            "continuous_flow_minutes": leak.continuous_flow_minutes,
             "bottle_changed": bottle_changed,
+            "gas_counter_reset": gas_counter_reset,
+            "co2_consumption_ms_per_day": self._gas_forecast.rate_ms_per_day,
+            "co2_forecast_time": sample_time,
+            "co2_fitted_ms_per_l": dose_fit and round(dose_fit.ms_per_liter, 1),
+            "co2_fitted_ms_per_l_confidence": dose_fit and dose_fit.confidence,
+            "co2_calibration_samples": dose_fit.samples if dose_fit else 0,
+            "co2_calibration_outliers": dose_fit.outliers if dose_fit else 0,
+            "co2_dose_ratio_ms_per_l": self._dose_drift.ratio,
+            "co2_dose_band_low_ms_per_l": dose_band and round(dose_band[0], 1),
+            "co2_dose_band_high_ms_per_l": dose_band and round(dose_band[1], 1),
+            "co2_dose_drift": self._dose_drift.drifting,
+            "water_forecast_today_l": self._water_profile.forecast_day(local_time),
+            "water_forecast_tomorrow_l": self._water_profile.forecast_next_day(
+                local_time
+            ),
+            "period_usage": self._period_usage.as_dict()["periods"],
             "install_date": _isoish(box.get("installdate", {}).get("date")),
             "last_date_receive": _isoish(box.get("lastdatereceive")),
             "activated": box.get("activated"),
@@ -249,8 +766,107 @@ class EcobullesCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             "active_alerts": active_alerts,
             "active_alert_count": len(active_alerts),
             "name": box.get("name"),
+            "api_latency_p50_ms": latency.quantile(0.5),
+            "api_latency_p95_ms": latency.quantile(0.95),
+            "api_endpoints": self.api_metrics.as_dict(),
+            "refresh_bytes": fetched.bytes,
+            "refresh_duration_ms": (perf_counter() - refresh_start) * 1000,
+            "event_loop_ms_total": timer.loop_ms_total,
+            "event_loop_ms": dict(timer.loop_ms),
         }
 
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners, timing the entity state writes."""
+        self.phase_timer.resume()
+        super().async_update_listeners()
+        self.phase_timer.lap(PHASE_ENTITY_WRITES)
+
+    def _update_leak_issue(self, detected: bool, name: str | None) -> None:
+        """Raise or clear the leak repair issue when the leak state changes."""
+        if detected == self._leak_detected or self._detached:
+            return
+        self._leak_detected = detected
+        issue_id = f"{REPAIR_ISSUE_WATER_LEAK}_{self.eco_ref}"
+        if not detected:
+            ir.async_delete_issue(self.hass, DOMAIN, issue_id)
+            return
+        _LOGGER.warning("Possible water leak detected for %s", self.eco_ref)
+        ir.async_create_issue(
+            self.hass,
+            DOMAIN,
+            issue_id,
+            is_fixable=False,
+            severity=ir.IssueSeverity.WARNING,
+            translation_key=REPAIR_ISSUE_WATER_LEAK,
+            translation_placeholders={"name": name or self.eco_ref},
+        )
+
+    @property
+    def usage_history(self) -> UsageHistoryIndex:
+        """Return the bounded in-memory minute/hour/day usage index."""
+        return self._usage_history
+
+    @property
+    def recent_water_draws(self) -> list[WaterDraw]:
+        """Return the bounded in-memory index of recent water draws."""
+        return list(self._water_draws.recent)
+
+    @callback
+    def _async_sync_device_metadata(self, box: dict[str, Any], now: datetime) -> None:
+        """Push changed box name, firmware and serial into the registries.
+
+        Writes happen at most once per DEVICE_METADATA_SYNC_INTERVAL; the
+        comparison itself is a few dict lookups per poll.
+        """
+        entry = self.config_entry
+        if entry is None or (
+            self._metadata_synced_at is not None
+            and now - self._metadata_synced_at < DEVICE_METADATA_SYNC_INTERVAL
+        ):
+            return
+        polled = {
+            "name": box.get("name"),
+            "firmware_version": box.get("firm_ver"),
+            "num_serie": box.get("num_serie"),
+        }
+        changed = {
+            key: value
+            for key, value in polled.items()
+            if value and entry.data.get(key) != value
+        }
+        if not changed:
+            return
+
+        self._metadata_synced_at = now
+        data = {**entry.data, **changed}
+        self.hass.config_entries.async_update_entry(entry, data=data)
+        self.config = {**self.config, **changed}
+        device_registry = dr.async_get(self.hass)
+        device = device_registry.async_get_device(identifiers={(DOMAIN, self.eco_ref)})
+        if device is not None:
+            device_registry.async_update_device(
+                device.id,
+                name=data.get("name"),
+                sw_version=data.get("firmware_version"),
+                serial_number=data.get("num_serie"),
+                model=model_from_serial_number(data.get("num_serie")),
+            )
+        _LOGGER.debug(
+            "Updated Ecobulles %s metadata from the cloud: %s", self.eco_ref, changed
+        )
+
+    @property
+    def _bottle_change_confirmation(self) -> tuple[int, float | None]:
+        """Return how long a counter drop must persist before closing a cycle."""
+        readings = int(
+            _float_config_value(self.config, CONF_BOTTLE_CHANGE_CONFIRM_READINGS, 2)
+        )
+        minutes = _float_config_value(
+            self.config, CONF_BOTTLE_CHANGE_CONFIRM_MINUTES, 0
+        )
+        return max(1, readings), (minutes * 60 if minutes > 0 else None)
+
     async def _async_fetch_login_payload(self) -> dict[str, Any] | None:
         """Fetch login payload because current alerts are exposed there."""
         email = self.config.get(CONF_EMAIL)
@@ -294,6 +910,12 @@ def _active_alerts_from_payloads(
     return [alert for alert in candidates if str(alert.get("currently")) == "1"]
 
 
+def _poll_interval(config: dict[str, Any]) -> timedelta:
+    """Return the configured poll interval, never below 30 seconds."""
+    seconds = int(config.get(CONF_POLL_INTERVAL_SECONDS, 120) or 120)
+    return timedelta(seconds=max(30, seconds))
+
+
 def _float_config_value(config: dict[str, Any], key: str, default: float) -> float:
     """Read a numeric config value without hiding explicit zero values."""
     value = config.get(key, default)
@@ -350,6 +972,21 @@ class EcobullesDescribedSensor(EcobullesBaseSensor):
         """Return the current sensor value."""
         return self.entity_description.value_fn(self.coordinator.data)
 
+    @property
+    def last_reset(self) -> datetime | None:
+        """Return the start of the current period for period totals."""
+        if self.entity_description.last_reset_fn is None:
+            return None
+        return self.entity_description.last_reset_fn(self.coordinator.data)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Expose shared metadata and description-specific attributes."""
+        return {
+            **super().extra_state_attributes,
+            **self.entity_description.attributes_fn(self.coordinator.data),
+        }
+
 
 class ActiveAlertsSensor(EcobullesBaseSensor):
     """Expose the number of currently active Ecobulles alerts."""
@@ -411,11 +1048,8 @@ class CO2InjectionTimeSensor(EcobullesBaseSensor):
         }
 
 
-class EstimatedCO2BottleUsageSensor(EcobullesBaseSensor):
-    """Estimate bottle usage from injection time and Ecobulles dose guidance."""
-
-    _attr_translation_key = "estimated_co2_bottle_usage"
-    _attr_native_unit_of_measurement = PERCENTAGE
+class CO2BottleModelSensor(EcobullesBaseSensor):
+    """Base for sensors built on the CO2 bottle dose model."""
 
     def __init__(
         self,
@@ -423,25 +1057,68 @@ class EstimatedCO2BottleUsageSensor(EcobullesBaseSensor):
         eco_ref: str,
         config: dict[str, Any],
     ) -> None:
-        """Initialize the estimated CO2 bottle usage sensor."""
+        """Initialize a sensor using the configured bottle assumptions."""
         super().__init__(coordinator, eco_ref)
         self.config = config
-        self._attr_unique_id = f"{eco_ref}_estimated_co2_bottle_usage"
+
+    async def async_added_to_hass(self) -> None:
+        """Follow configuration changes applied without a reload."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_CONFIG_UPDATED.format(self.eco_ref),
+                self._async_config_updated,
+            )
+        )
+
+    @callback
+    def _async_config_updated(self, config: dict[str, Any]) -> None:
+        """Recompute the model from the new configuration."""
+        self.config = config
+        self.async_write_ha_state()
 
     @property
-    def native_value(self) -> float | None:
-        """Return estimated bottle usage percentage."""
-        total_gas = self.coordinator.data.get("total_gas")
+    def _current_bottle_gas_ms(self) -> int | None:
+        """Return valve-open time accumulated on the current bottle.
+
+        The device gas counter restarts with each bottle, so the cycle value is
+        the right scope for a bottle percentage. Payloads without durable
+        accounting fall back to the raw API counter.
+        """
+        value = self.coordinator.data.get(
+            "cycle_gas_ms", self.coordinator.data.get("total_gas")
+        )
+        return None if value is None else int(value)
+
+    @property
+    def _learned_bottle_capacity_gas_ms(self) -> float | None:
+        """Return the capacity learned from closed bottle cycles, if any."""
+        learned = self.coordinator.data.get("bottle_capacity_gas_ms")
+        return float(learned) if learned else None
+
+    @property
+    def _bottle_capacity_gas_ms(self) -> float | None:
+        """Return the valve-open time a full bottle is expected to last.
+
+        Closed bottle cycles measure the real capacity, so the learned value
+        wins over the dose model once at least one bottle has been replaced.
+        """
+        learned = self._learned_bottle_capacity_gas_ms
+        if learned is not None:
+            return learned
+        return self._modelled_bottle_capacity_gas_ms
+
+    @property
+    def _modelled_bottle_capacity_gas_ms(self) -> float | None:
+        """Return the bottle capacity implied by the dose model."""
         flow_rate = self._estimated_flow_rate_g_per_min
         bottle_weight_kg = _float_config_value(
             self.config, CONF_CO2_BOTTLE_WEIGHT_KG, 10
         )
-        if total_gas is None or flow_rate <= 0 or bottle_weight_kg <= 0:
+        if flow_rate <= 0 or bottle_weight_kg <= 0:
             return None
-
-        open_minutes = int(total_gas) / 1000 / 60
-        used_grams = open_minutes * flow_rate
-        return round((used_grams / (bottle_weight_kg * 1000)) * 100, 2)
+        return bottle_weight_kg * 1000 / flow_rate * 60 * 1000
 
     @property
     def _estimated_flow_rate_g_per_min(self) -> float:
@@ -456,13 +1133,30 @@ class EstimatedCO2BottleUsageSensor(EcobullesBaseSensor):
             g/min = dose_mg_per_l / pulse_ms_per_l * 60
         """
         dose = self._estimated_dose_mg_per_l
-        pulse_ms = _float_config_value(
-            self.config, CONF_CO2_REFERENCE_PULSE_MS_PER_L, 1500
-        )
+        pulse_ms = self._reference_pulse_ms_per_l
         if dose <= 0 or pulse_ms <= 0:
             return 0
         return dose / pulse_ms * 60
 
+    @property
+    def _reference_pulse_ms_per_l(self) -> float:
+        """Return the valve-open ms per liter used by the dose model.
+
+        The fitted value replaces the configured one only when the option is
+        enabled and the calibration has produced an estimate.
+        """
+        if self._uses_fitted_pulse:
+            return float(self.coordinator.data["co2_fitted_ms_per_l"])
+        return _float_config_value(self.config, CONF_CO2_REFERENCE_PULSE_MS_PER_L, 1500)
+
+    @property
+    def _uses_fitted_pulse(self) -> bool:
+        """Return whether the fitted ms/L should replace the configured one."""
+        return bool(
+            self.config.get(CONF_USE_FITTED_CO2_PULSE)
+            and self.coordinator.data.get("co2_fitted_ms_per_l")
+        )
+
     @property
     def _estimated_dose_mg_per_l(self) -> float:
         """Estimate CO2 dose in mg/L from the micrometric screw setting."""
@@ -474,10 +1168,18 @@ class EstimatedCO2BottleUsageSensor(EcobullesBaseSensor):
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        """Expose the assumptions used by the estimate."""
-        total_gas = self.coordinator.data.get("total_gas") or 0
+        """Expose the assumptions used by the estimate.
+
+        The used CO2 mass is the bottle share consumed times the bottle weight,
+        so it follows the same capacity as the state, learned or modelled.
+        """
+        total_gas = self._current_bottle_gas_ms or 0
         flow_rate = self._estimated_flow_rate_g_per_min
-        open_minutes = int(total_gas) / 1000 / 60
+        capacity = self._bottle_capacity_gas_ms
+        bottle_weight_kg = _float_config_value(
+            self.config, CONF_CO2_BOTTLE_WEIGHT_KG, 10
+        )
+        learned = self._learned_bottle_capacity_gas_ms is not None
         return {
             **super().extra_state_attributes,
             "co2_bottle_weight_kg": self.config.get(CONF_CO2_BOTTLE_WEIGHT_KG, 10),
@@ -486,13 +1188,134 @@ class EstimatedCO2BottleUsageSensor(EcobullesBaseSensor):
             ),
             "co2_pressure_bar": self.config.get(CONF_CO2_PRESSURE_BAR, 5),
             "estimated_dose_mg_per_l": round(self._estimated_dose_mg_per_l, 3),
-            "reference_pulse_ms_per_l": self.config.get(
-                CONF_CO2_REFERENCE_PULSE_MS_PER_L, 1500
+            "reference_pulse_ms_per_l": self._reference_pulse_ms_per_l,
+            "reference_pulse_source": (
+                "fitted" if self._uses_fitted_pulse else "configured"
             ),
             "estimated_flow_rate_g_per_min": round(flow_rate, 6),
-            "estimated_used_co2_g": round(open_minutes * flow_rate, 3),
-            "calculation_model": "linear screw setting 2-9 mapped to 85-150 mg/L, using reference pulse ms/L",
+            "current_bottle_gas_ms": total_gas,
+            "estimated_used_co2_g": (
+                None
+                if capacity is None
+                else round(int(total_gas) / capacity * bottle_weight_kg * 1000, 3)
+            ),
+            "capacity_source": "learned" if learned else "model",
+            "learned_bottle_capacity_gas_ms": self.coordinator.data.get(
+                "bottle_capacity_gas_ms"
+            ),
+            "learned_bottle_capacity_liters": self.coordinator.data.get(
+                "bottle_capacity_liters"
+            ),
+            "calculation_model": (
+                "current bottle valve-open time over the weighted average of closed bottle cycles"
+                if learned
+                else "linear screw setting 2-9 mapped to 85-150 mg/L, using reference pulse ms/L"
+            ),
             "warning": (
-                "Estimate uses Ecobulles public dose range and is not a measured bottle calibration."
+                "Estimate uses the capacity learned from replaced bottles and assumes the current bottle holds the configured weight."
+                if learned
+                else "Estimate uses Ecobulles public dose range and is not a measured bottle calibration."
             ),
         }
+
+
+class EstimatedCO2BottleUsageSensor(CO2BottleModelSensor):
+    """Estimate bottle usage from injection time and Ecobulles dose guidance."""
+
+    _attr_translation_key = "estimated_co2_bottle_usage"
+    _attr_native_unit_of_measurement = PERCENTAGE
+
+    def __init__(
+        self,
+        coordinator: EcobullesCoordinator,
+        eco_ref: str,
+        config: dict[str, Any],
+    ) -> None:
+        """Initialize the estimated CO2 bottle usage sensor."""
+        super().__init__(coordinator, eco_ref, config)
+        self._attr_unique_id = f"{eco_ref}_estimated_co2_bottle_usage"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return estimated bottle usage percentage."""
+        total_gas = self._current_bottle_gas_ms
+        capacity = self._bottle_capacity_gas_ms
+        if total_gas is None or capacity is None:
+            return None
+        return round(int(total_gas) / capacity * 100, 2)
+
+
+class CO2BottleForecastSensor(CO2BottleModelSensor):
+    """Base for sensors projecting when the current bottle runs empty."""
+
+    @property
+    def _days_remaining(self) -> float | None:
+        """Return the days left at the fitted consumption rate."""
+        rate = self.coordinator.data.get("co2_consumption_ms_per_day")
+        capacity = self._bottle_capacity_gas_ms
+        used = self._current_bottle_gas_ms
+        if rate is None or rate <= 0 or capacity is None or used is None:
+            return None
+        return max(0.0, capacity - used) / rate
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Expose the fitted consumption next to the bottle model."""
+        rate = self.coordinator.data.get("co2_consumption_ms_per_day")
+        capacity = self._bottle_capacity_gas_ms
+        return {
+            **super().extra_state_attributes,
+            "co2_consumption_ms_per_day": None if rate is None else round(rate, 1),
+            "bottle_capacity_gas_ms": None if capacity is None else round(capacity),
+        }
+
+
+class CO2BottleDaysRemainingSensor(CO2BottleForecastSensor):
+    """Forecast the days left before the current CO2 bottle is empty."""
+
+    _attr_translation_key = "co2_bottle_days_remaining"
+    _attr_native_unit_of_measurement = UnitOfTime.DAYS
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_suggested_display_precision = 1
+
+    def __init__(
+        self,
+        coordinator: EcobullesCoordinator,
+        eco_ref: str,
+        config: dict[str, Any],
+    ) -> None:
+        """Initialize the days remaining sensor."""
+        super().__init__(coordinator, eco_ref, config)
+        self._attr_unique_id = f"{eco_ref}_co2_bottle_days_remaining"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return forecast days remaining."""
+        days = self._days_remaining
+        return None if days is None else round(days, 2)
+
+
+class CO2BottleEmptyDateSensor(CO2BottleForecastSensor):
+    """Forecast the date the current CO2 bottle runs empty."""
+
+    _attr_translation_key = "co2_bottle_empty_date"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    def __init__(
+        self,
+        coordinator: EcobullesCoordinator,
+        eco_ref: str,
+        config: dict[str, Any],
+    ) -> None:
+        """Initialize the empty date sensor."""
+        super().__init__(coordinator, eco_ref, config)
+        self._attr_unique_id = f"{eco_ref}_co2_bottle_empty_date"
+
+    @property
+    def native_value(self) -> datetime | None:
+        """Return the forecast empty date."""
+        days = self._days_remaining
+        reference = self.coordinator.data.get("co2_forecast_time")
+        if days is None or reference is None:
+            return None
+        return reference + timedelta(days=days)
@@ -0,0 +1,638 @@
+"""Service actions for Ecobulles."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+import cProfile
+import csv
+from datetime import datetime, timedelta
+import logging
+from pathlib import Path
+from time import perf_counter
+import tracemalloc
+from typing import IO, Any
+
+import voluptuous as vol
+
+from homeassistant.components import persistent_notification
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry, ConfigEntryState
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import (
+    config_validation as cv,
+    device_registry as dr,
+    entity_registry as er,
+)
+from homeassistant.helpers.storage import Store
+from homeassistant.util.dt import as_local, get_default_time_zone, utcnow
+from homeassistant.util.hass_dict import HassKey
+from homeassistant.util.yaml import load_yaml
+
+from .config_flow import validate_input
+from .const import (
+    CONF_CO2_BOTTLE_WEIGHT_KG,
+    CONF_CO2_MICROMETRIC_SCREW_SETTING,
+    DOMAIN,
+)
+from .history import EXPORT_COLUMNS, HistoryCsvExport, UsageWindow, iter_windows
+from .profiling import PHASES, ReplayClient, format_profile_report
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BACKFILL_HISTORY = "backfill_history"
+SERVICE_EXPORT_HISTORY = "export_history"
+SERVICE_IMPORT_ACCOUNTS = "import_accounts"
+SERVICE_PROFILE = "profile"
+ATTR_DEVICE_ID = "device_id"
+ATTR_START = "start"
+ATTR_STOP = "stop"
+ATTR_WINDOW_MINUTES = "window_minutes"
+ATTR_CONCURRENCY = "concurrency"
+ATTR_SOURCE = "source"
+ATTR_PATH = "path"
+ATTR_REFRESHES = "refreshes"
+
+SOURCE_CACHE = "cache"
+SOURCE_CLOUD = "cloud"
+SOURCE_REPLAY = "replay"
+EXPORT_DIRECTORY = "ecobulles_exports"
+PROFILE_DIRECTORY = "ecobulles_profiles"
+DEFAULT_ACCOUNTS_FILE = "ecobulles_accounts.yaml"
+
+HISTORY_STORAGE_VERSION = 1
+# Windows fetched between two checkpoints of the history cache.
+CHECKPOINT_WINDOWS = 48
+# Checkpoints are coalesced into at most one cache write per delay, so a long
+# backfill does not rewrite the growing cache after every batch.
+CHECKPOINT_SAVE_DELAY = 60
+# Windows written to an export file per executor job.
+EXPORT_CHUNK_WINDOWS = 500
+RUNNING_BACKFILLS: HassKey[set[str]] = HassKey(f"{DOMAIN}_running_backfills")
+# cProfile allows a single active profiler per interpreter.
+PROFILE_LOCK: HassKey[asyncio.Lock] = HassKey(f"{DOMAIN}_profile_lock")
+
+BACKFILL_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Required(ATTR_STOP): cv.datetime,
+        vol.Optional(ATTR_WINDOW_MINUTES, default=60): vol.All(
+            vol.Coerce(int), vol.Range(min=5, max=1440)
+        ),
+        vol.Optional(ATTR_CONCURRENCY, default=2): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=8)
+        ),
+    }
+)
+
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Required(ATTR_STOP): cv.datetime,
+        vol.Optional(ATTR_SOURCE, default=SOURCE_CACHE): vol.In(
+            [SOURCE_CACHE, SOURCE_CLOUD]
+        ),
+        vol.Optional(ATTR_WINDOW_MINUTES, default=60): vol.All(
+            vol.Coerce(int), vol.Range(min=5, max=1440)
+        ),
+        vol.Optional(ATTR_CONCURRENCY, default=2): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=8)
+        ),
+    }
+)
+
+IMPORT_ACCOUNTS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_PATH, default=DEFAULT_ACCOUNTS_FILE): cv.string,
+        vol.Optional(ATTR_CONCURRENCY, default=4): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=16)
+        ),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_REFRESHES, default=3): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=20)
+        ),
+        vol.Optional(ATTR_SOURCE, default=SOURCE_REPLAY): vol.In(
+            [SOURCE_REPLAY, SOURCE_CLOUD]
+        ),
+    }
+)
+
+ACCOUNT_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_EMAIL): cv.string,
+        vol.Required(CONF_PASSWORD): cv.string,
+        vol.Optional(CONF_CO2_BOTTLE_WEIGHT_KG, default=10): vol.Coerce(float),
+        vol.Optional(CONF_CO2_MICROMETRIC_SCREW_SETTING, default=5): vol.Coerce(
+            float
+        ),
+    }
+)
+ACCOUNTS_FILE_SCHEMA = vol.Schema([ACCOUNT_SCHEMA])
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Ecobulles service actions."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BACKFILL_HISTORY,
+        _async_backfill_history,
+        schema=BACKFILL_HISTORY_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        _async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_ACCOUNTS,
+        _async_import_accounts,
+        schema=IMPORT_ACCOUNTS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def history_store(hass: HomeAssistant, eco_ref: str) -> Store[dict[str, Any]]:
+    """Return the store caching fetched history windows for a device.
+
+    The cache maps each window start to a `UsageWindow.as_row()` row and
+    doubles as the backfill checkpoint: windows already present are skipped.
+    """
+    return Store(hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.{eco_ref}.history")
+
+
+def async_get_loaded_entry(hass: HomeAssistant, device_id: str) -> ConfigEntry:
+    """Return the loaded config entry behind an Ecobulles device."""
+    device = dr.async_get(hass).async_get(device_id)
+    if device is None:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="device_not_found",
+            translation_placeholders={"device_id": device_id},
+        )
+    for entry_id in device.config_entries:
+        entry = hass.config_entries.async_get_entry(entry_id)
+        if entry is None or entry.domain != DOMAIN:
+            continue
+        if entry.state is not ConfigEntryState.LOADED:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="entry_not_loaded",
+                translation_placeholders={"name": entry.title},
+            )
+        return entry
+    raise ServiceValidationError(
+        translation_domain=DOMAIN,
+        translation_key="device_not_found",
+        translation_placeholders={"device_id": device_id},
+    )
+
+
+def cloud_local_time(value: datetime) -> datetime:
+    """Return a naive local time as used by the Ecobulles cloud."""
+    if value.tzinfo is not None:
+        value = as_local(value)
+    return value.replace(tzinfo=None)
+
+
+def _time_range(call: ServiceCall) -> tuple[datetime, datetime]:
+    """Return the requested range as naive cloud local times."""
+    start = cloud_local_time(call.data[ATTR_START])
+    stop = cloud_local_time(call.data[ATTR_STOP])
+    if start >= stop:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN, translation_key="invalid_time_range"
+        )
+    return start, stop
+
+
+async def _async_fetch_window(
+    client: Any,
+    eco_ref: str,
+    semaphore: asyncio.Semaphore,
+    start: datetime,
+    stop: datetime,
+) -> UsageWindow | None:
+    """Fetch one window, returning None when the cloud request fails."""
+    async with semaphore:
+        try:
+            window: UsageWindow | None = await client.get_usage_window(
+                eco_ref, start, stop
+            )
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.debug(
+                "History window %s -> %s failed for %s: %s", start, stop, eco_ref, err
+            )
+            return None
+        return window
+
+
+async def _async_backfill_history(call: ServiceCall) -> None:
+    """Start fetching historical usage windows in the background."""
+    hass = call.hass
+    entry = async_get_loaded_entry(hass, call.data[ATTR_DEVICE_ID])
+    start, stop = _time_range(call)
+    eco_ref: str = entry.data["eco_ref"]
+    running = hass.data.setdefault(RUNNING_BACKFILLS, set())
+    if eco_ref in running:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="backfill_running",
+            translation_placeholders={"name": entry.title},
+        )
+
+    running.add(eco_ref)
+    windows = list(
+        iter_windows(start, stop, timedelta(minutes=call.data[ATTR_WINDOW_MINUTES]))
+    )
+    entry.async_create_background_task(
+        hass,
+        _async_run_backfill(hass, entry, windows, call.data[ATTR_CONCURRENCY]),
+        f"{DOMAIN} backfill {eco_ref}",
+    )
+
+
+async def _async_run_backfill(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    windows: list[tuple[datetime, datetime]],
+    concurrency: int,
+) -> None:
+    """Fetch missing windows with bounded concurrency and checkpoint them."""
+    eco_ref: str = entry.data["eco_ref"]
+    coordinator = entry.runtime_data.coordinator
+    client = coordinator.api
+    store = history_store(hass, eco_ref)
+    notification_id = f"{DOMAIN}_backfill_{eco_ref}"
+    semaphore = asyncio.Semaphore(concurrency)
+    fetched = failed = 0
+
+    try:
+        cache: dict[str, list[Any]] = (await store.async_load() or {}).get(
+            "windows", {}
+        )
+        pending = [window for window in windows if window[0].isoformat() not in cache]
+        skipped = len(windows) - len(pending)
+        coordinator.history_cache.record(hits=skipped, misses=len(pending))
+        for offset in range(0, len(pending), CHECKPOINT_WINDOWS):
+            batch = pending[offset : offset + CHECKPOINT_WINDOWS]
+            results = await asyncio.gather(
+                *(
+                    _async_fetch_window(client, eco_ref, semaphore, *window)
+                    for window in batch
+                )
+            )
+            for result in results:
+                if result is None:
+                    failed += 1
+                    continue
+                cache[result.start.isoformat()] = result.as_row()
+                fetched += 1
+            # The writer serializes in the executor, so it gets a snapshot.
+            store.async_delay_save(
+                lambda: {"windows": dict(cache)}, CHECKPOINT_SAVE_DELAY
+            )
+            persistent_notification.async_create(
+                hass,
+                f"{entry.title}: {skipped + fetched + failed}/{len(windows)} "
+                f"windows processed ({fetched} fetched, {skipped} already cached, "
+                f"{failed} failed).",
+                title="Ecobulles history backfill",
+                notification_id=notification_id,
+            )
+        await store.async_save({"windows": cache})
+        persistent_notification.async_create(
+            hass,
+            f"{entry.title}: backfill finished. {fetched} window(s) fetched, "
+            f"{skipped} already cached, {failed} failed. Run the action again "
+            "to retry failed windows.",
+            title="Ecobulles history backfill",
+            notification_id=notification_id,
+        )
+    finally:
+        hass.data[RUNNING_BACKFILLS].discard(eco_ref)
+
+
+async def _async_export_history(call: ServiceCall) -> ServiceResponse:
+    """Write a device's usage history to a CSV file under the config dir."""
+    hass = call.hass
+    entry = async_get_loaded_entry(hass, call.data[ATTR_DEVICE_ID])
+    start, stop = _time_range(call)
+    eco_ref: str = entry.data["eco_ref"]
+    size = timedelta(minutes=call.data[ATTR_WINDOW_MINUTES])
+    if call.data[ATTR_SOURCE] == SOURCE_CLOUD:
+        chunks = _async_cloud_chunks(
+            entry, start, stop, size, call.data[ATTR_CONCURRENCY]
+        )
+    else:
+        chunks = _async_cache_chunks(hass, eco_ref, start, stop)
+
+    path = Path(
+        hass.config.path(
+            EXPORT_DIRECTORY,
+            f"{eco_ref}_{start:%Y%m%d%H%M}_{stop:%Y%m%d%H%M}.csv",
+        )
+    )
+    export = HistoryCsvExport(
+        _export_entity_id(hass, eco_ref, "water_usage_total"),
+        _export_entity_id(hass, eco_ref, "raw_co2_value"),
+        get_default_time_zone(),
+    )
+    windows = 0
+    # Window starts of the requested grid not yet covered by a written window:
+    # failed downloads for the cloud, windows never backfilled for the cache.
+    missing = {window_start for window_start, _ in iter_windows(start, stop, size)}
+    file = await hass.async_add_executor_job(_open_export, path)
+    try:
+        async for chunk in chunks:
+            windows += len(chunk)
+            missing.difference_update(window.start for window in chunk)
+            rows = [row for window in chunk for row in export.rows(window)]
+            await hass.async_add_executor_job(_write_rows, file, rows)
+    finally:
+        await hass.async_add_executor_job(file.close)
+    if missing:
+        _LOGGER.warning(
+            "History export for %s is missing %s window(s) starting %s",
+            eco_ref,
+            len(missing),
+            min(missing),
+        )
+    return {
+        "path": str(path),
+        "windows": windows,
+        "rows": export.rows_written,
+        "missing_windows": len(missing),
+    }
+
+
+async def _async_cache_chunks(
+    hass: HomeAssistant, eco_ref: str, start: datetime, stop: datetime
+) -> AsyncIterator[list[UsageWindow]]:
+    """Yield cached windows inside the range, oldest first."""
+    cache: dict[str, list[Any]] = (
+        await history_store(hass, eco_ref).async_load() or {}
+    ).get("windows", {})
+    lower, upper = start.isoformat(), stop.isoformat()
+    keys = sorted(key for key in cache if lower <= key < upper)
+    for offset in range(0, len(keys), EXPORT_CHUNK_WINDOWS):
+        yield [
+            UsageWindow.from_row(key, cache[key])
+            for key in keys[offset : offset + EXPORT_CHUNK_WINDOWS]
+        ]
+
+
+async def _async_cloud_chunks(
+    entry: ConfigEntry,
+    start: datetime,
+    stop: datetime,
+    size: timedelta,
+    concurrency: int,
+) -> AsyncIterator[list[UsageWindow]]:
+    """Yield freshly fetched windows one checkpoint-sized batch at a time."""
+    eco_ref: str = entry.data["eco_ref"]
+    client = entry.runtime_data.coordinator.api
+    semaphore = asyncio.Semaphore(concurrency)
+    windows = list(iter_windows(start, stop, size))
+    for offset in range(0, len(windows), CHECKPOINT_WINDOWS):
+        results = await asyncio.gather(
+            *(
+                _async_fetch_window(client, eco_ref, semaphore, *window)
+                for window in windows[offset : offset + CHECKPOINT_WINDOWS]
+            )
+        )
+        yield [result for result in results if result is not None]
+
+
+def _export_entity_id(hass: HomeAssistant, eco_ref: str, key: str) -> str:
+    """Return the entity id used for a sensor column in the export.
+
+    The analysis script finds its series by key, so renamed entities fall back
+    to an id that still contains it.
+    """
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"{eco_ref}_{key}"
+    )
+    if entity_id is None or key not in entity_id:
+        return f"sensor.{DOMAIN}_{key}"
+    return entity_id
+
+
+def _open_export(path: Path) -> IO[str]:
+    """Create the export file and write the CSV header."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file = path.open("w", newline="", encoding="utf-8")
+    csv.writer(file).writerow(EXPORT_COLUMNS)
+    return file
+
+
+def _write_rows(file: IO[str], rows: list[list[str]]) -> None:
+    """Append CSV rows to an open export file."""
+    csv.writer(file).writerows(rows)
+
+
+async def _async_import_accounts(call: ServiceCall) -> ServiceResponse:
+    """Create config entries for every account listed in a credentials file.
+
+    Emails of existing entries are skipped without logging in. The other
+    accounts are validated concurrently, up to the requested bound, and their
+    entries are created concurrently; devices that are already configured are
+    skipped by their eco_ref unique id. Any error fails only its own account.
+    """
+    hass = call.hass
+    path = call.data[ATTR_PATH]
+    try:
+        accounts: list[dict[str, Any]] = await hass.async_add_executor_job(
+            _load_accounts, Path(hass.config.config_dir), path
+        )
+    except (OSError, ValueError, vol.Invalid) as err:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="invalid_accounts_file",
+            translation_placeholders={"path": path, "error": str(err)},
+        ) from err
+
+    semaphore = asyncio.Semaphore(call.data[ATTR_CONCURRENCY])
+    configured = {
+        str(entry.data.get(CONF_EMAIL, "")).casefold(): entry.data.get(
+            "eco_ref", entry.unique_id
+        )
+        for entry in hass.config_entries.async_entries(DOMAIN)
+    }
+
+    async def import_account(account: dict[str, Any]) -> tuple[str, str]:
+        """Return the outcome of one account and its eco_ref or email."""
+        if (eco_ref := configured.get(account[CONF_EMAIL].casefold())) is not None:
+            return "already_configured", eco_ref
+        async with semaphore:
+            try:
+                info = await validate_input(hass, account)
+            except Exception as err:  # noqa: BLE001
+                _LOGGER.warning(
+                    "Skipping Ecobulles account %s: %s", account[CONF_EMAIL], err
+                )
+                return "failed", account[CONF_EMAIL]
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": SOURCE_IMPORT}, data={**account, **info}
+        )
+        if result["type"] == FlowResultType.CREATE_ENTRY:
+            return "created", info["eco_ref"]
+        return "already_configured", info["eco_ref"]
+
+    unique_accounts = list(
+        {account[CONF_EMAIL]: account for account in accounts}.values()
+    )
+    outcomes = await asyncio.gather(
+        *(import_account(account) for account in unique_accounts),
+        return_exceptions=True,
+    )
+
+    response: dict[str, list[str]] = {
+        "created": [],
+        "already_configured": [],
+        "failed": [],
+    }
+    for account, outcome in zip(unique_accounts, outcomes, strict=True):
+        if isinstance(outcome, BaseException):
+            _LOGGER.warning(
+                "Importing Ecobulles account %s failed: %s",
+                account[CONF_EMAIL],
+                outcome,
+            )
+            response["failed"].append(account[CONF_EMAIL])
+        else:
+            response[outcome[0]].append(outcome[1])
+    return response
+
+
+def _load_accounts(config_dir: Path, path: str) -> list[dict[str, Any]]:
+    """Read and validate a credentials file inside the config directory."""
+    file = (config_dir / path).resolve()
+    if not file.is_relative_to(config_dir.resolve()):
+        raise ValueError("the file must be inside the configuration directory")
+    accounts: list[dict[str, Any]] = ACCOUNTS_FILE_SCHEMA(load_yaml(file) or [])
+    return accounts
+
+
+async def _async_profile(call: ServiceCall) -> ServiceResponse:
+    """Run coordinator refreshes under cProfile and tracemalloc.
+
+    The report is written under the config dir; the response carries the mean
+    wall time of each refresh phase. Replayed refreshes reuse the payloads of
+    the latest poll instead of calling the cloud, on a detached copy of the
+    coordinator so the live accounting state is left untouched.
+
+    cProfile follows the thread, not the task: while a refresh awaits, the
+    profiler stays enabled and also records whatever else the event loop runs.
+    """
+    hass = call.hass
+    entry = async_get_loaded_entry(hass, call.data[ATTR_DEVICE_ID])
+    eco_ref: str = entry.data["eco_ref"]
+    coordinator = entry.runtime_data.coordinator
+    replay = call.data[ATTR_SOURCE] == SOURCE_REPLAY
+    if replay and coordinator.recorded_payloads is None:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="nothing_to_replay",
+            translation_placeholders={"name": entry.title},
+        )
+    lock = hass.data.setdefault(PROFILE_LOCK, asyncio.Lock())
+    if lock.locked():
+        raise ServiceValidationError(
+            translation_domain=DOMAIN, translation_key="profile_running"
+        )
+
+    refreshes: int = call.data[ATTR_REFRESHES]
+    phases = dict.fromkeys(PHASES, 0.0)
+    failed = 0
+    target = (
+        coordinator.replay_copy(
+            ReplayClient(coordinator.api, *coordinator.recorded_payloads)
+        )
+        if replay
+        else coordinator
+    )
+    profiler = cProfile.Profile()
+    async with lock:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        start = perf_counter()
+        try:
+            for _ in range(refreshes):
+                profiler.enable()
+                try:
+                    await target.async_refresh()
+                finally:
+                    profiler.disable()
+                if not target.last_update_success:
+                    failed += 1
+                for phase, duration_ms in target.phase_timer.phases.items():
+                    phases[phase] = phases.get(phase, 0.0) + duration_ms
+            wall_ms = (perf_counter() - start) * 1000
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    mean_phases = {
+        phase: round(duration_ms / refreshes, 3)
+        for phase, duration_ms in phases.items()
+    }
+    path = Path(
+        hass.config.path(PROFILE_DIRECTORY, f"{eco_ref}_{utcnow():%Y%m%d%H%M%S}.txt")
+    )
+    title = (
+        f"Ecobulles {entry.title}: {refreshes} "
+        f"{'replayed' if replay else 'live'} refresh(es), "
+        f"{failed} failed, {wall_ms:.1f} ms wall time"
+    )
+    await hass.async_add_executor_job(
+        _write_profile_report, path, title, mean_phases, profiler, snapshot
+    )
+    return {
+        "path": str(path),
+        "refreshes": refreshes,
+        "failed": failed,
+        "wall_ms": round(wall_ms, 3),
+        "phases_ms": mean_phases,
+    }
+
+
+def _write_profile_report(
+    path: Path,
+    title: str,
+    phases: dict[str, float],
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+) -> None:
+    """Format and write a profiling report."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        format_profile_report(title, phases, profiler, snapshot), encoding="utf-8"
+    )
@@ -8,9 +8,14 @@ from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
 from typing import Any
 
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
-from .const import CONF_ENABLE_RAW_CO2_SENSOR, DOMAIN
+from .const import (
+    CONF_ENABLE_RAW_CO2_SENSOR,
+    DOMAIN,
+    SIGNAL_RAW_CO2_SENSOR_TOGGLED,
+)
 
 PARALLEL_UPDATES = 0
 
@@ -51,11 +56,19 @@ class RawCO2DebugSwitch(SwitchEntity):
         await self._update_option(False)
 
     async def _update_option(self, enabled: bool) -> None:
-        """Persist the debug option and refresh the switch."""
+        """Persist the debug option and add or remove the raw CO2 sensor.
+
+        The sensor platform handles the signal in place, so the coordinator
+        keeps running and no cloud request is made.
+        """
         options = {**self.entry.options, CONF_ENABLE_RAW_CO2_SENSOR: enabled}
         self.hass.config_entries.async_update_entry(self.entry, options=options)
         self.async_write_ha_state()
-        await self.hass.config_entries.async_reload(self.entry.entry_id)
+        async_dispatcher_send(
+            self.hass,
+            SIGNAL_RAW_CO2_SENSOR_TOGGLED.format(self.entry.entry_id),
+            enabled,
+        )
 
     @property
     def device_info(self) -> dict[str, Any]:
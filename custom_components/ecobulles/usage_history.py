@@ -0,0 +1,97 @@
+"""Pure helpers for a bounded multi-resolution usage history index."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+from .period_usage import period_start
+
+# Buckets kept per resolution: one day of minutes, 31 days of hours and about
+# three years of days.
+RESOLUTION_CAPACITY: dict[str, int] = {
+    "minute": 24 * 60,
+    "hour": 31 * 24,
+    "day": 3 * 366,
+}
+RESOLUTIONS = tuple(RESOLUTION_CAPACITY)
+
+
+def _bucket_start(resolution: str, timestamp: datetime) -> float:
+    """Return the epoch start of the local bucket containing `timestamp`."""
+    if resolution == "minute":
+        return timestamp.replace(second=0, microsecond=0).timestamp()
+    return period_start(resolution, timestamp).timestamp()
+
+
+class UsageHistoryIndex:
+    """Water and CO2 deltas bucketed per minute, hour and day.
+
+    Each resolution is a fixed-capacity ring of `[start, liters, gas_ms]`
+    buckets kept in time order, so memory is bounded and range queries use a
+    binary search instead of scanning. Timestamps must be timezone-aware local
+    times so hour and day buckets follow the user's clock.
+    """
+
+    def __init__(self, capacity: dict[str, int] | None = None) -> None:
+        """Initialize empty rings."""
+        capacity = capacity or RESOLUTION_CAPACITY
+        self._buckets: dict[str, deque[list[float]]] = {
+            resolution: deque(maxlen=capacity[resolution])
+            for resolution in RESOLUTIONS
+        }
+        self._last: tuple[float, float] | None = None
+
+    def add_sample(
+        self, timestamp: datetime, total_liters: float, total_gas_ms: float
+    ) -> None:
+        """Feed lifetime totals and add their delta to every resolution."""
+        last = self._last
+        self._last = (total_liters, total_gas_ms)
+        if last is None:
+            return
+        liters = max(0.0, total_liters - last[0])
+        gas_ms = max(0.0, total_gas_ms - last[1])
+
+        for resolution, buckets in self._buckets.items():
+            start = _bucket_start(resolution, timestamp)
+            if buckets and buckets[-1][0] == start:
+                buckets[-1][1] += liters
+                buckets[-1][2] += gas_ms
+            elif not buckets or buckets[-1][0] < start:
+                buckets.append([start, liters, gas_ms])
+
+    def oldest(self, resolution: str) -> float | None:
+        """Return the start of the oldest bucket kept for a resolution."""
+        buckets = self._buckets[resolution]
+        return buckets[0][0] if buckets else None
+
+    def choose_resolution(self, start: float, end: float, max_points: int) -> str:
+        """Return the finest resolution covering `start` within `max_points`.
+
+        A resolution covers `start` unless its ring has already evicted
+        buckets newer than it.
+        """
+        for resolution, seconds in (("minute", 60), ("hour", 3_600)):
+            buckets = self._buckets[resolution]
+            evicted = len(buckets) == buckets.maxlen and buckets[0][0] > start
+            if not evicted and (end - start) / seconds <= max_points:
+                return resolution
+        return "day"
+
+    def query(
+        self, resolution: str, start: float, end: float
+    ) -> list[dict[str, Any]]:
+        """Return buckets of a resolution starting in `[start, end)`."""
+        buckets = self._buckets[resolution]
+        index = bisect_left(buckets, start, key=lambda bucket: bucket[0])
+        points: list[dict[str, Any]] = []
+        while index < len(buckets) and buckets[index][0] < end:
+            bucket_start, liters, gas_ms = buckets[index]
+            points.append(
+                {"start": bucket_start, "water_liters": liters, "gas_ms": gas_ms}
+            )
+            index += 1
+        return points
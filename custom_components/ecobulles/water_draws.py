@@ -0,0 +1,86 @@
+"""Pure helpers for splitting the Ecobulles water counter into draws."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+
+@dataclass(frozen=True, slots=True)
+class WaterDraw:
+    """A contiguous period during which the water counter kept increasing."""
+
+    start: datetime
+    end: datetime
+    liters: int
+    co2_ms: int
+
+    def as_event_data(self) -> dict[str, Any]:
+        """Serialize the draw for Home Assistant events and diagnostics."""
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "duration_seconds": round((self.end - self.start).total_seconds()),
+            "liters": self.liters,
+            "co2_ms": self.co2_ms,
+        }
+
+
+class WaterDrawSegmenter:
+    """Segment cumulative water/gas readings into discrete draws.
+
+    Each sample is compared with the previous one only, so segmentation is
+    incremental. A draw opens at the sample preceding the first increase and
+    closes on the first sample without any water increase, so boundaries are
+    as precise as the box report times fed in. Samples taken while a counter
+    drop awaits confirmation hold the total flat, so they are skipped rather
+    than read as idle.
+    """
+
+    def __init__(self, max_recent: int = 50) -> None:
+        """Initialize the segmenter with a bounded index of recent draws."""
+        self.recent: deque[WaterDraw] = deque(maxlen=max_recent)
+        self._last: tuple[datetime, int, int] | None = None
+        self._open: list[Any] | None = None
+
+    @property
+    def in_progress(self) -> bool:
+        """Return whether a draw is currently open."""
+        return self._open is not None
+
+    def add_sample(
+        self,
+        timestamp: datetime,
+        total_liters: int,
+        total_gas_ms: int,
+        *,
+        pending_drop: bool = False,
+    ) -> list[WaterDraw]:
+        """Feed one cumulative reading and return the draws it completed."""
+        last = self._last
+        if pending_drop or (last is not None and timestamp <= last[0]):
+            return []
+        self._last = (timestamp, total_liters, total_gas_ms)
+        if last is None:
+            return []
+
+        liters = max(0, total_liters - last[1])
+        gas_ms = max(0, total_gas_ms - last[2])
+        if liters:
+            if self._open is None:
+                self._open = [last[0], timestamp, liters, gas_ms]
+            else:
+                self._open[1] = timestamp
+                self._open[2] += liters
+                self._open[3] += gas_ms
+            return []
+
+        if self._open is None:
+            return []
+        start, end, draw_liters, draw_gas_ms = self._open
+        self._open = None
+        draw = WaterDraw(start=start, end=end, liters=draw_liters, co2_ms=draw_gas_ms)
+        self.recent.append(draw)
+        return [draw]
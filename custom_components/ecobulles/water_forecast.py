@@ -0,0 +1,176 @@
+"""Pure helpers for forecasting daily water usage."""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 7 * HOURS_PER_DAY
+SECONDS_PER_HOUR = 3_600
+
+
+def _empty_levels() -> array[float]:
+    """Return one zeroed float per hour of the week."""
+    return array("f", bytes(4 * HOURS_PER_WEEK))
+
+
+@dataclass(slots=True)
+class WaterUsageProfile:
+    """Hour-of-week water profile maintained with exponential smoothing.
+
+    Each of the 168 slots (weekday × local hour) holds the smoothed liters
+    drawn during that hour. Counter deltas accumulate into the tracked hour,
+    which is folded into its slot once the next hour starts. Hours that were
+    not observed from start to end (startup, polling gaps) are not learned, so
+    outages do not drag the profile towards zero.
+
+    Timestamps must be timezone-aware local times so slots follow the user's
+    clock.
+    """
+
+    alpha: float = 0.2
+    levels: array[float] = field(default_factory=_empty_levels)
+    seen: bytearray = field(default_factory=lambda: bytearray(HOURS_PER_WEEK))
+    hour_start: float | None = None
+    hour_slot: int = 0
+    hour_liters: float = 0.0
+    hour_partial: bool = True
+    day: str | None = None
+    day_liters: float = 0.0
+    last_seconds: float | None = None
+    last_liters: float | None = None
+
+    def add_sample(self, timestamp: datetime, total_liters: float) -> None:
+        """Feed a cumulative water reading."""
+        seconds = timestamp.timestamp()
+        if self.last_seconds is not None and seconds <= self.last_seconds:
+            return
+        contiguous = (
+            self.last_seconds is not None
+            and seconds - self.last_seconds <= SECONDS_PER_HOUR
+        )
+        if contiguous and self.hour_start is not None and self.last_liters is not None:
+            delta = max(0.0, total_liters - self.last_liters)
+            self.hour_liters += delta
+            self.day_liters += delta
+        self.last_seconds, self.last_liters = seconds, total_liters
+
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        hour_start = hour.timestamp()
+        if hour_start == self.hour_start:
+            return
+        next_hour = (
+            self.hour_start is not None
+            and contiguous
+            and hour_start - self.hour_start == SECONDS_PER_HOUR
+        )
+        if next_hour and not self.hour_partial:
+            self._learn(self.hour_slot, self.hour_liters)
+        self.hour_start = hour_start
+        self.hour_slot = _slot(hour)
+        self.hour_liters = 0.0
+        self.hour_partial = not next_hour
+        if self.day != hour.date().isoformat():
+            self.day = hour.date().isoformat()
+            self.day_liters = 0.0
+
+    def _learn(self, slot: int, liters: float) -> None:
+        """Fold a fully observed hour into its slot."""
+        if self.seen[slot]:
+            self.levels[slot] += self.alpha * (liters - self.levels[slot])
+        else:
+            self.levels[slot] = liters
+            self.seen[slot] = 1
+
+    def slot_estimate(self, slot: int) -> float | None:
+        """Return expected liters for a slot.
+
+        Slots not learned yet borrow the average of the same hour on other
+        weekdays.
+        """
+        if self.seen[slot]:
+            return float(self.levels[slot])
+        same_hour = [
+            self.levels[other]
+            for other in range(slot % HOURS_PER_DAY, HOURS_PER_WEEK, HOURS_PER_DAY)
+            if self.seen[other]
+        ]
+        return sum(same_hour) / len(same_hour) if same_hour else None
+
+    def forecast_day(self, now: datetime) -> float | None:
+        """Return expected liters for the local day containing `now`.
+
+        The water already drawn today is added to the profile for the rest of
+        the current hour and the remaining hours.
+        """
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        so_far = self.day_liters if self.day == hour.date().isoformat() else 0.0
+        current = self.slot_estimate(_slot(hour))
+        if current is None:
+            return None
+        if self.hour_start == hour.timestamp():
+            current = max(0.0, current - self.hour_liters)
+        remaining = self._sum_slots(hour, range(1, HOURS_PER_DAY - hour.hour))
+        if remaining is None:
+            return None
+        return so_far + current + remaining
+
+    def forecast_next_day(self, now: datetime) -> float | None:
+        """Return expected liters for the local day after `now`."""
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return self._sum_slots(midnight, range(HOURS_PER_DAY, 2 * HOURS_PER_DAY))
+
+    def _sum_slots(self, start: datetime, offsets: range) -> float | None:
+        """Sum slot estimates for hours `offsets` after `start`."""
+        total = 0.0
+        base = _slot(start)
+        for offset in offsets:
+            estimate = self.slot_estimate((base + offset) % HOURS_PER_WEEK)
+            if estimate is None:
+                return None
+            total += estimate
+        return total
+
+    def as_dict(self) -> dict[str, Any]:
+        """Serialize the profile compactly for storage."""
+        return {
+            "levels": [round(level, 3) for level in self.levels],
+            "seen": self.seen.hex(),
+            "hour_start": self.hour_start,
+            "hour_slot": self.hour_slot,
+            "hour_liters": self.hour_liters,
+            "hour_partial": self.hour_partial,
+            "day": self.day,
+            "day_liters": self.day_liters,
+            "last_seconds": self.last_seconds,
+            "last_liters": self.last_liters,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any] | None) -> "WaterUsageProfile":
+        """Restore the profile from storage."""
+        raw = raw or {}
+        profile = cls(
+            hour_start=raw.get("hour_start"),
+            hour_slot=int(raw.get("hour_slot", 0)),
+            hour_liters=float(raw.get("hour_liters", 0.0)),
+            hour_partial=bool(raw.get("hour_partial", True)),
+            day=raw.get("day"),
+            day_liters=float(raw.get("day_liters", 0.0)),
+            last_seconds=raw.get("last_seconds"),
+            last_liters=raw.get("last_liters"),
+        )
+        levels = raw.get("levels") or []
+        seen = bytes.fromhex(raw.get("seen", ""))
+        if len(levels) == HOURS_PER_WEEK and len(seen) == HOURS_PER_WEEK:
+            profile.levels = array("f", levels)
+            profile.seen = bytearray(seen)
+        return profile
+
+
+def _slot(hour: datetime) -> int:
+    """Return the hour-of-week slot of a local time."""
+    return hour.weekday() * HOURS_PER_DAY + hour.hour
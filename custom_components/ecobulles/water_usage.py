@@ -2,57 +2,352 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Sequence
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with Home Assistant
+    np = None  # type: ignore[assignment]
+
+# Weight of the latest closed cycle in the learned bottle capacity.
+BOTTLE_CAPACITY_ALPHA = 0.3
 
 
 @dataclass(slots=True)
 class WaterUsageState:
-    """Persisted water accounting state.
+    """Persisted water and CO2 gas accounting state.
 
     `cycle_water_liters` mirrors the Ecobulles counter for the active CO2 bottle.
     `completed_cycles_liters` stores finished bottle cycles so `total_water_liters`
     can remain monotonic even when the device counter resets.
+
+    The gas counter (`total_gas`, valve-open milliseconds) follows the same
+    model: `cycle_gas_ms` mirrors the device counter and
+    `completed_cycles_gas_ms` keeps the closed cycles behind `total_gas_ms`.
+
+    A lower reading only closes a cycle once it is confirmed. While a drop is
+    pending, the previous cycle value is kept and `pending_*` fields record how
+    many readings and since when (epoch seconds) the drop has been observed.
+    Readings carrying the box timestamp of the last counted one are repeats
+    of the same report and do not count again.
+
+    Each closed cycle is one physical bottle, so `bottle_capacity_liters` and
+    `bottle_capacity_gas_ms` keep an exponentially weighted average of what
+    the closed cycles delivered.
     """
 
     cycle_water_liters: int = 0
     completed_cycles_liters: int = 0
     bottle_changes: int = 0
+    cycle_gas_ms: int = 0
+    completed_cycles_gas_ms: int = 0
+    gas_counter_resets: int = 0
+    pending_drop_readings: int = 0
+    pending_drop_since: float | None = None
+    pending_drop_reading_at: float | None = None
+    pending_gas_drop_readings: int = 0
+    pending_gas_drop_since: float | None = None
+    pending_gas_drop_reading_at: float | None = None
+    bottle_capacity_liters: float | None = None
+    bottle_capacity_gas_ms: float | None = None
 
     @property
     def total_water_liters(self) -> int:
         """Return immutable lifetime water usage."""
         return self.completed_cycles_liters + self.cycle_water_liters
 
-    def apply_cycle_value(self, new_cycle_water_liters: int) -> bool:
-        """Apply a device reading and detect a CO2 bottle replacement."""
+    @property
+    def total_gas_ms(self) -> int:
+        """Return immutable lifetime CO2 valve-open time."""
+        return self.completed_cycles_gas_ms + self.cycle_gas_ms
+
+    def apply_cycle_value(
+        self,
+        new_cycle_water_liters: int,
+        timestamp: datetime | None = None,
+        *,
+        confirm_readings: int = 1,
+        confirm_seconds: float | None = None,
+        reading_time: datetime | None = None,
+    ) -> bool:
+        """Apply a device reading and detect a CO2 bottle replacement.
+
+        A drop is confirmed after `confirm_readings` consecutive lower readings,
+        or once it has persisted for `confirm_seconds`. The defaults confirm on
+        the first lower reading. `reading_time` is when the box reported the
+        value; a lower reading is only counted once per box report.
+        """
         if new_cycle_water_liters < 0:
             raise ValueError("Water usage cannot be negative")
 
-        bottle_changed = (
+        if not (
             self.cycle_water_liters > 0
             and new_cycle_water_liters < self.cycle_water_liters
-        )
-        if bottle_changed:
-            self.completed_cycles_liters += self.cycle_water_liters
-            self.bottle_changes += 1
+        ):
+            self.pending_drop_readings = 0
+            self.pending_drop_since = None
+            self.pending_drop_reading_at = None
+            self.cycle_water_liters = new_cycle_water_liters
+            return False
 
+        if _is_new_reading(reading_time, self.pending_drop_reading_at):
+            self.pending_drop_readings += 1
+            self.pending_drop_reading_at = _optional_timestamp(reading_time)
+        if self.pending_drop_since is None and timestamp is not None:
+            self.pending_drop_since = timestamp.timestamp()
+        if not _drop_confirmed(
+            self.pending_drop_readings,
+            self.pending_drop_since,
+            timestamp,
+            confirm_readings,
+            confirm_seconds,
+        ):
+            return False
+
+        self.completed_cycles_liters += self.cycle_water_liters
+        self.bottle_capacity_liters = _ewma(
+            self.bottle_capacity_liters, self.cycle_water_liters
+        )
+        self.bottle_changes += 1
+        self.pending_drop_readings = 0
+        self.pending_drop_since = None
+        self.pending_drop_reading_at = None
         self.cycle_water_liters = new_cycle_water_liters
-        return bottle_changed
+        return True
 
-    def as_dict(self) -> dict[str, int]:
+    def apply_cycle_gas_value(
+        self,
+        new_cycle_gas_ms: int,
+        timestamp: datetime | None = None,
+        *,
+        confirm_readings: int = 1,
+        confirm_seconds: float | None = None,
+        reading_time: datetime | None = None,
+    ) -> bool:
+        """Apply a gas counter reading and detect a counter reset."""
+        if new_cycle_gas_ms < 0:
+            raise ValueError("CO2 injection time cannot be negative")
+
+        if not (self.cycle_gas_ms > 0 and new_cycle_gas_ms < self.cycle_gas_ms):
+            self.pending_gas_drop_readings = 0
+            self.pending_gas_drop_since = None
+            self.pending_gas_drop_reading_at = None
+            self.cycle_gas_ms = new_cycle_gas_ms
+            return False
+
+        if _is_new_reading(reading_time, self.pending_gas_drop_reading_at):
+            self.pending_gas_drop_readings += 1
+            self.pending_gas_drop_reading_at = _optional_timestamp(reading_time)
+        if self.pending_gas_drop_since is None and timestamp is not None:
+            self.pending_gas_drop_since = timestamp.timestamp()
+        if not _drop_confirmed(
+            self.pending_gas_drop_readings,
+            self.pending_gas_drop_since,
+            timestamp,
+            confirm_readings,
+            confirm_seconds,
+        ):
+            return False
+
+        self.completed_cycles_gas_ms += self.cycle_gas_ms
+        self.bottle_capacity_gas_ms = _ewma(self.bottle_capacity_gas_ms, self.cycle_gas_ms)
+        self.gas_counter_resets += 1
+        self.pending_gas_drop_readings = 0
+        self.pending_gas_drop_since = None
+        self.pending_gas_drop_reading_at = None
+        self.cycle_gas_ms = new_cycle_gas_ms
+        return True
+
+    def as_dict(self) -> dict[str, Any]:
         """Serialize the state for storage."""
         return {
             "cycle_water_liters": self.cycle_water_liters,
             "completed_cycles_liters": self.completed_cycles_liters,
             "bottle_changes": self.bottle_changes,
+            "cycle_gas_ms": self.cycle_gas_ms,
+            "completed_cycles_gas_ms": self.completed_cycles_gas_ms,
+            "gas_counter_resets": self.gas_counter_resets,
+            "pending_drop_readings": self.pending_drop_readings,
+            "pending_drop_since": self.pending_drop_since,
+            "pending_drop_reading_at": self.pending_drop_reading_at,
+            "pending_gas_drop_readings": self.pending_gas_drop_readings,
+            "pending_gas_drop_since": self.pending_gas_drop_since,
+            "pending_gas_drop_reading_at": self.pending_gas_drop_reading_at,
+            "bottle_capacity_liters": self.bottle_capacity_liters,
+            "bottle_capacity_gas_ms": self.bottle_capacity_gas_ms,
         }
 
     @classmethod
-    def from_dict(cls, raw: dict[str, int] | None) -> "WaterUsageState":
+    def from_dict(cls, raw: dict[str, Any] | None) -> "WaterUsageState":
         """Restore the state from storage."""
         raw = raw or {}
         return cls(
             cycle_water_liters=int(raw.get("cycle_water_liters", 0)),
             completed_cycles_liters=int(raw.get("completed_cycles_liters", 0)),
             bottle_changes=int(raw.get("bottle_changes", 0)),
+            cycle_gas_ms=int(raw.get("cycle_gas_ms", 0)),
+            completed_cycles_gas_ms=int(raw.get("completed_cycles_gas_ms", 0)),
+            gas_counter_resets=int(raw.get("gas_counter_resets", 0)),
+            pending_drop_readings=int(raw.get("pending_drop_readings", 0)),
+            pending_drop_since=_optional_float(raw.get("pending_drop_since")),
+            pending_drop_reading_at=_optional_float(
+                raw.get("pending_drop_reading_at")
+            ),
+            pending_gas_drop_readings=int(raw.get("pending_gas_drop_readings", 0)),
+            pending_gas_drop_since=_optional_float(raw.get("pending_gas_drop_since")),
+            pending_gas_drop_reading_at=_optional_float(
+                raw.get("pending_gas_drop_reading_at")
+            ),
+            bottle_capacity_liters=_optional_float(raw.get("bottle_capacity_liters")),
+            bottle_capacity_gas_ms=_optional_float(raw.get("bottle_capacity_gas_ms")),
         )
+
+
+def _drop_confirmed(
+    readings: int,
+    since: float | None,
+    timestamp: datetime | None,
+    confirm_readings: int,
+    confirm_seconds: float | None,
+) -> bool:
+    """Return whether a pending counter drop has persisted long enough."""
+    if readings >= confirm_readings:
+        return True
+    return (
+        confirm_seconds is not None
+        and since is not None
+        and timestamp is not None
+        and timestamp.timestamp() - since >= confirm_seconds
+    )
+
+
+def _is_new_reading(reading_time: datetime | None, last_at: float | None) -> bool:
+    """Return whether a reading is a new box report rather than a repeat."""
+    return (
+        reading_time is None or last_at is None or reading_time.timestamp() > last_at
+    )
+
+
+def _optional_timestamp(value: datetime | None) -> float | None:
+    """Return a datetime as epoch seconds."""
+    return None if value is None else value.timestamp()
+
+
+def _optional_float(value: Any) -> float | None:
+    """Restore an optional stored number."""
+    return None if value is None else float(value)
+
+
+def _ewma(average: float | None, value: float) -> float:
+    """Fold a closed cycle into the learned bottle capacity."""
+    if average is None:
+        return float(value)
+    return average + BOTTLE_CAPACITY_ALPHA * (value - average)
+
+
+@dataclass(slots=True)
+class WaterUsageReplay:
+    """Result of replaying a recorded series of water counter readings."""
+
+    state: WaterUsageState
+    change_indices: list[int] = field(default_factory=list)
+    change_timestamps: list[datetime] = field(default_factory=list)
+
+
+def replay_cycle_values(
+    readings: Sequence[int] | Any,
+    timestamps: Sequence[datetime] | None = None,
+    *,
+    initial: WaterUsageState | None = None,
+    use_numpy: bool | None = None,
+    confirm_readings: int = 1,
+    confirm_seconds: float | None = None,
+) -> WaterUsageReplay:
+    """Replay many device readings through the bottle change detection.
+
+    This is equivalent to calling `WaterUsageState.apply_cycle_value` for each
+    reading in order, but runs as a single vectorised pass when NumPy is
+    available. `initial` is never mutated. `change_indices` are positions in
+    `readings` where a bottle change was detected (confirmed).
+
+    Immediate detection is vectorised. A confirmation window makes each
+    decision depend on the previous ones, so it always replays sequentially.
+    """
+    if timestamps is not None and len(timestamps) != len(readings):
+        raise ValueError("Readings and timestamps must have the same length")
+
+    state = replace(initial) if initial is not None else WaterUsageState()
+    if use_numpy is None:
+        use_numpy = np is not None
+    if confirm_readings > 1 or confirm_seconds is not None or state.pending_drop_readings:
+        change_indices = [
+            index
+            for index, value in enumerate(readings)
+            if state.apply_cycle_value(
+                int(value),
+                timestamps[index] if timestamps is not None else None,
+                confirm_readings=confirm_readings,
+                confirm_seconds=confirm_seconds,
+            )
+        ]
+    elif use_numpy and np is not None:
+        change_indices = _replay_numpy(state, readings)
+    else:
+        change_indices = _replay_python(state, readings)
+
+    return WaterUsageReplay(
+        state=state,
+        change_indices=change_indices,
+        change_timestamps=(
+            [timestamps[index] for index in change_indices]
+            if timestamps is not None
+            else []
+        ),
+    )
+
+
+def _replay_python(state: WaterUsageState, readings: Sequence[int]) -> list[int]:
+    """Replay readings with a tight pure-Python loop."""
+    previous = state.cycle_water_liters
+    completed = state.completed_cycles_liters
+    change_indices: list[int] = []
+    for index, raw_value in enumerate(readings):
+        value = int(raw_value)
+        if value < 0:
+            raise ValueError("Water usage cannot be negative")
+        if 0 < previous and value < previous:
+            completed += previous
+            state.bottle_capacity_liters = _ewma(state.bottle_capacity_liters, previous)
+            change_indices.append(index)
+        previous = value
+
+    state.cycle_water_liters = previous
+    state.completed_cycles_liters = completed
+    state.bottle_changes += len(change_indices)
+    return change_indices
+
+
+def _replay_numpy(state: WaterUsageState, readings: Any) -> list[int]:
+    """Replay readings by comparing each value with its predecessor at once."""
+    values = np.asarray(readings, dtype=np.int64)
+    if values.size == 0:
+        return []
+    if bool((values < 0).any()):
+        raise ValueError("Water usage cannot be negative")
+
+    previous = np.empty_like(values)
+    previous[0] = state.cycle_water_liters
+    previous[1:] = values[:-1]
+    changed = (previous > 0) & (values < previous)
+    change_indices = np.flatnonzero(changed)
+
+    closed = previous[changed]
+    for liters in closed.tolist():
+        state.bottle_capacity_liters = _ewma(state.bottle_capacity_liters, liters)
+    state.cycle_water_liters = int(values[-1])
+    state.completed_cycles_liters += int(closed.sum())
+    state.bottle_changes += int(change_indices.size)
+    return [int(index) for index in change_indices]
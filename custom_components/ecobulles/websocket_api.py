@@ -0,0 +1,96 @@
+"""Websocket API for Ecobulles."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util.dt import (
+    as_utc,
+    get_default_time_zone,
+    parse_datetime,
+    utcnow,
+)
+
+from .const import DOMAIN
+from .usage_history import RESOLUTIONS
+
+DEFAULT_HISTORY_WINDOW = timedelta(hours=24)
+DEFAULT_MAX_POINTS = 500
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register the Ecobulles websocket commands."""
+    websocket_api.async_register_command(hass, ws_usage_history)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/usage_history",
+        vol.Required("entry_id"): str,
+        vol.Optional("start_time"): str,
+        vol.Optional("end_time"): str,
+        vol.Optional("resolution", default="auto"): vol.In(("auto", *RESOLUTIONS)),
+        vol.Optional("max_points", default=DEFAULT_MAX_POINTS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=10_000)
+        ),
+    }
+)
+@callback
+def ws_usage_history(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Answer a usage range query from the in-memory history index."""
+    entry = hass.config_entries.async_get_entry(msg["entry_id"])
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Ecobulles entry not loaded"
+        )
+        return
+
+    end = _parse_time(msg["end_time"]) if "end_time" in msg else utcnow()
+    start = (
+        _parse_time(msg["start_time"])
+        if "start_time" in msg
+        else (end - DEFAULT_HISTORY_WINDOW if end else None)
+    )
+    if start is None or end is None or start >= end:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_INVALID_FORMAT, "Invalid time range"
+        )
+        return
+
+    index = entry.runtime_data.coordinator.usage_history
+    start_ts, end_ts = start.timestamp(), end.timestamp()
+    resolution = msg["resolution"]
+    if resolution == "auto":
+        resolution = index.choose_resolution(start_ts, end_ts, msg["max_points"])
+    connection.send_result(
+        msg["id"],
+        {
+            "resolution": resolution,
+            "points": index.query(resolution, start_ts, end_ts),
+        },
+    )
+
+
+def _parse_time(value: str) -> datetime | None:
+    """Parse a query bound as UTC, reading naive times in the local time zone."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=get_default_time_zone())
+    return as_utc(parsed)
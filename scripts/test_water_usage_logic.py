@@ -12,6 +12,7 @@ MODULE = module_from_spec(SPEC)
 sys.modules[SPEC.name] = MODULE
 SPEC.loader.exec_module(MODULE)
 WaterUsageState = MODULE.WaterUsageState
+replay_cycle_values = MODULE.replay_cycle_values
 
 
 def main() -> None:
@@ -32,9 +33,25 @@ def main() -> None:
     assert state.apply_cycle_value(40) is False
     assert state.total_water_liters == 215
 
+    assert state.apply_cycle_gas_value(150_000) is False
+    assert state.apply_cycle_gas_value(3_000) is True
+    assert state.total_gas_ms == 153_000
+    assert state.gas_counter_resets == 1
+
     restored = WaterUsageState.from_dict(state.as_dict())
     assert restored.total_water_liters == 215
     assert restored.bottle_changes == 1
+    assert restored.total_gas_ms == 153_000
+
+    readings = [100, 175, 12, 40, 3]
+    sequential = WaterUsageState()
+    expected_changes = [
+        index for index, value in enumerate(readings) if sequential.apply_cycle_value(value)
+    ]
+    for use_numpy in (False, True):
+        replay = replay_cycle_values(readings, use_numpy=use_numpy)
+        assert replay.state == sequential
+        assert replay.change_indices == expected_changes == [2, 4]
 
     print("Water usage accounting checks passed.")
 
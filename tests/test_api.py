@@ -1,6 +1,7 @@
 """Tests for Ecobulles API request shaping."""
 
 from datetime import datetime
+import json
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 
@@ -25,6 +26,9 @@ class _FakeResponse:
     async def __aexit__(self, exc_type, exc, tb) -> None:
         return None
 
+    async def read(self) -> bytes:
+        return json.dumps(self._payload).encode()
+
     async def json(self, content_type=None):
         return self._payload
 
@@ -234,8 +238,68 @@ async def test_login_and_device_payload_requests() -> None:
 
 
 def test_home_assistant_api_adapter_uses_injected_session() -> None:
-    """The Home Assistant adapter still accepts an injected aiohttp session."""
+    """The Home Assistant adapter meters requests on the injected session."""
     session = object()
     client = HomeAssistantEcobullesClient(session=session)
 
-    assert client._session is session
+    assert client._session.session is session
+
+
+@pytest.mark.asyncio
+async def test_home_assistant_api_adapter_records_metrics() -> None:
+    """Latency, response size, decode time and errors are kept per endpoint."""
+    session = SimpleNamespace()
+    responses = iter(
+        [_FakeResponse(200, {"status": 1}), _FakeResponse(500, text="boom")]
+    )
+    session.post = lambda *args, **kwargs: next(responses)
+    client = HomeAssistantEcobullesClient(session=session)
+
+    assert await client._post("getAppUserCo2.php", {"eco_ref": "eco-ref"}) == {
+        "status": 1
+    }
+    assert await client._post("getAppUserCo2.php", {"eco_ref": "eco-ref"}) is None
+
+    stats = client.metrics.as_dict()["getAppUserCo2.php"]
+    assert stats["requests"] == 2
+    assert stats["errors"] == 1
+    assert stats["bytes_total"] == len(b'{"status": 1}')
+    assert stats["latency_p95_ms"] is not None
+    assert [
+        (record["status"], record["outcome"], record["params"]["eco_ref"])
+        for record in client.flight_recorder.as_list()
+    ] == [(200, "ok", "**REDACTED**"), (500, "no_data", "**REDACTED**")]
+
+
+@pytest.mark.asyncio
+async def test_home_assistant_api_adapter_fetches_usage_window() -> None:
+    """History windows are rate limited; regular polls are not."""
+    client = HomeAssistantEcobullesClient(session=object())
+    start = datetime(2026, 5, 21, 10, 0)
+    stop = datetime(2026, 5, 21, 11, 0)
+    post = AsyncMock(
+        return_value={"data": {"infoconso": {"total_eau": "3", "total_gas": "4500"}}}
+    )
+    limiter = SimpleNamespace(acquire=AsyncMock())
+
+    with (
+        patch("pyecobulles.EcobullesClient._post", post),
+        patch("custom_components.ecobulles.api.API_RATE_LIMITER", limiter),
+    ):
+        await client._post("getAppUserCo2.php", {"eco_ref": "eco-ref"})
+        limiter.acquire.assert_not_awaited()
+        post.reset_mock()
+        window = await client.get_usage_window("eco-ref", start, stop)
+
+    limiter.acquire.assert_awaited_once_with()
+
+    post.assert_awaited_once_with(
+        "getConsoBoiteItemAppFilter.php",
+        {
+            "eco_ref": "eco-ref",
+            "eau": "1",
+            "startdate": "2026-05-21 10:00:00",
+            "stopdate": "2026-05-21 11:00:00",
+        },
+    )
+    assert (window.water_liters, window.raw_co2) == (3, 4500)
@@ -0,0 +1,71 @@
+"""Tests for cloud request metrics."""
+
+import asyncio
+
+import pytest
+
+from custom_components.ecobulles.api_metrics import (
+    ApiMetrics,
+    LatencyHistogram,
+    tally_requests,
+)
+
+
+def test_latency_histogram_quantiles() -> None:
+    """Quantiles interpolate inside buckets and cap at the last bound."""
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) is None
+
+    for duration in (10, 20, 30, 40, 60, 80, 90, 200, 300, 20_000):
+        histogram.add(duration)
+
+    assert histogram.count == 10
+    assert histogram.quantile(0.5) == pytest.approx(50 + 50 / 3)
+    assert histogram.quantile(0.95) == 10_000
+
+
+def test_api_metrics_records_per_endpoint() -> None:
+    """Requests are summarized per endpoint and merged for overall latency."""
+    metrics = ApiMetrics()
+    metrics.record("getAppUserCo2.php", 40, size=1_000, decode_ms=0.5)
+    metrics.record("getAppUserCo2.php", 400, size=1_200, decode_ms=0.7, error=True)
+    metrics.record("loginAppUserCo2.php", 90, size=3_000, decode_ms=1.0)
+
+    summary = metrics.as_dict()
+
+    assert list(summary) == ["getAppUserCo2.php", "loginAppUserCo2.php"]
+    assert summary["getAppUserCo2.php"]["requests"] == 2
+    assert summary["getAppUserCo2.php"]["errors"] == 1
+    assert summary["getAppUserCo2.php"]["bytes_total"] == 2_200
+    assert summary["getAppUserCo2.php"]["decode_ms_total"] == 1.2
+    assert summary["getAppUserCo2.php"]["latency_last_ms"] == 400
+    assert summary["getAppUserCo2.php"]["latency_buckets"]["500"] == 1
+    assert metrics.bytes_total == 5_200
+    assert metrics.overall_latency().count == 3
+
+
+@pytest.mark.asyncio
+async def test_tally_counts_only_requests_of_its_own_task() -> None:
+    """A refresh tally leaves out concurrent requests on the same client."""
+    metrics = ApiMetrics()
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def backfill() -> None:
+        started.set()
+        await release.wait()
+        metrics.record("getAppUserCo2Graph.php", 100, size=50_000)
+
+    async def fetch(size: int) -> None:
+        await asyncio.sleep(0)
+        metrics.record("getAppUserCo2.php", 40, size=size)
+
+    background = asyncio.create_task(backfill())
+    await started.wait()
+    with tally_requests() as tally:
+        await asyncio.gather(fetch(1_000), fetch(200))
+        release.set()
+        await background
+
+    assert (tally.requests, tally.bytes) == (2, 1_200)
+    assert metrics.bytes_total == 51_200
@@ -0,0 +1,50 @@
+"""Tests for Ecobulles binary sensors."""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.ecobulles.binary_sensor import (
+    EcobullesBinarySensor,
+    async_setup_entry,
+)
+from custom_components.ecobulles.const import DOMAIN
+from custom_components.ecobulles.sensor import EcobullesCoordinator
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_water_leak_binary_sensor(hass) -> None:
+    """The leak binary sensor exposes the coordinator leak status."""
+    coordinator = EcobullesCoordinator(hass, SimpleNamespace(), "eco-ref", {})
+    entry = MockConfigEntry(domain=DOMAIN, data={"eco_ref": "eco-ref"})
+    entry.runtime_data = SimpleNamespace(coordinator=coordinator)
+    add_entities = MagicMock()
+
+    await async_setup_entry(hass, entry, add_entities)
+
+    leak, drift = add_entities.call_args.args[0]
+    assert isinstance(leak, EcobullesBinarySensor)
+    assert leak.unique_id == "eco-ref_water_leak"
+    assert leak.device_info == {"identifiers": {(DOMAIN, "eco-ref")}}
+
+    coordinator.async_set_updated_data(
+        {
+            "water_leak_detected": True,
+            "water_leak_continuous_flow": True,
+            "water_leak_overnight_flow": False,
+            "continuous_flow_minutes": 75.0,
+            "co2_dose_drift": False,
+        }
+    )
+    assert leak.is_on is True
+    assert leak.extra_state_attributes == {
+        "eco_ref": "eco-ref",
+        "continuous_flow": True,
+        "overnight_flow": False,
+        "continuous_flow_minutes": 75.0,
+    }
+    assert drift.unique_id == "eco-ref_co2_dose_drift"
+    assert drift.is_on is False
@@ -0,0 +1,102 @@
+"""Tests for the CO2 dose calibration."""
+
+import pytest
+
+from custom_components.ecobulles.co2_dose import DoseCalibration, DoseDriftDetector
+
+
+def test_calibration_accumulates_small_deltas() -> None:
+    """Refresh deltas are pooled until enough water has been drawn."""
+    calibration = DoseCalibration(min_liters=10)
+
+    assert calibration.add_totals(100, 150_000) is False
+    assert calibration.fit() is None
+    for step in range(1, 5):
+        assert calibration.add_totals(100 + step * 2, 150_000 + step * 3_000) is False
+    assert calibration.add_totals(110, 165_000) is True
+
+    fit = calibration.fit()
+    assert fit.ms_per_liter == 1500
+    assert fit.samples == 1
+
+
+def test_calibration_rejects_outliers() -> None:
+    """Outlying intervals do not move the fitted ratio."""
+    calibration = DoseCalibration(min_liters=1, full_confidence_samples=10)
+    liters, gas = 0, 0
+    calibration.add_totals(liters, gas)
+    for index in range(30):
+        ratio = 5_000 if index % 10 == 0 else 1_480 + (index % 5) * 10
+        liters += 1
+        gas += ratio
+        calibration.add_totals(liters, gas)
+
+    fit = calibration.fit()
+    assert fit.ms_per_liter == pytest.approx(1_500)
+    assert fit.outliers == 3
+    assert fit.confidence == 0.9
+
+
+def test_calibration_resets_on_decreasing_totals_and_restores() -> None:
+    """Counter regressions drop the pending interval; state round-trips."""
+    calibration = DoseCalibration(min_liters=10, max_ratios=2)
+    calibration.add_totals(0, 0)
+    calibration.add_totals(5, 7_500)
+    calibration.add_totals(4, 7_500)
+    assert calibration.pending_liters == 0
+    for liters in (14, 24, 34):
+        calibration.add_totals(liters, liters * 1_000)
+
+    restored = DoseCalibration.from_dict(calibration.as_dict())
+
+    assert list(restored.ratios) == [1_000, 1_000]
+    assert restored.last_liters == 34
+    assert restored.fit() == calibration.fit()
+
+
+def _feed(
+    detector: DoseDriftDetector, totals: list[float], ms_per_liter: float, steps: int
+) -> None:
+    """Draw 10 L per refresh at a fixed ms/L ratio."""
+    for _ in range(steps):
+        totals[0] += 10
+        totals[1] += 10 * ms_per_liter
+        detector.add_totals(*totals)
+
+
+def test_drift_detector_rolling_ratio_and_alarm() -> None:
+    """The rolling ratio tracks the last liters and drift leaves the band."""
+    detector = DoseDriftDetector(window_liters=50)
+    totals = [0.0, 0.0]
+    detector.add_totals(*totals)
+
+    _feed(detector, totals, 1_500, 4)
+    assert detector.ratio is None
+    _feed(detector, totals, 1_500, 60)
+    assert detector.ratio == 1_500
+    assert detector.band == (1_200, 1_800)
+    assert detector.drifting is False
+
+    _feed(detector, totals, 3_000, 5)
+    assert detector.ratio == 3_000
+    assert detector.drifting is True
+
+    restored = DoseDriftDetector.from_dict(detector.as_dict())
+    assert restored.ratio == detector.ratio
+    assert restored.band == detector.band
+    assert restored.drifting is True
+
+
+def test_drift_detector_relearns_after_persistent_change() -> None:
+    """A lasting new ratio is eventually accepted as the new normal."""
+    detector = DoseDriftDetector(window_liters=50, min_band_samples=3, relearn_blocks=4)
+    totals = [0.0, 0.0]
+    detector.add_totals(*totals)
+    _feed(detector, totals, 1_500, 30)
+
+    _feed(detector, totals, 3_000, 10)
+    assert detector.drifting is True
+    _feed(detector, totals, 3_000, 20)
+
+    assert detector.drifting is False
+    assert detector.band_mean == 3_000
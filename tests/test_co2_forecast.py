@@ -0,0 +1,35 @@
+"""Tests for the incremental CO2 consumption regression."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from custom_components.ecobulles.co2_forecast import GasConsumptionRegression
+
+START = datetime(2026, 1, 1)
+
+
+def test_regression_fits_daily_consumption() -> None:
+    """A steady consumption is recovered from hourly samples."""
+    regression = GasConsumptionRegression()
+    assert regression.rate_ms_per_day is None
+
+    for hour in range(24 * 10):
+        regression.add_sample(START + timedelta(hours=hour), 1_000_000 + hour * 5_000)
+
+    assert regression.rate_ms_per_day == pytest.approx(120_000)
+
+
+def test_regression_follows_recent_consumption_and_restores() -> None:
+    """Old samples fade out and running sums survive a storage round trip."""
+    regression = GasConsumptionRegression(half_life_days=2)
+    total = 0
+    for hour in range(24 * 30):
+        total += 1_000 if hour < 24 * 20 else 4_000
+        regression.add_sample(START + timedelta(hours=hour), total)
+    regression.add_sample(START, 0)
+
+    restored = GasConsumptionRegression.from_dict(regression.as_dict())
+
+    assert restored == regression
+    assert 3 * 24_000 < restored.rate_ms_per_day <= 96_000
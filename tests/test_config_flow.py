@@ -1,10 +1,14 @@
 """Tests for the Ecobulles config flow."""
 
-from unittest.mock import AsyncMock, patch
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from homeassistant import config_entries
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.ecobulles.config_flow import CannotConnect, InvalidAuth
@@ -13,6 +17,7 @@ from custom_components.ecobulles.const import (
     CONF_CO2_MICROMETRIC_SCREW_SETTING,
     CONF_ENABLE_RAW_CO2_SENSOR,
     DOMAIN,
+    SIGNAL_RAW_CO2_SENSOR_TOGGLED,
 )
 
 pytestmark = [
@@ -54,10 +59,6 @@ async def test_user_flow_creates_entry(hass) -> None:
             "custom_components.ecobulles.config_flow.validate_input",
             AsyncMock(return_value=FLOW_INFO),
         ),
-        patch(
-            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
-            AsyncMock(return_value=DEVICE_INFO),
-        ),
         patch(
             "custom_components.ecobulles.async_setup_entry",
             AsyncMock(return_value=True),
@@ -137,10 +138,6 @@ async def test_user_flow_reconfigures_existing_entry(hass) -> None:
             "custom_components.ecobulles.config_flow.validate_input",
             AsyncMock(return_value=FLOW_INFO),
         ),
-        patch(
-            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
-            AsyncMock(return_value=DEVICE_INFO),
-        ),
         patch.object(
             hass.config_entries,
             "async_reload",
@@ -186,27 +183,154 @@ async def test_user_flow_without_input_shows_form(hass) -> None:
     assert result["step_id"] == "user"
 
 
-async def test_validate_input_normalizes_success(hass) -> None:
-    """validate_input returns normalized metadata after authentication."""
+LOGIN_PAYLOAD = {
+    "status": 1,
+    "data": {
+        "userid": "user-id",
+        "eco_ref": "eco-ref",
+        "conso": {
+            "boite": {
+                **DEVICE_INFO["data"]["boite"],
+                "name": " Box ",
+                "activated": "1",
+                "locked": "0",
+                "suspended": "0",
+                "suspended_time": "0",
+                "suspended_date": None,
+                "last_alert": None,
+            }
+        },
+    },
+}
+
+
+async def test_validate_input_reads_device_from_login_payload(hass) -> None:
+    """A complete login payload describes the device in one request."""
     from custom_components.ecobulles.config_flow import validate_input
 
-    with patch(
-        "custom_components.ecobulles.config_flow.EcobullesClient.authenticate",
-        AsyncMock(return_value=(True, "user-id", "eco-ref", "Box")),
+    device_info = AsyncMock()
+    with (
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_login_payload",
+            AsyncMock(return_value=LOGIN_PAYLOAD),
+        ),
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
+            device_info,
+        ),
+    ):
+        info = await validate_input(hass, USER_INPUT)
+
+    device_info.assert_not_awaited()
+    assert info["title"] == "Ecobulles : Box"
+    assert (info["user_id"], info["eco_ref"]) == ("user-id", "eco-ref")
+    assert info["num_serie"] == "XC240007"
+    assert info["firmware_version"] == "1.0"
+    assert info["install_date"] == "2024-01-01T00:00:00"
+
+
+async def test_validate_input_fetches_missing_device_fields(hass) -> None:
+    """Fields missing from the login payload come from the device endpoint."""
+    from custom_components.ecobulles.config_flow import validate_input
+
+    login = {
+        "status": 1,
+        "data": {
+            "userid": "user-id",
+            "eco_ref": "eco-ref",
+            "conso": {"boite": {"name": "Box"}},
+        },
+    }
+    device_info = AsyncMock(return_value=DEVICE_INFO)
+    with (
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_login_payload",
+            AsyncMock(return_value=login),
+        ),
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
+            device_info,
+        ),
     ):
-        assert await validate_input(hass, USER_INPUT) == {
-            "title": "Ecobulles : Box",
-            "user_id": "user-id",
+        info = await validate_input(hass, USER_INPUT)
+
+    device_info.assert_awaited_once_with("eco-ref")
+    assert info["num_serie"] == "XC240007"
+    assert info["last_date_receive"] == "2026-01-01T00:00:00"
+
+
+async def test_validate_input_skips_device_fetch_for_polled_fields(hass) -> None:
+    """Fields the first poll refreshes anyway do not trigger a device fetch."""
+    from custom_components.ecobulles.config_flow import validate_input
+
+    login = {
+        "status": 1,
+        "data": {
+            "userid": "user-id",
             "eco_ref": "eco-ref",
+            "conso": {
+                "boite": {"name": "Box", "firm_ver": "1.0", "num_serie": "XC240007"}
+            },
+        },
+    }
+    device_info = AsyncMock()
+    with (
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_login_payload",
+            AsyncMock(return_value=login),
+        ),
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
+            device_info,
+        ),
+    ):
+        info = await validate_input(hass, USER_INPUT)
+
+    device_info.assert_not_awaited()
+    assert info["num_serie"] == "XC240007"
+    assert info["last_date_receive"] is None
+
+
+async def test_validate_input_fetches_known_device_alongside_login(hass) -> None:
+    """With a known eco_ref, the device fetch does not wait for the login."""
+    from custom_components.ecobulles.config_flow import validate_input
+
+    fetched = asyncio.Event()
+
+    async def login(email, password):
+        await asyncio.wait_for(fetched.wait(), 1)
+        return {
+            "status": 1,
+            "data": {"userid": "user-id", "eco_ref": "eco-ref", "conso": {}},
         }
 
+    async def device_info(eco_ref):
+        fetched.set()
+        return DEVICE_INFO
+
+    with (
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_login_payload",
+            side_effect=login,
+        ),
+        patch(
+            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
+            side_effect=device_info,
+        ) as device_info_mock,
+    ):
+        info = await validate_input(hass, USER_INPUT, "eco-ref")
+
+    device_info_mock.assert_called_once_with("eco-ref")
+    assert info["title"] == "Ecobulles : Test box"
+    assert info["firmware_version"] == "1.0"
+
 
 async def test_validate_input_maps_runtime_errors(hass) -> None:
     """Low-level API runtime errors become cannot-connect errors."""
     from custom_components.ecobulles.config_flow import validate_input
 
     with patch(
-        "custom_components.ecobulles.config_flow.EcobullesClient.authenticate",
+        "custom_components.ecobulles.config_flow.EcobullesClient.get_login_payload",
         AsyncMock(side_effect=RuntimeError("network")),
     ):
         with pytest.raises(CannotConnect):
@@ -218,20 +342,21 @@ async def test_validate_input_maps_timeout_errors(hass) -> None:
     from custom_components.ecobulles.config_flow import validate_input
 
     with patch(
-        "custom_components.ecobulles.config_flow.EcobullesClient.authenticate",
+        "custom_components.ecobulles.config_flow.EcobullesClient.get_login_payload",
         AsyncMock(side_effect=TimeoutError),
     ):
         with pytest.raises(CannotConnect):
             await validate_input(hass, USER_INPUT)
 
 
-async def test_validate_input_rejects_invalid_auth(hass) -> None:
+@pytest.mark.parametrize("payload", [None, {"status": 0}])
+async def test_validate_input_rejects_invalid_auth(hass, payload) -> None:
     """Authentication failures become invalid-auth errors."""
     from custom_components.ecobulles.config_flow import validate_input
 
     with patch(
-        "custom_components.ecobulles.config_flow.EcobullesClient.authenticate",
-        AsyncMock(return_value=(False, None, None, None)),
+        "custom_components.ecobulles.config_flow.EcobullesClient.get_login_payload",
+        AsyncMock(return_value=payload),
     ):
         with pytest.raises(InvalidAuth):
             await validate_input(hass, USER_INPUT)
@@ -429,10 +554,6 @@ async def test_reconfigure_updates_entry(hass, mock_config_entry) -> None:
             "custom_components.ecobulles.config_flow.validate_input",
             AsyncMock(return_value=FLOW_INFO),
         ),
-        patch(
-            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
-            AsyncMock(return_value=DEVICE_INFO),
-        ),
         patch.object(
             hass.config_entries,
             "async_reload",
@@ -468,10 +589,6 @@ async def test_options_flow_updates_data_and_options(
             "custom_components.ecobulles.config_flow.validate_input",
             AsyncMock(return_value=FLOW_INFO),
         ),
-        patch(
-            "custom_components.ecobulles.config_flow.EcobullesClient.get_device_info",
-            AsyncMock(return_value=DEVICE_INFO),
-        ),
         patch.object(
             hass.config_entries,
             "async_reload",
@@ -491,6 +608,50 @@ async def test_options_flow_updates_data_and_options(
     assert mock_config_entry.options[CONF_ENABLE_RAW_CO2_SENSOR] is True
 
 
+async def test_options_flow_applies_model_changes_live(hass) -> None:
+    """Changing only model settings skips the cloud and the reload."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**USER_INPUT, "eco_ref": "test-eco-ref"},
+        options={CONF_ENABLE_RAW_CO2_SENSOR: False},
+    )
+    entry.add_to_hass(hass)
+    entry.mock_state(hass, config_entries.ConfigEntryState.LOADED)
+    coordinator = MagicMock()
+    entry.runtime_data = SimpleNamespace(coordinator=coordinator)
+    signals: list[bool] = []
+    async_dispatcher_connect(
+        hass,
+        SIGNAL_RAW_CO2_SENSOR_TOGGLED.format(entry.entry_id),
+        callback(lambda enabled: signals.append(enabled)),
+    )
+    validate = AsyncMock()
+
+    with (
+        patch("custom_components.ecobulles.config_flow.validate_input", validate),
+        patch.object(hass.config_entries, "async_reload", AsyncMock()) as reload_mock,
+    ):
+        result = await hass.config_entries.options.async_init(entry.entry_id)
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            user_input={
+                **USER_INPUT,
+                CONF_CO2_MICROMETRIC_SCREW_SETTING: 7,
+                CONF_ENABLE_RAW_CO2_SENSOR: True,
+            },
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == "create_entry"
+    validate.assert_not_awaited()
+    reload_mock.assert_not_awaited()
+    assert entry.data[CONF_CO2_MICROMETRIC_SCREW_SETTING] == 7
+    assert entry.data["eco_ref"] == "test-eco-ref"
+    assert entry.options[CONF_ENABLE_RAW_CO2_SENSOR] is True
+    coordinator.async_apply_config.assert_called_once_with(dict(entry.data))
+    assert signals == [True]
+
+
 async def test_options_flow_handles_connection_error(
     hass, mock_config_entry
 ) -> None:
@@ -1,13 +1,17 @@
 """Tests for Ecobulles diagnostics."""
 
+from datetime import UTC, datetime
 from types import SimpleNamespace
 
 import pytest
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from custom_components.ecobulles.api_metrics import ApiMetrics
 from custom_components.ecobulles.const import DOMAIN
 from custom_components.ecobulles.diagnostics import async_get_config_entry_diagnostics
+from custom_components.ecobulles.flight_recorder import FlightRecorder
+from custom_components.ecobulles.profiling import PhaseTimer
 
 pytestmark = pytest.mark.asyncio
 
@@ -24,13 +28,31 @@ async def test_diagnostics_redacts_sensitive_data(hass) -> None:
         },
         options={"eco_ref": "44B7D095E9C6", "safe": True},
     )
+    api_metrics = ApiMetrics()
+    api_metrics.record("getAppUserCo2.php", 120.0, error=True)
+    recorder = FlightRecorder()
+    recorder.record(
+        "getAppUserCo2.php",
+        {"eco_ref": "44B7D095E9C6"},
+        started=datetime(2026, 5, 21, 10, 0, tzinfo=UTC),
+        duration_ms=120.0,
+        status=500,
+        size=0,
+        outcome="no_data",
+    )
+    phase_timer = PhaseTimer("Box", threshold_ms=0)
+    phase_timer.start()
+    phase_timer.lap("parse")
     entry.runtime_data = SimpleNamespace(
         coordinator=SimpleNamespace(
             data={
                 "active_alerts": [{"alert_type": "2"}],
                 "total_eau": 123,
                 "num_serie": "XC240007",
-            }
+            },
+            api_metrics=api_metrics,
+            api=SimpleNamespace(flight_recorder=recorder),
+            phase_timer=phase_timer,
         )
     )
 
@@ -45,6 +67,21 @@ async def test_diagnostics_redacts_sensitive_data(hass) -> None:
     assert diagnostics["coordinator"]["active_alerts"] == "**REDACTED**"
     assert diagnostics["coordinator"]["num_serie"] == "**REDACTED**"
     assert diagnostics["coordinator"]["total_eau"] == 123
+    assert diagnostics["water_draws"] == []
+    assert diagnostics["api_metrics"]["getAppUserCo2.php"]["errors"] == 1
+    assert diagnostics["recent_requests"] == [
+        {
+            "endpoint": "getAppUserCo2.php",
+            "params": {"eco_ref": "**REDACTED**"},
+            "started": "2026-05-21T10:00:00+00:00",
+            "duration_ms": 120.0,
+            "status": 500,
+            "size": 0,
+            "outcome": "no_data",
+        }
+    ]
+    assert list(diagnostics["event_loop"]["loop_ms"]) == ["parse"]
+    assert diagnostics["event_loop"]["slow_sections"][0]["phase"] == "parse"
 
 
 async def test_diagnostics_without_runtime_data(hass) -> None:
@@ -54,4 +91,8 @@ async def test_diagnostics_without_runtime_data(hass) -> None:
     assert await async_get_config_entry_diagnostics(hass, entry) == {
         "entry": {"data": {}, "options": {}},
         "coordinator": {},
+        "water_draws": [],
+        "api_metrics": {},
+        "recent_requests": [],
+        "event_loop": {},
     }
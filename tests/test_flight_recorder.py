@@ -0,0 +1,47 @@
+"""Tests for the request flight recorder."""
+
+from datetime import UTC, datetime, timedelta
+
+from custom_components.ecobulles.flight_recorder import FlightRecorder, redact_params
+
+
+def test_flight_recorder_keeps_last_requests() -> None:
+    """Only the newest requests are kept, oldest first."""
+    recorder = FlightRecorder(size=2)
+    started = datetime(2026, 5, 21, 10, 0, tzinfo=UTC)
+    for index in range(3):
+        recorder.record(
+            f"endpoint-{index}.php",
+            {},
+            started=started + timedelta(seconds=index),
+            duration_ms=10.04,
+            status=200,
+            size=100,
+            outcome="ok",
+        )
+
+    records = recorder.as_list()
+
+    assert [record["endpoint"] for record in records] == [
+        "endpoint-1.php",
+        "endpoint-2.php",
+    ]
+    assert records[0]["started"] == "2026-05-21T10:00:01+00:00"
+    assert records[0]["duration_ms"] == 10.0
+
+
+def test_redact_params_masks_identifiers() -> None:
+    """Credentials and device identifiers are masked; time ranges are kept."""
+    assert redact_params(
+        {
+            "email": "user@example.com",
+            "password": "hash",
+            "eco_ref": "eco-ref",
+            "startdate": "2026-05-21 10:00:00",
+        }
+    ) == {
+        "email": "**REDACTED**",
+        "password": "**REDACTED**",
+        "eco_ref": "**REDACTED**",
+        "startdate": "2026-05-21 10:00:00",
+    }
@@ -0,0 +1,53 @@
+"""Tests for incremental water flow rate estimation."""
+
+from datetime import datetime, timedelta
+
+from custom_components.ecobulles.flow_rate import FlowRateTracker
+
+START = datetime(2026, 1, 1, 8, 0)
+
+
+def test_instant_and_rolling_rates() -> None:
+    """Rates come from the last interval and from the rolling window."""
+    tracker = FlowRateTracker(window=timedelta(minutes=10))
+    assert tracker.instant_rate_l_per_min(START) is None
+
+    for index, liters in enumerate([100, 104, 112, 112, 112, 112, 112]):
+        tracker.add_sample(START + timedelta(minutes=2 * index), liters)
+    now = START + timedelta(minutes=12, seconds=30)
+
+    assert tracker.instant_rate_l_per_min(now) == 0.0
+    # The baseline is the last sample at or before the 10 minute window start.
+    assert tracker.rolling_rate_l_per_min(now) == 0.8
+
+
+def test_stale_and_decreasing_samples() -> None:
+    """Non-advancing samples are ignored and counter drops restart the buffer."""
+    tracker = FlowRateTracker()
+    tracker.add_sample(START, 100)
+    tracker.add_sample(START, 150)
+    tracker.add_sample(START + timedelta(minutes=1), 103)
+
+    assert tracker.instant_rate_l_per_min(START + timedelta(minutes=1)) == 3.0
+
+    tracker.add_sample(START + timedelta(minutes=2), 5)
+    assert tracker.instant_rate_l_per_min(START + timedelta(minutes=2)) is None
+    assert tracker.rolling_rate_l_per_min(START + timedelta(minutes=2)) is None
+
+
+def test_rates_decay_once_the_box_stops_reporting() -> None:
+    """Without new readings the flow is assumed to have stopped."""
+    tracker = FlowRateTracker(
+        window=timedelta(minutes=10), stale_after=timedelta(minutes=2)
+    )
+    tracker.add_sample(START, 100)
+    tracker.add_sample(START + timedelta(minutes=2), 110)
+
+    fresh = START + timedelta(minutes=3)
+    assert tracker.instant_rate_l_per_min(fresh) == 5.0
+    assert tracker.rolling_rate_l_per_min(fresh) == 5.0
+
+    stale = START + timedelta(minutes=5)
+    assert tracker.instant_rate_l_per_min(stale) == 0.0
+    assert tracker.rolling_rate_l_per_min(stale) == 2.0
+    assert tracker.rolling_rate_l_per_min(START + timedelta(minutes=13)) == 0.0
@@ -0,0 +1,98 @@
+"""Tests for history window helpers."""
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.ecobulles.history import (
+    HistoryCacheStats,
+    HistoryCsvExport,
+    UsageWindow,
+    history_request_payload,
+    iter_windows,
+    parse_usage_window,
+)
+
+START = datetime(2026, 5, 21, 10, 0)
+STOP = datetime(2026, 5, 21, 11, 0)
+
+
+def test_windows_and_request_payload() -> None:
+    """Windows tile the range and requests use the cloud datetime format."""
+    windows = iter_windows(START, START + timedelta(minutes=150), timedelta(hours=1))
+    assert list(windows) == [
+        (START, STOP),
+        (STOP, STOP + timedelta(hours=1)),
+        (STOP + timedelta(hours=1), STOP + timedelta(minutes=90)),
+    ]
+    assert history_request_payload("eco-ref", START, STOP) == {
+        "eco_ref": "eco-ref",
+        "eau": "1",
+        "startdate": "2026-05-21 10:00:00",
+        "stopdate": "2026-05-21 11:00:00",
+    }
+
+
+def test_parse_usage_window_prefers_graph_points() -> None:
+    """Graph points are summed and their last date becomes the sample time."""
+    window = parse_usage_window(
+        {
+            "data": {
+                "infoconso": {
+                    "total_eau": "9",
+                    "total_gas": "12000",
+                    "graph": [
+                        {"date": "2026/05/21 10:10:00", "eau": "2", "gas": "3000"},
+                        {"date": "2026-05-21 10:40:00", "eau": "1", "gas": "1500"},
+                    ],
+                }
+            }
+        },
+        START,
+        STOP,
+    )
+
+    assert window.water_liters == 3
+    assert window.raw_co2 == 4_500
+    assert window.api_total_water == 9
+    assert window.sample_time == datetime(2026, 5, 21, 10, 40)
+    assert UsageWindow.from_row(START.isoformat(), window.as_row()) == window
+
+
+def test_parse_usage_window_falls_back_to_totals() -> None:
+    """Without graph points the window totals are used."""
+    window = parse_usage_window(
+        {"data": {"infoconso": {"total_eau": 4, "total_gas": 6000}}}, START, STOP
+    )
+
+    assert (window.water_liters, window.raw_co2, window.sample_time) == (4, 6000, STOP)
+    assert parse_usage_window(None, START, STOP) is None
+
+
+def test_history_csv_export_emits_running_totals() -> None:
+    """Rows carry running totals at each window boundary in UTC."""
+    export = HistoryCsvExport(
+        "sensor.box_water_usage_total",
+        "sensor.box_raw_co2_value",
+        timezone(timedelta(hours=2)),
+    )
+
+    first = export.rows(UsageWindow(START, STOP, 2, 3_000))
+    second = export.rows(UsageWindow(STOP, STOP + timedelta(hours=1), 1, 1_500))
+
+    assert first == [
+        ["sensor.box_water_usage_total", "0", "2026-05-21T08:00:00Z"],
+        ["sensor.box_raw_co2_value", "0", "2026-05-21T08:00:00Z"],
+        ["sensor.box_water_usage_total", "2", "2026-05-21T09:00:00Z"],
+        ["sensor.box_raw_co2_value", "3000", "2026-05-21T09:00:00Z"],
+    ]
+    assert second[-1] == ["sensor.box_raw_co2_value", "4500", "2026-05-21T10:00:00Z"]
+    assert export.rows_written == 6
+
+
+def test_history_cache_stats_hit_ratio() -> None:
+    """The hit ratio is unknown until a backfill ran."""
+    stats = HistoryCacheStats()
+    assert stats.hit_ratio is None
+
+    stats.record(hits=3, misses=1)
+
+    assert stats.hit_ratio == 0.75
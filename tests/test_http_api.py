@@ -0,0 +1,49 @@
+"""Tests for the Ecobulles HTTP API."""
+
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.ecobulles.api_metrics import ApiMetrics
+from custom_components.ecobulles.const import CONF_ENABLE_METRICS_ENDPOINT, DOMAIN
+from custom_components.ecobulles.history import HistoryCacheStats
+from custom_components.ecobulles.http_api import METRICS_URL, async_register_http_views
+from custom_components.ecobulles.profiling import PhaseTimer
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_metrics_view_serves_enabled_entries(hass, hass_client) -> None:
+    """Only entries with the option enabled are exported."""
+    assert await async_setup_component(hass, "http", {})
+    async_register_http_views(hass)
+    config = {CONF_ENABLE_METRICS_ENDPOINT: False}
+    entry = MockConfigEntry(domain=DOMAIN, data={"eco_ref": "eco-ref"})
+    entry.add_to_hass(hass)
+    entry.mock_state(hass, ConfigEntryState.LOADED)
+    entry.runtime_data = SimpleNamespace(
+        coordinator=SimpleNamespace(
+            eco_ref="eco-ref",
+            config=config,
+            api_metrics=ApiMetrics(),
+            history_cache=HistoryCacheStats(),
+            phase_timer=PhaseTimer(),
+            last_update_success=True,
+            data={"total_water_liters": 42},
+        )
+    )
+    client = await hass_client()
+
+    response = await client.get(METRICS_URL)
+    assert response.status == HTTPStatus.NOT_FOUND
+
+    config[CONF_ENABLE_METRICS_ENDPOINT] = True
+    response = await client.get(METRICS_URL)
+
+    assert response.status == HTTPStatus.OK
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'ecobulles_water_liters_total{eco_ref="eco-ref"} 42' in await response.text()
@@ -0,0 +1,99 @@
+"""Tests for streaming water leak detection."""
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.ecobulles.leak_detection import LeakDetector
+
+TZ = timezone(timedelta(hours=1))
+
+
+def test_continuous_flow_is_flagged_after_duration() -> None:
+    """Water drawn in every interval for long enough raises a leak."""
+    detector = LeakDetector(continuous_flow=timedelta(minutes=10))
+    start = datetime(2026, 1, 1, 12, 0, tzinfo=TZ)
+
+    for minute in range(0, 10, 2):
+        status = detector.add_sample(start + timedelta(minutes=minute), minute)
+    assert status.continuous_flow is False
+    assert status.continuous_flow_minutes == 8
+
+    status = detector.add_sample(start + timedelta(minutes=10), 11)
+    assert status.continuous_flow is True
+    assert status.detected is True
+
+    status = detector.add_sample(start + timedelta(minutes=12), 11)
+    assert status.detected is False
+    assert status.continuous_flow_minutes == 0
+
+
+def test_slow_steady_overnight_draw_is_flagged() -> None:
+    """One liter every ten minutes all night long is reported as a leak."""
+    detector = LeakDetector(
+        continuous_flow=timedelta(0),
+        night_hours=(1, 5),
+        night_window=timedelta(hours=1),
+        night_bucket=timedelta(minutes=30),
+    )
+    start = datetime(2026, 1, 1, 0, 0, tzinfo=TZ)
+
+    liters = 0
+    flagged_at = None
+    for minute in range(0, 180, 2):
+        if minute % 10 == 0:
+            liters += 1
+        status = detector.add_sample(start + timedelta(minutes=minute), liters)
+        assert status.continuous_flow is False
+        if status.overnight_flow and flagged_at is None:
+            flagged_at = minute
+
+    # The buckets before 01:00 are outside the night hours and do not count.
+    assert flagged_at == 120
+
+
+def test_idle_night_and_stale_samples() -> None:
+    """A quiet night is not flagged and stale samples are ignored."""
+    detector = LeakDetector()
+    start = datetime(2026, 1, 1, 1, 0, tzinfo=TZ)
+
+    for minute in range(0, 240, 2):
+        status = detector.add_sample(start + timedelta(minutes=minute), 100)
+    assert status.detected is False
+    assert detector.add_sample(start, 500) is status
+
+
+def test_evening_use_before_the_night_is_not_flagged() -> None:
+    """Water drawn until the night starts does not fill the night window."""
+    detector = LeakDetector(continuous_flow=timedelta(0))
+    start = datetime(2026, 1, 1, 23, 0, tzinfo=TZ)
+
+    liters = 0
+    for minute in range(0, 240, 2):
+        if minute < 120 and minute % 10 == 0:
+            liters += 1
+        status = detector.add_sample(start + timedelta(minutes=minute), liters)
+        assert status.overnight_flow is False
+
+
+def test_overnight_flow_stays_latched_until_a_dry_bucket() -> None:
+    """A night leak stays reported after 05:00 until the water stops."""
+    detector = LeakDetector(
+        continuous_flow=timedelta(0),
+        night_window=timedelta(hours=1),
+        night_bucket=timedelta(minutes=30),
+    )
+    start = datetime(2026, 1, 1, 3, 0, tzinfo=TZ)
+
+    liters = 0
+    for minute in range(0, 240, 2):
+        if minute % 10 == 0:
+            liters += 1
+        status = detector.add_sample(start + timedelta(minutes=minute), liters)
+    assert status.overnight_flow is True
+
+    stopped = start + timedelta(minutes=240)
+    status = detector.add_sample(stopped, liters)
+    assert status.overnight_flow is True
+    status = detector.add_sample(stopped + timedelta(minutes=20), liters)
+    assert status.overnight_flow is True
+    status = detector.add_sample(stopped + timedelta(minutes=30), liters)
+    assert status.overnight_flow is False
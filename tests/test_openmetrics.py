@@ -0,0 +1,88 @@
+"""Tests for the Prometheus text exposition."""
+
+from types import SimpleNamespace
+
+from custom_components.ecobulles.api_metrics import ApiMetrics
+from custom_components.ecobulles.history import HistoryCacheStats
+from custom_components.ecobulles.openmetrics import MetricsWriter, render_metrics
+from custom_components.ecobulles.profiling import PhaseTimer
+from custom_components.ecobulles.rate_limit import RateLimiter
+
+
+def _coordinator(eco_ref: str, data: dict | None) -> SimpleNamespace:
+    metrics = ApiMetrics()
+    metrics.record("getAppUserCo2.php", 40.0, size=120)
+    metrics.record("getAppUserCo2.php", 300.0, error=True)
+    return SimpleNamespace(
+        eco_ref=eco_ref,
+        api_metrics=metrics,
+        history_cache=HistoryCacheStats(hits=3, misses=1),
+        phase_timer=PhaseTimer(),
+        last_update_success=data is not None,
+        data=data,
+    )
+
+
+def test_render_metrics_groups_families_across_devices() -> None:
+    """Each family is declared once, followed by the samples of every device."""
+    limiter = RateLimiter(2.0)
+    limiter.acquisitions, limiter.waits, limiter.wait_seconds = 5, 2, 0.75
+
+    text = render_metrics(
+        [
+            _coordinator(
+                "eco-one",
+                {
+                    "total_water_liters": 165_007,
+                    "bottle_changes": 2,
+                    "refresh_duration_ms": 250.0,
+                },
+            ),
+            _coordinator("eco-two", None),
+        ],
+        limiter,
+    )
+    lines = text.splitlines()
+
+    assert text.endswith("\n")
+    assert lines.count("# TYPE ecobulles_requests_total counter") == 1
+    assert "ecobulles_rate_limiter_waits_total 2" in lines
+    assert "ecobulles_rate_limiter_wait_seconds_total 0.75" in lines
+    assert (
+        'ecobulles_requests_total{eco_ref="eco-one",endpoint="getAppUserCo2.php"} 2'
+    ) in lines
+    assert (
+        "ecobulles_request_errors_total"
+        '{eco_ref="eco-two",endpoint="getAppUserCo2.php"} 1'
+    ) in lines
+    assert (
+        "ecobulles_request_duration_seconds_bucket"
+        '{eco_ref="eco-one",endpoint="getAppUserCo2.php",le="0.05"} 1'
+    ) in lines
+    assert (
+        "ecobulles_request_duration_seconds_bucket"
+        '{eco_ref="eco-one",endpoint="getAppUserCo2.php",le="+Inf"} 2'
+    ) in lines
+    assert 'ecobulles_history_cache_hit_ratio{eco_ref="eco-one"} 0.75' in lines
+    assert 'ecobulles_water_liters_total{eco_ref="eco-one"} 165007' in lines
+    assert 'ecobulles_bottle_changes_total{eco_ref="eco-one"} 2' in lines
+    assert 'ecobulles_last_refresh_duration_seconds{eco_ref="eco-one"} 0.25' in lines
+    assert 'ecobulles_last_refresh_success{eco_ref="eco-two"} 0' in lines
+    assert 'ecobulles_water_liters_total{eco_ref="eco-two"}' not in text
+    request_lines = [
+        index for index, line in enumerate(lines) if "ecobulles_requests_total{" in line
+    ]
+    assert request_lines[1] == request_lines[0] + 1
+
+
+def test_metrics_writer_escapes_labels_and_skips_empty_families() -> None:
+    """Label values are escaped and families without samples are omitted."""
+    writer = MetricsWriter()
+    writer.add("ecobulles_empty", "gauge", "Nothing.", None)
+    writer.add("ecobulles_label", "gauge", "Escaped.", 1.5, {"name": 'a"b\\c'})
+
+    assert writer.render() == (
+        "# HELP ecobulles_label Escaped.\n"
+        "# TYPE ecobulles_label gauge\n"
+        'ecobulles_label{name="a\\"b\\\\c"} 1.5\n'
+    )
@@ -0,0 +1,60 @@
+"""Tests for the period usage rollup."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.ecobulles.period_usage import PeriodUsageRollup, period_start
+
+TZ = timezone(timedelta(hours=2))
+
+
+def test_period_start_boundaries() -> None:
+    """Periods start on the local hour, midnight, Monday and the 1st."""
+    timestamp = datetime(2026, 5, 21, 14, 37, 12, tzinfo=TZ)
+
+    assert period_start("hour", timestamp) == datetime(2026, 5, 21, 14, tzinfo=TZ)
+    assert period_start("day", timestamp) == datetime(2026, 5, 21, tzinfo=TZ)
+    assert period_start("week", timestamp) == datetime(2026, 5, 18, tzinfo=TZ)
+    assert period_start("month", timestamp) == datetime(2026, 5, 1, tzinfo=TZ)
+    with pytest.raises(ValueError):
+        period_start("year", timestamp)
+
+
+def test_rollup_resets_each_period_at_its_boundary() -> None:
+    """Crossing local midnight resets hour and day but keeps week and month."""
+    rollup = PeriodUsageRollup()
+    rollup.add_sample(datetime(2026, 5, 20, 23, 50, tzinfo=TZ), 100, 1_000)
+    rollup.add_sample(datetime(2026, 5, 20, 23, 58, tzinfo=TZ), 110, 16_000)
+
+    assert rollup.periods["day"].water_liters == 10
+    assert rollup.periods["hour"].gas_ms == 15_000
+
+    rollup.add_sample(datetime(2026, 5, 21, 0, 2, tzinfo=TZ), 112, 19_000)
+    rollup.add_sample(datetime(2026, 5, 21, 0, 10, tzinfo=TZ), 115, 23_500)
+
+    assert rollup.periods["day"].start == "2026-05-21T00:00:00+02:00"
+    assert rollup.periods["day"].water_liters == 5
+    assert rollup.periods["hour"].gas_ms == 7_500
+    assert rollup.periods["week"].water_liters == 15
+    assert rollup.periods["month"].gas_ms == 22_500
+
+    restored = PeriodUsageRollup.from_dict(rollup.as_dict())
+    assert restored == rollup
+
+
+def test_rollup_keeps_usage_drawn_across_a_boundary() -> None:
+    """Closed hours plus the current one add up to everything drawn."""
+    rollup = PeriodUsageRollup()
+    start = datetime(2026, 5, 20, 22, 55, tzinfo=TZ)
+    closed_liters = 0.0
+    for step in range(13):
+        timestamp = start + timedelta(minutes=10 * step)
+        previous = rollup.periods["hour"]
+        closed = (previous.start, previous.water_liters)
+        rollup.add_sample(timestamp, 100 + 5 * step, 0)
+        if closed[0] is not None and rollup.periods["hour"].start != closed[0]:
+            closed_liters += closed[1]
+
+    assert closed_liters + rollup.periods["hour"].water_liters == 60
+    assert rollup.periods["week"].water_liters == 60
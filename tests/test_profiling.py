@@ -0,0 +1,96 @@
+"""Tests for refresh phase timing and profiling reports."""
+
+import asyncio
+import cProfile
+import logging
+from types import SimpleNamespace
+import tracemalloc
+
+import pytest
+
+from custom_components.ecobulles.profiling import (
+    PhaseTimer,
+    ReplayClient,
+    format_profile_report,
+)
+
+
+def test_phase_timer_accumulates_laps() -> None:
+    """Lapping a phase twice charges both sections to it."""
+    timer = PhaseTimer()
+    timer.start()
+    timer.lap("fetch")
+    timer.lap("parse")
+    timer.lap("fetch")
+
+    assert list(timer.phases) == ["fetch", "parse"]
+    assert all(duration_ms >= 0 for duration_ms in timer.phases.values())
+
+    timer.start()
+    assert timer.phases == {}
+
+
+def test_phase_timer_records_slow_loop_sections(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Only synchronous phases count as event-loop time and slow sections."""
+    timer = PhaseTimer("Box", threshold_ms=-1)
+    timer.start()
+    with caplog.at_level(logging.WARNING):
+        timer.lap("fetch")
+        timer.lap("parse")
+        timer.lap("entity_writes")
+
+    assert list(timer.loop_ms) == ["parse", "entity_writes"]
+    assert timer.loop_ms_total == sum(timer.loop_ms.values())
+    assert [section.phase for section in timer.slow_sections] == [
+        "parse",
+        "entity_writes",
+    ]
+    assert "Ecobulles Box held the event loop" in caplog.text
+    assert timer.as_dict()["slow_sections"][0]["phase"] == "parse"
+
+    timer.start()
+    assert list(timer.loop_ms) == ["parse", "entity_writes"]
+
+
+def test_replay_client_serves_copies_and_delegates() -> None:
+    """Replayed payloads cannot be mutated by a refresh."""
+    usage = {"total_eau": 7, "total_gas": 1500}
+    client = ReplayClient(
+        SimpleNamespace(metrics="metrics"), usage, {"data": {}}, None
+    )
+
+    replayed = asyncio.run(client.get_total_water_and_co2_usage("eco-ref"))
+    replayed["total_eau"] = 8
+
+    assert asyncio.run(client.get_total_water_and_co2_usage("eco-ref")) == usage
+    assert asyncio.run(client.get_device_info("eco-ref")) == {"data": {}}
+    assert asyncio.run(client.get_login_payload("user@example.com", "x")) is None
+    assert client.metrics == "metrics"
+
+
+def test_format_profile_report_lists_phases_functions_and_allocations() -> None:
+    """The report has a phase table, cumulative stats and allocation sites."""
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    blocks = [list(range(100)) for _ in range(100)]
+    profiler.disable()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    report = format_profile_report(
+        "Ecobulles Box: 1 replayed refresh(es)",
+        {"fetch": 1.5, "entity_writes": 0.25},
+        profiler,
+        snapshot,
+        top_allocations=3,
+    )
+
+    assert report.startswith("Ecobulles Box: 1 replayed refresh(es)\n")
+    assert "  fetch                      1.500 ms\n" in report
+    assert "cumulative time" in report
+    assert "Top 3 allocation sites:" in report
+    assert "test_profiling.py" in report
+    assert blocks
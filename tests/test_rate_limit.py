@@ -0,0 +1,28 @@
+"""Tests for the cloud request rate limiter."""
+
+import pytest
+
+from custom_components.ecobulles.rate_limit import RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_allows_burst_then_spaces_requests() -> None:
+    """The bucket serves a burst at once and then waits for refills."""
+    now = [0.0]
+    sleeps: list[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(2.0, burst=2, clock=lambda: now[0], sleep=fake_sleep)
+
+    for _ in range(4):
+        async with limiter:
+            pass
+
+    assert sleeps == [0.5, 0.5]
+    assert (limiter.acquisitions, limiter.waits, limiter.wait_seconds) == (4, 2, 1.0)
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
@@ -1,29 +1,45 @@
 """Focused unit tests for Ecobulles sensor internals."""
 
+from datetime import UTC, datetime, timedelta
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from homeassistant.helpers import device_registry as dr, issue_registry as ir
 from homeassistant.helpers.update_coordinator import UpdateFailed
-from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_capture_events,
+)
 
 from custom_components.ecobulles.const import (
+    CONF_BOTTLE_CHANGE_CONFIRM_READINGS,
     CONF_CO2_BOTTLE_WEIGHT_KG,
     CONF_CO2_MAX_DOSE_MG_PER_L,
     CONF_CO2_MICROMETRIC_SCREW_SETTING,
     CONF_CO2_MIN_DOSE_MG_PER_L,
     CONF_CO2_REFERENCE_PULSE_MS_PER_L,
     CONF_ENABLE_RAW_CO2_SENSOR,
+    CONF_LEAK_CONTINUOUS_FLOW_MINUTES,
     CONF_POLL_INTERVAL_SECONDS,
+    CONF_USE_FITTED_CO2_PULSE,
     DOMAIN,
+    EVENT_WATER_DRAW,
 )
 from custom_components.ecobulles.sensor import (
     ActiveAlertsSensor,
+    CO2BottleDaysRemainingSensor,
+    CO2BottleEmptyDateSensor,
     CO2InjectionTimeSensor,
+    DIAGNOSTIC_SENSORS,
+    DOSE_SENSORS,
     EcobullesCoordinator,
     EcobullesDescribedSensor,
     EstimatedCO2BottleUsageSensor,
+    GAS_SENSORS,
+    PERIOD_SENSORS,
     RAW_CO2_SENSOR,
+    _parse_timestamp,
     async_setup_entry,
 )
 
@@ -39,13 +55,13 @@ def _usage(total_eau: int = 100, total_gas: int = 150_000) -> dict:
     }
 
 
-def _device() -> dict:
+def _device(lastdatereceive: str = "2026-05-21 21:17:58") -> dict:
     """Return a minimal device payload."""
     return {
         "data": {
             "boite": {
                 "installdate": {"date": "2024-03-28 15:15:00"},
-                "lastdatereceive": "2026-05-21 21:17:58",
+                "lastdatereceive": lastdatereceive,
                 "activated": "1",
                 "locked": "0",
                 "suspended": "0",
@@ -114,7 +130,11 @@ async def test_coordinator_update_success_with_alerts_and_bottle_change(hass) ->
     coordinator = _coordinator(
         hass,
         api=api,
-        config={"email": "user@example.com", "password": "secret"},
+        config={
+            "email": "user@example.com",
+            "password": "secret",
+            CONF_BOTTLE_CHANGE_CONFIRM_READINGS: 1,
+        },
     )
     coordinator._water_usage_state = None
 
@@ -127,6 +147,7 @@ async def test_coordinator_update_success_with_alerts_and_bottle_change(hass) ->
                     "completed_cycles_liters": 0,
                     "cycle_water_liters": 165_000,
                     "bottle_changes": 0,
+                    "cycle_gas_ms": 200_000,
                 }
             ),
         ),
@@ -138,9 +159,245 @@ async def test_coordinator_update_success_with_alerts_and_bottle_change(hass) ->
     assert data["completed_cycles_liters"] == 165_000
     assert data["cycle_water_liters"] == 7
     assert data["total_water_liters"] == 165_007
+    assert data["gas_counter_reset"] is True
+    assert data["completed_cycles_gas_ms"] == 200_000
+    assert data["total_gas_ms"] == 350_000
     assert data["active_alert_count"] == 1
     assert data["install_date"] == "2024-03-28T15:15:00"
     save_mock.assert_awaited_once()
+    assert "gas_forecast" in save_mock.await_args.args[0]
+    assert "dose_calibration" in save_mock.await_args.args[0]
+    assert "dose_drift" in save_mock.await_args.args[0]
+    assert "water_profile" in save_mock.await_args.args[0]
+    assert data["water_forecast_today_l"] is None
+    assert data["period_usage"]["day"]["water_liters"] == 0
+    assert data["co2_dose_drift"] is False
+    assert data["co2_dose_ratio_ms_per_l"] is None
+    assert data["refresh_duration_ms"] >= 0
+    assert data["refresh_bytes"] == 0
+    assert data["api_latency_p50_ms"] is None
+    assert list(coordinator.phase_timer.phases) == [
+        "fetch",
+        "parse",
+        "water_accounting",
+        "serialize",
+        "store_save",
+    ]
+    assert set(coordinator.phase_timer.loop_ms) == {
+        "parse",
+        "water_accounting",
+        "serialize",
+    }
+    assert data["event_loop_ms_total"] == coordinator.phase_timer.loop_ms_total
+    assert coordinator.recorded_payloads[0] == _usage(total_eau=7)
+
+
+async def test_coordinator_waits_for_bottle_change_confirmation(hass) -> None:
+    """By default a lower reading must be reported twice before closing a cycle."""
+    coordinator = _coordinator(
+        hass,
+        api=SimpleNamespace(
+            get_total_water_and_co2_usage=AsyncMock(return_value=_usage(total_eau=7)),
+            get_device_info=AsyncMock(
+                side_effect=[
+                    _device("2026-05-21 21:17:58"),
+                    _device("2026-05-21 21:17:58"),
+                    _device("2026-05-21 21:19:58"),
+                ]
+            ),
+            get_login_payload=AsyncMock(return_value=None),
+        ),
+    )
+
+    with (
+        patch.object(
+            coordinator._store,
+            "async_load",
+            AsyncMock(return_value={"cycle_water_liters": 165_000}),
+        ),
+        patch.object(coordinator._store, "async_save", AsyncMock()) as save_mock,
+    ):
+        first = await coordinator._async_update_data()
+        repeated = await coordinator._async_update_data()
+        second = await coordinator._async_update_data()
+
+    assert first["bottle_changed"] is False
+    assert first["pending_drop_readings"] == 1
+    assert first["total_water_liters"] == 165_000
+    assert first["water_flow_rate_l_min"] is None
+    assert repeated["bottle_changed"] is False
+    assert repeated["pending_drop_readings"] == 1
+    assert second["bottle_changed"] is True
+    assert second["pending_drop_readings"] == 0
+    assert second["total_water_liters"] == 165_007
+    assert save_mock.await_args_list[0].args[0]["pending_drop_readings"] == 1
+
+
+async def test_coordinator_flow_rate_uses_box_report_time(hass, freezer) -> None:
+    """Flow rate is measured between box reports and decays once they stop."""
+    coordinator = _coordinator(
+        hass,
+        api=SimpleNamespace(
+            get_total_water_and_co2_usage=AsyncMock(
+                side_effect=[
+                    _usage(total_eau=100),
+                    _usage(total_eau=104),
+                    _usage(total_eau=104),
+                    _usage(total_eau=104),
+                ]
+            ),
+            get_device_info=AsyncMock(
+                side_effect=[
+                    _device("2026-05-21 21:00:00"),
+                    _device("2026-05-21 21:02:00"),
+                    _device("2026-05-21 21:02:00"),
+                    _device("2026-05-21 21:02:00"),
+                ]
+            ),
+            get_login_payload=AsyncMock(return_value=None),
+        ),
+    )
+
+    results = []
+    with (
+        patch.object(coordinator._store, "async_load", AsyncMock(return_value=None)),
+        patch.object(coordinator._store, "async_save", AsyncMock()),
+    ):
+        for polled_at in ("21:00:30", "21:02:30", "21:03:30", "21:06:00"):
+            freezer.move_to(_parse_timestamp(f"2026-05-21 {polled_at}"))
+            results.append(await coordinator._async_update_data())
+
+    _, reported, repeated, stale = results
+    assert reported["water_flow_rate_l_min"] == 2.0
+    assert repeated["water_flow_rate_l_min"] == 2.0
+    # The last report is older than the poll interval: no water is flowing.
+    assert stale["water_flow_rate_l_min"] == 0.0
+    assert stale["water_flow_rate_average_l_min"] == 0.667
+
+
+async def test_coordinator_fires_water_draw_events(hass) -> None:
+    """Completed draws are fired as events and kept in the recent index."""
+    usage = AsyncMock(
+        side_effect=[
+            _usage(total_eau=100, total_gas=1_000),
+            _usage(total_eau=110, total_gas=16_000),
+            _usage(total_eau=110, total_gas=16_000),
+            _usage(total_eau=110, total_gas=16_000),
+        ]
+    )
+    coordinator = _coordinator(
+        hass,
+        api=SimpleNamespace(
+            get_total_water_and_co2_usage=usage,
+            get_device_info=AsyncMock(
+                side_effect=[
+                    _device("2026-05-21 21:00:00"),
+                    _device("2026-05-21 21:02:00"),
+                    _device("2026-05-21 21:02:00"),
+                    _device("2026-05-21 21:04:00"),
+                ]
+            ),
+            get_login_payload=AsyncMock(return_value=None),
+        ),
+    )
+    events = async_capture_events(hass, EVENT_WATER_DRAW)
+
+    with (
+        patch.object(coordinator._store, "async_load", AsyncMock(return_value=None)),
+        patch.object(coordinator._store, "async_save", AsyncMock()),
+    ):
+        for _ in range(3):
+            data = await coordinator._async_update_data()
+        # The repeated box report does not close the draw.
+        assert data["water_draw_in_progress"] is True
+        data = await coordinator._async_update_data()
+    await hass.async_block_till_done()
+
+    assert data["water_draw_in_progress"] is False
+    assert len(events) == 1
+    assert events[0].data["eco_ref"] == "eco-ref"
+    assert events[0].data["liters"] == 10
+    assert events[0].data["co2_ms"] == 15_000
+    assert events[0].data["duration_seconds"] == 120
+    assert [draw.liters for draw in coordinator.recent_water_draws] == [10]
+
+
+async def test_replay_copy_leaves_live_state_untouched(hass) -> None:
+    """Refreshing a replay copy changes neither the live state nor the bus."""
+    coordinator = _coordinator(hass)
+    with (
+        patch.object(coordinator._store, "async_load", AsyncMock(return_value=None)),
+        patch.object(coordinator._store, "async_save", AsyncMock()),
+    ):
+        await coordinator._async_update_data()
+    state = coordinator._water_usage_state.as_dict()
+    events = async_capture_events(hass, EVENT_WATER_DRAW)
+    replay = coordinator.replay_copy(
+        SimpleNamespace(
+            get_total_water_and_co2_usage=AsyncMock(return_value=_usage(total_eau=50)),
+            get_device_info=AsyncMock(return_value=_device("2026-05-21 21:30:00")),
+            get_login_payload=AsyncMock(return_value=None),
+        )
+    )
+
+    with patch.object(replay._store, "async_save", AsyncMock()) as save:
+        data = await replay._async_update_data()
+    await hass.async_block_till_done()
+
+    assert data["pending_drop_readings"] == 1
+    assert coordinator._water_usage_state.as_dict() == state
+    assert coordinator.recorded_payloads[0] == _usage()
+    save.assert_not_awaited()
+    assert events == []
+
+
+async def test_coordinator_raises_and_clears_leak_issue(hass) -> None:
+    """Continuous flow raises a repair issue that clears once water stops."""
+    usage = AsyncMock(
+        side_effect=[
+            _usage(total_eau=100),
+            _usage(total_eau=101),
+            _usage(total_eau=101),
+            _usage(total_eau=101),
+        ]
+    )
+    coordinator = _coordinator(
+        hass,
+        api=SimpleNamespace(
+            get_total_water_and_co2_usage=usage,
+            get_device_info=AsyncMock(
+                side_effect=[
+                    _device("2026-05-21 21:00:00"),
+                    _device("2026-05-21 21:02:00"),
+                    _device("2026-05-21 21:02:00"),
+                    _device("2026-05-21 21:04:00"),
+                ]
+            ),
+            get_login_payload=AsyncMock(return_value=None),
+        ),
+        config={CONF_LEAK_CONTINUOUS_FLOW_MINUTES: 0.000001},
+    )
+    issue_registry = ir.async_get(hass)
+    issue_id = "water_leak_eco-ref"
+
+    with (
+        patch.object(coordinator._store, "async_load", AsyncMock(return_value=None)),
+        patch.object(coordinator._store, "async_save", AsyncMock()),
+    ):
+        await coordinator._async_update_data()
+        data = await coordinator._async_update_data()
+        assert data["water_leak_detected"] is True
+        assert data["water_leak_continuous_flow"] is True
+        assert issue_registry.async_get_issue(DOMAIN, issue_id) is not None
+
+        # Polling the same box report again does not end the flow.
+        data = await coordinator._async_update_data()
+        assert data["water_leak_detected"] is True
+
+        data = await coordinator._async_update_data()
+
+    assert data["water_leak_detected"] is False
+    assert issue_registry.async_get_issue(DOMAIN, issue_id) is None
 
 
 async def test_coordinator_update_fails_on_incomplete_payload(hass) -> None:
@@ -220,6 +477,75 @@ async def test_sensor_native_values_and_attributes(hass) -> None:
     assert injection_time.extra_state_attributes["raw_total_gas_ms"] == 1500
 
 
+async def test_lifetime_gas_sensors(hass) -> None:
+    """Lifetime CO2 sensors read the durable gas accounting."""
+    coordinator = _coordinator(hass)
+    coordinator.async_set_updated_data(
+        {"completed_cycles_gas_ms": 35_464_000, "total_gas_ms": 35_465_500}
+    )
+
+    completed, total = (
+        EcobullesDescribedSensor(coordinator, "eco-ref", description)
+        for description in GAS_SENSORS
+    )
+    assert completed.native_value == 35_464.0
+    assert total.native_value == 35_465.5
+
+    coordinator.async_set_updated_data({})
+    assert total.native_value is None
+
+
+async def test_dose_ratio_sensor(hass) -> None:
+    """The dose ratio sensor reports the rolling ratio and its band."""
+    coordinator = _coordinator(hass)
+    coordinator.async_set_updated_data(
+        {
+            "co2_dose_ratio_ms_per_l": 1_200.0,
+            "co2_dose_band_low_ms_per_l": 1_000.0,
+            "co2_dose_band_high_ms_per_l": 1_400.0,
+        }
+    )
+
+    (ratio,) = (
+        EcobullesDescribedSensor(coordinator, "eco-ref", description)
+        for description in DOSE_SENSORS
+    )
+    assert ratio.native_value == 1_200.0
+    attributes = ratio.extra_state_attributes
+    assert attributes["band_low_ms_per_l"] == 1_000.0
+    assert attributes["band_high_ms_per_l"] == 1_400.0
+
+
+async def test_period_usage_sensors(hass) -> None:
+    """Period sensors report the rollup totals and reset at the period start."""
+    coordinator = _coordinator(hass)
+    coordinator.async_set_updated_data(
+        {
+            "period_usage": {
+                "day": {
+                    "start": "2026-05-21T00:00:00+02:00",
+                    "water_liters": 42.0,
+                    "gas_ms": 63_000.0,
+                }
+            }
+        }
+    )
+    sensors = {
+        description.key: EcobullesDescribedSensor(coordinator, "eco-ref", description)
+        for description in PERIOD_SENSORS
+    }
+
+    assert sensors["water_usage_day"].native_value == 42
+    assert sensors["co2_injection_time_day"].native_value == 63
+    assert sensors["water_usage_day"].last_reset == datetime(
+        2026, 5, 20, 22, tzinfo=UTC
+    )
+    hour_sensor = sensors["water_usage_hour"]
+    assert hour_sensor.native_value is None
+    assert hour_sensor.last_reset is None
+    assert not hour_sensor.entity_description.entity_registry_enabled_default
+
+
 async def test_co2_injection_time_unavailable_without_raw_value(hass) -> None:
     """CO2 injection time is unavailable if the API omits total_gas."""
     coordinator = _coordinator(hass)
@@ -247,6 +573,98 @@ async def test_estimated_co2_bottle_usage_sensor(hass) -> None:
     assert sensor.extra_state_attributes["estimated_dose_mg_per_l"] == 112.857
     assert sensor.extra_state_attributes["estimated_used_co2_g"] == 67.714
 
+    coordinator.async_set_updated_data(
+        {**_usage(total_gas=900_000), "cycle_gas_ms": 450_000, "bottle_changes": 1}
+    )
+    assert sensor.native_value == 0.34
+    assert sensor.extra_state_attributes["current_bottle_gas_ms"] == 450_000
+
+
+async def test_co2_bottle_forecast_sensors(hass) -> None:
+    """Forecast sensors divide the remaining bottle by the fitted rate."""
+    coordinator = _coordinator(hass)
+    forecast_time = datetime(2026, 5, 21, tzinfo=UTC)
+    config = {CONF_CO2_BOTTLE_WEIGHT_KG: 10, CONF_CO2_REFERENCE_PULSE_MS_PER_L: 1500}
+    days_sensor = CO2BottleDaysRemainingSensor(coordinator, "eco-ref", config)
+    date_sensor = CO2BottleEmptyDateSensor(coordinator, "eco-ref", config)
+
+    coordinator.async_set_updated_data(
+        {"cycle_gas_ms": 0, "co2_consumption_ms_per_day": None}
+    )
+    assert days_sensor.native_value is None
+    assert date_sensor.native_value is None
+
+    capacity = days_sensor._bottle_capacity_gas_ms
+    coordinator.async_set_updated_data(
+        {
+            "cycle_gas_ms": capacity / 2,
+            "co2_consumption_ms_per_day": capacity / 100,
+            "co2_forecast_time": forecast_time,
+        }
+    )
+
+    assert days_sensor.native_value == 50
+    assert (date_sensor.native_value - forecast_time).total_seconds() == (
+        pytest.approx(timedelta(days=50).total_seconds())
+    )
+    assert days_sensor.extra_state_attributes["bottle_capacity_gas_ms"] == round(
+        capacity
+    )
+
+
+async def test_estimated_co2_bottle_usage_prefers_learned_capacity(hass) -> None:
+    """Once a bottle has been closed, its measured capacity drives the estimate."""
+    coordinator = _coordinator(hass)
+    coordinator.async_set_updated_data(
+        {
+            **_usage(total_gas=900_000),
+            "cycle_gas_ms": 9_000_000,
+            "bottle_capacity_gas_ms": 36_000_000.0,
+            "bottle_capacity_liters": 120_000.0,
+        }
+    )
+
+    sensor = EstimatedCO2BottleUsageSensor(coordinator, "eco-ref", {})
+
+    assert sensor.native_value == 25
+    attributes = sensor.extra_state_attributes
+    assert attributes["capacity_source"] == "learned"
+    assert attributes["learned_bottle_capacity_liters"] == 120_000
+    # A quarter of a default 10 kg bottle, consistent with the state.
+    assert attributes["estimated_used_co2_g"] == 2_500
+    assert "learned" in attributes["warning"]
+    assert "closed bottle cycles" in attributes["calculation_model"]
+
+
+async def test_fitted_co2_pulse_replaces_reference_when_enabled(hass) -> None:
+    """The fitted ms/L is exposed and only used when the option is enabled."""
+    coordinator = _coordinator(hass)
+    coordinator.async_set_updated_data(
+        {
+            **_usage(total_gas=900_000),
+            "co2_fitted_ms_per_l": 3000.0,
+            "co2_fitted_ms_per_l_confidence": 0.8,
+            "co2_calibration_samples": 16,
+            "co2_calibration_outliers": 1,
+        }
+    )
+    description = next(
+        item for item in DIAGNOSTIC_SENSORS if item.key == "co2_fitted_pulse_ms_per_l"
+    )
+    fitted_sensor = EcobullesDescribedSensor(coordinator, "eco-ref", description)
+
+    assert fitted_sensor.native_value == 3000.0
+    assert fitted_sensor.extra_state_attributes["confidence"] == 0.8
+
+    configured = EstimatedCO2BottleUsageSensor(coordinator, "eco-ref", {})
+    fitted = EstimatedCO2BottleUsageSensor(
+        coordinator, "eco-ref", {CONF_USE_FITTED_CO2_PULSE: True}
+    )
+
+    assert configured.extra_state_attributes["reference_pulse_source"] == "configured"
+    assert fitted.extra_state_attributes["reference_pulse_source"] == "fitted"
+    assert fitted.native_value == pytest.approx(configured.native_value / 2, abs=0.01)
+
 
 @pytest.mark.parametrize(
     "data, config",
@@ -273,3 +691,68 @@ async def test_estimated_co2_bottle_usage_unavailable_for_invalid_inputs(
         EstimatedCO2BottleUsageSensor(coordinator, "eco-ref", config).native_value
         is None
     )
+
+
+async def test_coordinator_applies_config_without_reload(hass) -> None:
+    """New settings reach the poll timer, leak detector and model sensors."""
+    coordinator = _coordinator(hass, config={CONF_CO2_MICROMETRIC_SCREW_SETTING: 5})
+    coordinator.async_set_updated_data({**_usage(total_gas=900_000)})
+    sensor = EstimatedCO2BottleUsageSensor(
+        coordinator, "eco-ref", coordinator.config
+    )
+    sensor.hass = hass
+    sensor.entity_id = "sensor.estimated_co2_bottle_usage"
+    sensor.async_write_ha_state = MagicMock()
+    await sensor.async_added_to_hass()
+    before = sensor.native_value
+
+    coordinator.async_apply_config(
+        {
+            CONF_CO2_MICROMETRIC_SCREW_SETTING: 10,
+            CONF_POLL_INTERVAL_SECONDS: 300,
+            CONF_LEAK_CONTINUOUS_FLOW_MINUTES: 30,
+        }
+    )
+
+    assert coordinator.update_interval == timedelta(seconds=300)
+    assert coordinator._leak_detector.continuous_flow_seconds == 1800
+    sensor.async_write_ha_state.assert_called_once()
+    assert sensor.config[CONF_CO2_MICROMETRIC_SCREW_SETTING] == 10
+    assert sensor.native_value != before
+    await coordinator.async_shutdown()
+
+
+async def test_coordinator_syncs_polled_device_metadata(hass) -> None:
+    """Changed box name and firmware reach the entry and device registry."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"eco_ref": "eco-ref", "name": "Old", "firmware_version": "1.0"},
+    )
+    entry.add_to_hass(hass)
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_or_create(
+        config_entry_id=entry.entry_id,
+        identifiers={(DOMAIN, "eco-ref")},
+        name="Old",
+        sw_version="1.0",
+    )
+    coordinator = EcobullesCoordinator(
+        hass, SimpleNamespace(), "eco-ref", dict(entry.data), entry
+    )
+    now = datetime(2026, 5, 21, 12, 0, tzinfo=UTC)
+    box = _device()["data"]["boite"]
+
+    coordinator._async_sync_device_metadata(box, now)
+
+    assert entry.data["name"] == "Box"
+    assert entry.data["firmware_version"] == "1.6.1"
+    device = device_registry.async_get(device.id)
+    assert (device.name, device.sw_version) == ("Box", "1.6.1")
+
+    newer = {**box, "firm_ver": "1.7.0"}
+    coordinator._async_sync_device_metadata(newer, now + timedelta(minutes=5))
+    assert entry.data["firmware_version"] == "1.6.1"
+
+    coordinator._async_sync_device_metadata(newer, now + timedelta(hours=1))
+    assert entry.data["firmware_version"] == "1.7.0"
+    assert device_registry.async_get(device.id).sw_version == "1.7.0"
@@ -1,8 +1,10 @@
 """Home Assistant integration-level tests for Ecobulles sensors."""
 
+import importlib
 from unittest.mock import AsyncMock, patch
 
 import pytest
+from homeassistant.config_entries import ConfigEntryState
 from homeassistant.helpers import entity_registry as er
 
 from custom_components.ecobulles.const import DOMAIN
@@ -14,19 +16,23 @@ pytestmark = [
 
 
 async def test_sensor_setup_with_raw_co2_debug_enabled(hass, mock_config_entry) -> None:
-    """The integration loads its entities without talking to the real cloud."""
+    """The integration loads its entities without talking to the real cloud.
+
+    Toggling the raw CO2 debug switch adds and removes the raw sensor in place.
+    """
     mock_config_entry.add_to_hass(hass)
 
+    usage_mock = AsyncMock(
+        return_value={
+            "total_gas": 35_464_000,
+            "total_eau": 161_649,
+            "last_updated": "2025-06-05T21:50:00",
+        }
+    )
     with (
         patch(
             "custom_components.ecobulles.sensor.EcobullesClient.get_total_water_and_co2_usage",
-            AsyncMock(
-                return_value={
-                    "total_gas": 35_464_000,
-                    "total_eau": 161_649,
-                    "last_updated": "2025-06-05T21:50:00",
-                }
-            ),
+            usage_mock,
         ),
         patch(
             "custom_components.ecobulles.sensor.EcobullesClient.get_device_info",
@@ -83,3 +89,48 @@ async def test_sensor_setup_with_raw_co2_debug_enabled(hass, mock_config_entry)
     assert hass.states.get(install_date_entity_id).state == "2024-01-01T00:00:00+00:00"
     assert hass.states.get(last_receive_entity_id).state == "2025-06-05T21:50:00+00:00"
     assert hass.config_entries.async_entries(DOMAIN)
+
+    await hass.services.async_call(
+        "switch", "turn_off", {"entity_id": raw_debug_switch_entity_id}, blocking=True
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(raw_co2_entity_id) is None
+    assert registry.async_get(raw_co2_entity_id) is None
+    assert mock_config_entry.state is ConfigEntryState.LOADED
+
+    await hass.services.async_call(
+        "switch", "turn_on", {"entity_id": raw_debug_switch_entity_id}, blocking=True
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(raw_co2_entity_id) is not None
+    usage_mock.assert_awaited_once()
+
+
+async def test_sensor_platform_sets_up_period_sensors(
+    hass, mock_config_entry
+) -> None:
+    """Importing and setting up the platform registers the period sensors."""
+    sensor_platform = importlib.import_module("custom_components.ecobulles.sensor")
+    assert sensor_platform.PERIOD_SENSORS
+    mock_config_entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "custom_components.ecobulles.sensor.EcobullesClient.get_total_water_and_co2_usage",
+            AsyncMock(
+                return_value={"total_gas": 1_500, "total_eau": 7, "last_updated": None}
+            ),
+        ),
+        patch(
+            "custom_components.ecobulles.sensor.EcobullesClient.get_device_info",
+            AsyncMock(return_value={"data": {"boite": {"name": "Test box"}}}),
+        ),
+    ):
+        assert await hass.config_entries.async_setup(mock_config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    registry = er.async_get(hass)
+    for description in sensor_platform.PERIOD_SENSORS:
+        assert registry.async_get_entity_id(
+            "sensor", DOMAIN, f"test-eco-ref_{description.key}"
+        ), description.key
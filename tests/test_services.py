@@ -0,0 +1,395 @@
+"""Tests for the Ecobulles service actions."""
+
+import csv
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import device_registry as dr
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.ecobulles.config_flow import InvalidAuth
+from custom_components.ecobulles.const import DOMAIN
+from custom_components.ecobulles.history import HistoryCacheStats, UsageWindow
+from custom_components.ecobulles.sensor import EcobullesCoordinator
+from custom_components.ecobulles.services import (
+    SERVICE_BACKFILL_HISTORY,
+    SERVICE_EXPORT_HISTORY,
+    SERVICE_IMPORT_ACCOUNTS,
+    SERVICE_PROFILE,
+    async_setup_services,
+    history_store,
+)
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.usefixtures("enable_custom_integrations"),
+]
+
+
+def _window(eco_ref: str, start: datetime, stop: datetime) -> UsageWindow:
+    return UsageWindow(
+        start=start,
+        stop=stop,
+        water_liters=2,
+        raw_co2=3_000,
+        api_total_water=2,
+        api_total_co2=3_000,
+        graph_points=0,
+        sample_time=None,
+    )
+
+
+async def _loaded_device(hass, get_usage_window: AsyncMock) -> str:
+    entry = MockConfigEntry(domain=DOMAIN, data={"eco_ref": "eco-ref"})
+    entry.add_to_hass(hass)
+    entry.mock_state(hass, ConfigEntryState.LOADED)
+    entry.runtime_data = SimpleNamespace(
+        coordinator=SimpleNamespace(
+            api=SimpleNamespace(get_usage_window=get_usage_window),
+            history_cache=HistoryCacheStats(),
+        )
+    )
+    device = dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, "eco-ref")}
+    )
+    return device.id
+
+
+async def test_backfill_history_fetches_and_resumes(hass) -> None:
+    """Windows are cached, and a second run only fetches missing ones."""
+    async_setup_services(hass)
+    get_usage_window = AsyncMock(side_effect=_window)
+    device_id = await _loaded_device(hass, get_usage_window)
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BACKFILL_HISTORY,
+        {
+            "device_id": device_id,
+            "start": "2026-05-21 10:00:00",
+            "stop": "2026-05-21 14:00:00",
+        },
+        blocking=True,
+    )
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert get_usage_window.await_count == 4
+    cached = (await history_store(hass, "eco-ref").async_load())["windows"]
+    assert sorted(cached) == [
+        "2026-05-21T10:00:00",
+        "2026-05-21T11:00:00",
+        "2026-05-21T12:00:00",
+        "2026-05-21T13:00:00",
+    ]
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BACKFILL_HISTORY,
+        {
+            "device_id": device_id,
+            "start": "2026-05-21 10:00:00",
+            "stop": "2026-05-21 16:00:00",
+            "concurrency": 1,
+        },
+        blocking=True,
+    )
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert get_usage_window.await_count == 6
+    assert get_usage_window.await_args.args[1] == datetime(2026, 5, 21, 15, 0)
+    entry = hass.config_entries.async_entries(DOMAIN)[0]
+    history_cache = entry.runtime_data.coordinator.history_cache
+    assert (history_cache.hits, history_cache.misses) == (4, 6)
+
+
+async def test_backfill_history_coalesces_checkpoint_writes(hass) -> None:
+    """Batches schedule a delayed save; the cache is written once at the end."""
+    async_setup_services(hass)
+    device_id = await _loaded_device(hass, AsyncMock(side_effect=_window))
+
+    with (
+        patch(
+            "custom_components.ecobulles.services.Store.async_delay_save"
+        ) as delay_save,
+        patch(
+            "custom_components.ecobulles.services.Store.async_save", AsyncMock()
+        ) as save,
+    ):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_BACKFILL_HISTORY,
+            {
+                "device_id": device_id,
+                "start": "2026-05-01 00:00:00",
+                "stop": "2026-05-05 04:00:00",
+            },
+            blocking=True,
+        )
+        await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert delay_save.call_count == 3
+    assert len(delay_save.call_args.args[0]()["windows"]) == 100
+    save.assert_awaited_once()
+    assert len(save.await_args.args[0]["windows"]) == 100
+
+
+async def test_backfill_history_counts_failed_windows(hass) -> None:
+    """Failed windows are left out of the cache so a rerun retries them."""
+    async_setup_services(hass)
+    get_usage_window = AsyncMock(side_effect=[None, RuntimeError("down")])
+    device_id = await _loaded_device(hass, get_usage_window)
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BACKFILL_HISTORY,
+        {
+            "device_id": device_id,
+            "start": "2026-05-21 10:00:00",
+            "stop": "2026-05-21 12:00:00",
+        },
+        blocking=True,
+    )
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert (await history_store(hass, "eco-ref").async_load())["windows"] == {}
+
+
+async def test_backfill_history_rejects_invalid_requests(hass) -> None:
+    """Unknown devices and empty ranges raise validation errors."""
+    async_setup_services(hass)
+    device_id = await _loaded_device(hass, AsyncMock())
+
+    with pytest.raises(ServiceValidationError) as err:
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_BACKFILL_HISTORY,
+            {
+                "device_id": "missing",
+                "start": "2026-05-21 10:00:00",
+                "stop": "2026-05-21 12:00:00",
+            },
+            blocking=True,
+        )
+    assert err.value.translation_key == "device_not_found"
+
+    with pytest.raises(ServiceValidationError) as err:
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_BACKFILL_HISTORY,
+            {
+                "device_id": device_id,
+                "start": "2026-05-21 12:00:00",
+                "stop": "2026-05-21 10:00:00",
+            },
+            blocking=True,
+        )
+    assert err.value.translation_key == "invalid_time_range"
+
+
+async def test_export_history_writes_analysis_csv(hass, tmp_path) -> None:
+    """Cached and cloud exports produce the history CSV layout."""
+    hass.config.config_dir = str(tmp_path)
+    async_setup_services(hass)
+    get_usage_window = AsyncMock(side_effect=_window)
+    device_id = await _loaded_device(hass, get_usage_window)
+    await history_store(hass, "eco-ref").async_save(
+        {
+            "windows": {
+                "2026-05-21T10:00:00": ["2026-05-21T11:00:00", 2, 3000, 2, 3000, 0, None],
+                "2026-05-21T11:00:00": ["2026-05-21T12:00:00", 1, 1500, 1, 1500, 0, None],
+                "2026-05-22T11:00:00": ["2026-05-22T12:00:00", 5, 7500, 5, 7500, 0, None],
+            }
+        }
+    )
+    service_data = {
+        "device_id": device_id,
+        "start": "2026-05-21 10:00:00",
+        "stop": "2026-05-21 12:00:00",
+    }
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        service_data,
+        blocking=True,
+        return_response=True,
+    )
+
+    assert (response["windows"], response["rows"]) == (2, 6)
+    assert response["missing_windows"] == 0
+    with open(response["path"], newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["entity_id"] for row in rows[-2:]] == [
+        "sensor.ecobulles_water_usage_total",
+        "sensor.ecobulles_raw_co2_value",
+    ]
+    assert [row["state"] for row in rows[-2:]] == ["3", "4500"]
+    get_usage_window.assert_not_awaited()
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        {**service_data, "source": "cloud", "window_minutes": 30},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert (response["windows"], response["rows"]) == (4, 10)
+    assert response["missing_windows"] == 0
+    assert get_usage_window.await_count == 4
+
+    get_usage_window.side_effect = [
+        None,
+        RuntimeError("down"),
+        _window("eco-ref", datetime(2026, 5, 21, 11, 0), datetime(2026, 5, 21, 11, 30)),
+        _window("eco-ref", datetime(2026, 5, 21, 11, 30), datetime(2026, 5, 21, 12, 0)),
+    ]
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        {**service_data, "source": "cloud", "window_minutes": 30},
+        blocking=True,
+        return_response=True,
+    )
+    assert (response["windows"], response["missing_windows"]) == (2, 2)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        {**service_data, "stop": "2026-05-21 14:00:00"},
+        blocking=True,
+        return_response=True,
+    )
+    assert (response["windows"], response["missing_windows"]) == (2, 2)
+
+
+async def test_import_accounts_creates_missing_entries(hass, tmp_path) -> None:
+    """Valid accounts become entries; known devices and bad logins are skipped."""
+    hass.config.config_dir = str(tmp_path)
+    (tmp_path / "ecobulles_accounts.yaml").write_text(
+        "- {email: one@example.com, password: a}\n"
+        "- {email: two@example.com, password: b}\n"
+        "- {email: bad@example.com, password: c}\n"
+        "- {email: one@example.com, password: a}\n"
+        "- {email: known@example.com, password: d}\n"
+        "- {email: boom@example.com, password: e}\n",
+        encoding="utf-8",
+    )
+    MockConfigEntry(domain=DOMAIN, unique_id="eco-two", data={}).add_to_hass(hass)
+    MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="eco-known",
+        data={"eco_ref": "eco-known", "email": "Known@example.com"},
+    ).add_to_hass(hass)
+    async_setup_services(hass)
+
+    async def validate(hass, account):
+        if account["email"] == "bad@example.com":
+            raise InvalidAuth
+        if account["email"] == "boom@example.com":
+            raise KeyError("data")
+        eco_ref = "eco-" + account["email"].split("@")[0]
+        return {"title": f"Ecobulles : {eco_ref}", "user_id": "u", "eco_ref": eco_ref}
+
+    validate_mock = AsyncMock(side_effect=validate)
+    with (
+        patch("custom_components.ecobulles.services.validate_input", validate_mock),
+        patch(
+            "custom_components.ecobulles.async_setup_entry",
+            AsyncMock(return_value=True),
+        ),
+    ):
+        response = await hass.services.async_call(
+            DOMAIN, SERVICE_IMPORT_ACCOUNTS, {}, blocking=True, return_response=True
+        )
+        await hass.async_block_till_done()
+
+    assert response == {
+        "created": ["eco-one"],
+        "already_configured": ["eco-two", "eco-known"],
+        "failed": ["bad@example.com", "boom@example.com"],
+    }
+    # The email of an existing entry is skipped without logging in.
+    assert validate_mock.await_count == 4
+    entry = hass.config_entries.async_entry_for_domain_unique_id(DOMAIN, "eco-one")
+    assert entry.title == "Ecobulles : eco-one"
+    assert entry.data["password"] == "a"
+    assert entry.data["co2_bottle_weight"] == 10
+
+
+async def test_import_accounts_rejects_files_outside_config(hass, tmp_path) -> None:
+    """Credentials files must live in the configuration directory."""
+    hass.config.config_dir = str(tmp_path / "config")
+    async_setup_services(hass)
+
+    with pytest.raises(ServiceValidationError) as err:
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_IMPORT_ACCOUNTS,
+            {"path": "../accounts.yaml"},
+            blocking=True,
+            return_response=True,
+        )
+    assert err.value.translation_key == "invalid_accounts_file"
+
+
+async def test_profile_replays_latest_poll(hass, tmp_path) -> None:
+    """Replayed refreshes are profiled without new cloud requests."""
+    hass.config.config_dir = str(tmp_path)
+    async_setup_services(hass)
+    api = SimpleNamespace(
+        get_total_water_and_co2_usage=AsyncMock(
+            return_value={"total_eau": 7, "total_gas": 1500, "last_updated": None}
+        ),
+        get_device_info=AsyncMock(return_value={"data": {"boite": {"name": "Box"}}}),
+        get_login_payload=AsyncMock(return_value=None),
+    )
+    coordinator = EcobullesCoordinator(hass, api, "eco-ref", {})
+    entry = MockConfigEntry(domain=DOMAIN, data={"eco_ref": "eco-ref"})
+    entry.add_to_hass(hass)
+    entry.mock_state(hass, ConfigEntryState.LOADED)
+    entry.runtime_data = SimpleNamespace(coordinator=coordinator)
+    device = dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, "eco-ref")}
+    )
+    service_data = {"device_id": device.id, "refreshes": 2}
+
+    with pytest.raises(ServiceValidationError) as err:
+        await hass.services.async_call(
+            DOMAIN, SERVICE_PROFILE, service_data, blocking=True, return_response=True
+        )
+    assert err.value.translation_key == "nothing_to_replay"
+
+    await coordinator.async_refresh()
+    data = coordinator.data
+    state = coordinator._water_usage_state.as_dict()
+    with patch(
+        "custom_components.ecobulles.sensor.Store.async_save", AsyncMock()
+    ) as save:
+        response = await hass.services.async_call(
+            DOMAIN, SERVICE_PROFILE, service_data, blocking=True, return_response=True
+        )
+
+    # Replays run on a detached copy: the live coordinator is left untouched.
+    save.assert_not_awaited()
+    assert coordinator.data is data
+    assert coordinator._water_usage_state.as_dict() == state
+    assert (response["refreshes"], response["failed"]) == (2, 0)
+    assert list(response["phases_ms"]) == [
+        "fetch",
+        "parse",
+        "water_accounting",
+        "serialize",
+        "store_save",
+        "entity_writes",
+    ]
+    assert api.get_total_water_and_co2_usage.await_count == 1
+    assert coordinator.api is api
+    report = Path(response["path"]).read_text(encoding="utf-8")
+    assert "Functions by cumulative time:" in report
+    assert "allocation sites:" in report
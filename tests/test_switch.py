@@ -3,8 +3,14 @@
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-
-from custom_components.ecobulles.const import CONF_ENABLE_RAW_CO2_SENSOR, DOMAIN
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.ecobulles.const import (
+    CONF_ENABLE_RAW_CO2_SENSOR,
+    DOMAIN,
+    SIGNAL_RAW_CO2_SENSOR_TOGGLED,
+)
 from custom_components.ecobulles.switch import RawCO2DebugSwitch, async_setup_entry
 
 pytestmark = pytest.mark.asyncio
@@ -22,31 +28,32 @@ async def test_switch_setup_adds_debug_switch(hass, mock_config_entry) -> None:
 
 
 async def test_raw_co2_debug_switch_updates_option(hass, mock_config_entry) -> None:
-    """The debug switch persists its option and reloads the entry."""
+    """The debug switch persists its option and signals the sensor platform."""
     mock_config_entry.add_to_hass(hass)
     switch = RawCO2DebugSwitch(hass, mock_config_entry)
     switch.hass = hass
     switch.async_write_ha_state = MagicMock()
+    signals: list[bool] = []
+    async_dispatcher_connect(
+        hass,
+        SIGNAL_RAW_CO2_SENSOR_TOGGLED.format(mock_config_entry.entry_id),
+        callback(lambda enabled: signals.append(enabled)),
+    )
 
     assert switch.is_on is True
     assert switch.device_info == {"identifiers": {(DOMAIN, "test-eco-ref")}}
 
-    with patch.object(
-        hass.config_entries,
-        "async_reload",
-        AsyncMock(return_value=True),
-    ) as reload_mock:
+    with patch.object(hass.config_entries, "async_reload", AsyncMock()) as reload_mock:
         await switch.async_turn_off()
+        await hass.async_block_till_done()
 
     assert mock_config_entry.options[CONF_ENABLE_RAW_CO2_SENSOR] is False
     switch.async_write_ha_state.assert_called_once()
-    reload_mock.assert_awaited_once_with(mock_config_entry.entry_id)
+    reload_mock.assert_not_awaited()
+    assert signals == [False]
 
-    with patch.object(
-        hass.config_entries,
-        "async_reload",
-        AsyncMock(return_value=True),
-    ):
-        await switch.async_turn_on()
+    await switch.async_turn_on()
+    await hass.async_block_till_done()
 
     assert mock_config_entry.options[CONF_ENABLE_RAW_CO2_SENSOR] is True
+    assert signals == [False, True]
@@ -0,0 +1,42 @@
+"""Tests for the multi-resolution usage history index."""
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.ecobulles.usage_history import UsageHistoryIndex
+
+TZ = timezone(timedelta(hours=2))
+START = datetime(2026, 5, 21, 23, 0, tzinfo=TZ)
+
+
+def _feed(index: UsageHistoryIndex, minutes: int) -> None:
+    """Draw one liter and 1500 ms every two minutes."""
+    for step in range(0, minutes + 1, 2):
+        index.add_sample(START + timedelta(minutes=step), step // 2, step // 2 * 1_500)
+
+
+def test_index_buckets_deltas_per_resolution() -> None:
+    """Deltas land in the minute, hour and local day buckets."""
+    index = UsageHistoryIndex()
+    _feed(index, 120)
+    start = START.timestamp()
+    end = (START + timedelta(hours=2)).timestamp()
+
+    hours = index.query("hour", start, end)
+    assert [point["water_liters"] for point in hours] == [29, 30]
+    days = index.query("day", start - 86_400, end + 86_400)
+    assert [point["water_liters"] for point in days] == [29, 31]
+    minutes = index.query("minute", start, start + 600)
+    assert [point["gas_ms"] for point in minutes] == [1_500, 1_500, 1_500, 1_500]
+
+
+def test_index_is_bounded_and_picks_resolution() -> None:
+    """Old minutes fall out of the ring and coarser buckets answer instead."""
+    index = UsageHistoryIndex({"minute": 30, "hour": 48, "day": 10})
+    _feed(index, 180)
+    start = START.timestamp()
+    end = (START + timedelta(hours=3)).timestamp()
+
+    assert index.oldest("minute") == (START + timedelta(minutes=122)).timestamp()
+    assert index.choose_resolution(end - 1_200, end, 500) == "minute"
+    assert index.choose_resolution(start, end, 500) == "hour"
+    assert index.choose_resolution(start, end, 2) == "day"
@@ -0,0 +1,56 @@
+"""Tests for water draw segmentation."""
+
+from datetime import datetime, timedelta
+
+from custom_components.ecobulles.water_draws import WaterDraw, WaterDrawSegmenter
+
+START = datetime(2026, 1, 1, 7, 0)
+
+
+def _at(minutes: int) -> datetime:
+    return START + timedelta(minutes=minutes)
+
+
+def test_segments_contiguous_increases_into_draws() -> None:
+    """Consecutive increases form one draw, closed by the first idle sample."""
+    segmenter = WaterDrawSegmenter(max_recent=1)
+
+    assert segmenter.add_sample(_at(0), 100, 1_000) == []
+    assert segmenter.add_sample(_at(2), 104, 7_000) == []
+    assert segmenter.add_sample(_at(4), 110, 16_000) == []
+    assert segmenter.in_progress
+
+    (draw,) = segmenter.add_sample(_at(6), 110, 16_000)
+    assert draw == WaterDraw(start=_at(0), end=_at(4), liters=10, co2_ms=15_000)
+    assert draw.as_event_data()["duration_seconds"] == 240
+    assert not segmenter.in_progress
+
+    assert segmenter.add_sample(_at(8), 111, 17_500) == []
+    assert segmenter.add_sample(_at(10), 111, 17_500)
+    assert list(segmenter.recent) == [
+        WaterDraw(start=_at(6), end=_at(8), liters=1, co2_ms=1_500)
+    ]
+
+
+def test_ignores_stale_samples() -> None:
+    """Samples that do not move time forward are skipped."""
+    segmenter = WaterDrawSegmenter()
+    segmenter.add_sample(_at(2), 100, 0)
+
+    assert segmenter.add_sample(_at(2), 150, 0) == []
+    assert segmenter.add_sample(_at(1), 150, 0) == []
+    assert not segmenter.in_progress
+
+
+def test_pending_drop_does_not_split_a_draw() -> None:
+    """Readings held flat by an unconfirmed counter drop are not idle samples."""
+    segmenter = WaterDrawSegmenter()
+    segmenter.add_sample(_at(0), 100, 0)
+    segmenter.add_sample(_at(2), 104, 0)
+
+    assert segmenter.add_sample(_at(4), 104, 0, pending_drop=True) == []
+    assert segmenter.in_progress
+    assert segmenter.add_sample(_at(6), 109, 0) == []
+
+    (draw,) = segmenter.add_sample(_at(8), 109, 0)
+    assert draw == WaterDraw(start=_at(0), end=_at(6), liters=9, co2_ms=0)
@@ -0,0 +1,58 @@
+"""Tests for the hour-of-week water usage profile."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.ecobulles.water_forecast import WaterUsageProfile
+
+TZ = timezone(timedelta(hours=1))
+MONDAY = datetime(2026, 1, 5, tzinfo=TZ)
+
+
+def _feed_hours(
+    profile: WaterUsageProfile, start: datetime, liters_per_hour: list[float]
+) -> None:
+    """Feed 10-minute samples drawing `liters_per_hour[n]` during hour n."""
+    total = 0.0
+    for index in range(len(liters_per_hour) * 6 + 1):
+        timestamp = start + timedelta(minutes=10 * index)
+        profile.add_sample(timestamp, total)
+        total += liters_per_hour[min(index // 6, len(liters_per_hour) - 1)] / 6
+
+
+def test_profile_learns_hourly_pattern_and_forecasts() -> None:
+    """A repeating daily pattern is learned and forecast for today and tomorrow."""
+    profile = WaterUsageProfile()
+    day = [0.0] * 7 + [60.0] + [6.0] * 16
+    assert profile.forecast_day(MONDAY) is None
+
+    _feed_hours(profile, MONDAY, day * 7 + day[:8])
+
+    now = MONDAY + timedelta(days=7, hours=8)
+    assert profile.day_liters == pytest.approx(60)
+    assert profile.forecast_day(now) == pytest.approx(156)
+    assert profile.forecast_next_day(now) == pytest.approx(156)
+
+    restored = WaterUsageProfile.from_dict(profile.as_dict())
+    assert restored.forecast_next_day(now) == pytest.approx(156)
+
+
+def test_profile_borrows_same_hour_from_other_weekdays() -> None:
+    """Unseen weekdays fall back on the same hour of learned days."""
+    profile = WaterUsageProfile()
+    _feed_hours(profile, MONDAY, [10.0] * 25)
+
+    assert profile.forecast_next_day(MONDAY + timedelta(days=3)) == pytest.approx(240)
+
+
+def test_profile_skips_partial_and_gap_hours() -> None:
+    """Hours not observed from start to end are not learned."""
+    profile = WaterUsageProfile()
+    profile.add_sample(MONDAY + timedelta(minutes=30), 0)
+    profile.add_sample(MONDAY + timedelta(hours=1), 50)
+    profile.add_sample(MONDAY + timedelta(hours=4), 500)
+    profile.add_sample(MONDAY + timedelta(hours=5), 510)
+
+    assert not any(profile.seen)
+    assert profile.day_liters == 60
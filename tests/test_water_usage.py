@@ -1,6 +1,13 @@
 """Tests for durable water accounting."""
 
-from custom_components.ecobulles.water_usage import WaterUsageState
+from datetime import datetime, timedelta
+
+import pytest
+
+from custom_components.ecobulles.water_usage import (
+    WaterUsageState,
+    replay_cycle_values,
+)
 
 
 def test_rollover_keeps_total_monotonic() -> None:
@@ -15,3 +22,158 @@ def test_rollover_keeps_total_monotonic() -> None:
     assert state.cycle_water_liters == 7
     assert state.total_water_liters == 165_901
     assert state.bottle_changes == 1
+
+
+def test_gas_counter_reset_keeps_total_monotonic() -> None:
+    """A lower gas counter closes the previous cycle like the water counter."""
+    state = WaterUsageState()
+
+    assert state.apply_cycle_gas_value(35_000_000) is False
+    assert state.apply_cycle_gas_value(35_464_000) is False
+    assert state.apply_cycle_gas_value(1_500) is True
+
+    assert state.completed_cycles_gas_ms == 35_464_000
+    assert state.cycle_gas_ms == 1_500
+    assert state.total_gas_ms == 35_465_500
+    assert state.gas_counter_resets == 1
+
+
+def test_closed_cycles_teach_bottle_capacity() -> None:
+    """Each closed cycle is folded into an exponentially weighted capacity."""
+    state = WaterUsageState()
+    assert state.bottle_capacity_liters is None
+
+    for cycle_liters, cycle_gas_ms in ((100_000, 30_000_000), (110_000, 40_000_000)):
+        state.apply_cycle_value(cycle_liters)
+        state.apply_cycle_gas_value(cycle_gas_ms)
+        state.apply_cycle_value(1)
+        state.apply_cycle_gas_value(1)
+
+    assert state.bottle_capacity_liters == pytest.approx(103_000)
+    assert state.bottle_capacity_gas_ms == pytest.approx(33_000_000)
+    assert WaterUsageState.from_dict(state.as_dict()) == state
+
+
+def test_state_restores_from_legacy_storage() -> None:
+    """Stores written before gas accounting existed restore with zero gas."""
+    state = WaterUsageState.from_dict(
+        {"cycle_water_liters": 10, "completed_cycles_liters": 5, "bottle_changes": 1}
+    )
+
+    assert state.total_water_liters == 15
+    assert state.total_gas_ms == 0
+    assert WaterUsageState.from_dict(state.as_dict()) == state
+
+
+def test_transient_drop_is_ignored_until_confirmed() -> None:
+    """A single bad reading does not close the bottle cycle."""
+    state = WaterUsageState()
+
+    assert state.apply_cycle_value(165_894, confirm_readings=2) is False
+    assert state.apply_cycle_value(3, confirm_readings=2) is False
+    assert state.cycle_water_liters == 165_894
+    assert state.pending_drop_readings == 1
+
+    assert state.apply_cycle_value(165_896, confirm_readings=2) is False
+    assert state.pending_drop_readings == 0
+    assert state.completed_cycles_liters == 0
+
+    assert state.apply_cycle_value(7, confirm_readings=2) is False
+    assert state.apply_cycle_value(9, confirm_readings=2) is True
+    assert state.completed_cycles_liters == 165_896
+    assert state.cycle_water_liters == 9
+    assert state.total_water_liters == 165_905
+
+
+def test_drop_confirmed_after_minimum_time() -> None:
+    """A persisting drop is confirmed by time even before enough readings."""
+    start = datetime(2026, 1, 1)
+    state = WaterUsageState(cycle_gas_ms=500_000)
+
+    assert (
+        state.apply_cycle_gas_value(
+            1_500, start, confirm_readings=10, confirm_seconds=600
+        )
+        is False
+    )
+    restored = WaterUsageState.from_dict(state.as_dict())
+    assert restored.pending_gas_drop_since == start.timestamp()
+    assert (
+        restored.apply_cycle_gas_value(
+            3_000,
+            start + timedelta(minutes=10),
+            confirm_readings=10,
+            confirm_seconds=600,
+        )
+        is True
+    )
+    assert restored.completed_cycles_gas_ms == 500_000
+    assert restored.pending_gas_drop_since is None
+
+
+def test_repeated_box_report_does_not_confirm_drop() -> None:
+    """Polls returning the same box report count as a single reading."""
+    reported = datetime(2026, 1, 1, 12, 0)
+    state = WaterUsageState(cycle_water_liters=165_000)
+
+    for _ in range(3):
+        assert (
+            state.apply_cycle_value(7, confirm_readings=2, reading_time=reported)
+            is False
+        )
+    assert state.pending_drop_readings == 1
+    restored = WaterUsageState.from_dict(state.as_dict())
+    assert restored.pending_drop_reading_at == reported.timestamp()
+
+    assert (
+        restored.apply_cycle_value(
+            9, confirm_readings=2, reading_time=reported + timedelta(minutes=2)
+        )
+        is True
+    )
+    assert restored.completed_cycles_liters == 165_000
+    assert restored.pending_drop_reading_at is None
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_replay_matches_sequential_application(use_numpy: bool) -> None:
+    """Batch replay gives the same state and changes as one-by-one readings."""
+    readings = [161_649, 165_894, 7, 7, 40, 12, 0, 3]
+    start = datetime(2026, 1, 1)
+    timestamps = [start + timedelta(minutes=2 * index) for index in range(len(readings))]
+    initial = WaterUsageState(cycle_water_liters=100, completed_cycles_liters=50)
+
+    expected = WaterUsageState(cycle_water_liters=100, completed_cycles_liters=50)
+    expected_changes = [
+        index
+        for index, reading in enumerate(readings)
+        if expected.apply_cycle_value(reading)
+    ]
+
+    result = replay_cycle_values(
+        readings, timestamps, initial=initial, use_numpy=use_numpy
+    )
+
+    assert result.state == expected
+    assert result.change_indices == expected_changes == [2, 5, 6]
+    assert result.change_timestamps == [timestamps[2], timestamps[5], timestamps[6]]
+    assert initial.cycle_water_liters == 100
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_replay_rejects_invalid_series(use_numpy: bool) -> None:
+    """Negative readings and mismatched timestamps are rejected."""
+    with pytest.raises(ValueError, match="negative"):
+        replay_cycle_values([1, -1], use_numpy=use_numpy)
+    with pytest.raises(ValueError, match="same length"):
+        replay_cycle_values([1, 2], [datetime(2026, 1, 1)], use_numpy=use_numpy)
+    assert replay_cycle_values([], use_numpy=use_numpy).state == WaterUsageState()
+
+
+def test_replay_with_confirmation_window() -> None:
+    """Replay reports the index where a pending drop is confirmed."""
+    result = replay_cycle_values([1_000, 3, 1_001, 5, 8], confirm_readings=2)
+
+    assert result.change_indices == [4]
+    assert result.state.completed_cycles_liters == 1_001
+    assert result.state.cycle_water_liters == 8
@@ -0,0 +1,92 @@
+"""Tests for the Ecobulles websocket API."""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.setup import async_setup_component
+from homeassistant.util.dt import as_local
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.ecobulles.const import DOMAIN
+from custom_components.ecobulles.usage_history import UsageHistoryIndex
+from custom_components.ecobulles.websocket_api import async_register_websocket_commands
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_usage_history_command(hass, hass_ws_client) -> None:
+    """The command answers range queries from the coordinator index."""
+    assert await async_setup_component(hass, "websocket_api", {})
+    async_register_websocket_commands(hass)
+    start = as_local(datetime.fromisoformat("2026-05-21T10:00:00+00:00"))
+    index = UsageHistoryIndex()
+    for step in range(0, 61, 2):
+        index.add_sample(start + timedelta(minutes=step), step, step * 1_500)
+    entry = MockConfigEntry(domain=DOMAIN, data={"eco_ref": "eco-ref"})
+    entry.add_to_hass(hass)
+    entry.mock_state(hass, ConfigEntryState.LOADED)
+    entry.runtime_data = SimpleNamespace(
+        coordinator=SimpleNamespace(usage_history=index)
+    )
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id(
+        {
+            "type": "ecobulles/usage_history",
+            "entry_id": entry.entry_id,
+            "start_time": "2026-05-21T10:00:00+00:00",
+            "end_time": "2026-05-21T11:00:00+00:00",
+        }
+    )
+    response = await client.receive_json()
+
+    assert response["success"]
+    assert response["result"]["resolution"] == "minute"
+    assert len(response["result"]["points"]) == 29
+    assert sum(point["water_liters"] for point in response["result"]["points"]) == 58
+
+    await client.send_json_auto_id(
+        {
+            "type": "ecobulles/usage_history",
+            "entry_id": entry.entry_id,
+            "start_time": "2026-05-21T10:00:00+00:00",
+            "end_time": "2026-05-21T11:00:00+00:00",
+            "resolution": "hour",
+        }
+    )
+    response = await client.receive_json()
+    assert response["result"]["points"][0]["gas_ms"] == 87_000
+
+    # Naive bounds are read in the Home Assistant time zone.
+    local_start = start.replace(tzinfo=None)
+    await client.send_json_auto_id(
+        {
+            "type": "ecobulles/usage_history",
+            "entry_id": entry.entry_id,
+            "start_time": local_start.isoformat(),
+            "end_time": (local_start + timedelta(hours=1)).isoformat(),
+            "resolution": "hour",
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"]["points"][0]["gas_ms"] == 87_000
+
+
+async def test_usage_history_command_rejects_unknown_entry(
+    hass, hass_ws_client
+) -> None:
+    """Unknown or unloaded entries return a not found error."""
+    assert await async_setup_component(hass, "websocket_api", {})
+    async_register_websocket_commands(hass)
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id(
+        {"type": "ecobulles/usage_history", "entry_id": "missing"}
+    )
+    response = await client.receive_json()
+
+    assert not response["success"]
+    assert response["error"]["code"] == "not_found"